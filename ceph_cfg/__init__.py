@@ -10,20 +10,10 @@ import subprocess
 from . import util_which
 from . import utils
 from . import model
-from . import mdl_updater
-from . import presenter
-from . import mdl_query
 from . import osd
-from . import mon
-from . import rgw
-from . import mds
 from . import purger
-from . import ops_pool
-from . import ops_cephfs
-from . import ops_auth
-from . import ops_cluster
 from . import keyring_use
-from . import ops_osd
+from . import session
 
 log = logging.getLogger(__name__)
 
@@ -42,50 +32,123 @@ def partition_list():
     '''
     List partitions by disk
     '''
-    m = model.model()
-    u = mdl_updater.model_updater(m)
-    u.symlinks_refresh()
-    u.partitions_all_refresh()
-    p = presenter.mdl_presentor(m)
-    return p.partitions_all()
+    return session.session_default().partition_list()
+
+def partition_query(**kwargs):
+    '''
+    List disks and partitions matching filters with selected fields
+
+    Args:
+        **kwargs: Arbitrary keyword arguments.
+            fields : List of fields to return, defaults to all fields.
+            kind : 'disk' or 'part', defaults to both.
+            rotational : True or False to match the ROTA field.
+            size_min : Minimum size in bytes.
+            size_max : Maximum size in bytes.
+            parttype : PARTTYPE GUID or list of GUIDs.
+            mounted : True or False to match on having a mount point.
+            cluster_fsid : Only OSD data and journal partitions of this
+                cluster, and the disks they are on.
+            offset : Skip this many matching records.
+            limit : Return at most this many records.
+
+    Symlinks and OSD are only discovered if the query needs them.
+    '''
+    return session.session_default().partition_query(**kwargs)
+
+
+def partition_list_stream(fp):
+    '''
+    Write partition_list output as JSON to the file like object fp
+
+    Disks are rendered and written one at a time.
+    '''
+    session.session_default().partition_list_stream(fp)
+
+
+def partition_list_columnar(output_format="binary"):
+    '''
+    Disks and partitions as columns for aggregating many hosts
+
+    Args:
+        output_format : "binary" returns bytes for util_columnar.unpack,
+            "csv" returns CSV text.
+
+    Columns are host, disk, partition, size, rota, parttype, fstype,
+    osd_id and cluster_fsid with one row per disk and partition.
+    '''
+    return session.session_default().partition_list_columnar(output_format)
+
 
 def partition_list_osd():
     '''
     List all OSD data partitions by partition
     '''
-    m = model.model()
-    u = mdl_updater.model_updater(m)
-    u.symlinks_refresh()
-    u.partitions_all_refresh()
-    u.discover_partitions_refresh()
-    p = presenter.mdl_presentor(m)
-    return p.discover_osd_partitions()
+    return session.session_default().partition_list_osd()
 
 
 def partition_list_journal():
     '''
     List all OSD journal partitions by partition
     '''
-    m = model.model()
-    u = mdl_updater.model_updater(m)
-    u.symlinks_refresh()
-    u.partitions_all_refresh()
-    u.discover_partitions_refresh()
-    p = presenter.mdl_presentor(m)
-    return p.discover_journal_partitions()
+    return session.session_default().partition_list_journal()
 
 def osd_discover():
     """
     List all OSD by cluster
     """
-    m = model.model()
-    u = mdl_updater.model_updater(m)
+    return session.session_default().osd_discover()
+
+
+def osd_discover_stream(fp):
+    """
+    Write osd_discover output as JSON to the file like object fp
+
+    OSD are rendered and written one at a time.
+    """
+    session.session_default().osd_discover_stream(fp)
+
+
+def discovery_snapshot():
+    """
+    Snapshot of all disks, partitions, OSD and journals by name
+
+    Store the snapshot to get only the changes later with discovery_delta.
+    """
+    return session.session_default().discovery_snapshot()
+
+
+def discovery_delta(previous):
+    """
+    Changes to disks, partitions, OSD and journals since a snapshot
+
+    Args:
+        previous : Snapshot returned by discovery_snapshot.
+
+    Returns a dictionary by section of "added" records, "removed" record
+    names and "changed" fields with "old" and "new" values. An empty
+    dictionary means nothing changed.
+    """
+    return session.session_default().discovery_delta(previous)
 
-    u.symlinks_refresh()
-    u.partitions_all_refresh()
-    u.discover_partitions_refresh()
-    p = presenter.mdl_presentor(m)
-    return p.discover_osd()
+
+def inventory(sections=None, **kwargs):
+    """
+    Disks, OSD, ceph version and mon status from one discovery pass
+
+    Args:
+        sections : List of sections to include, defaults to all of
+            "partition_list", "partition_list_osd", "partition_list_journal",
+            "osd_discover", "ceph_version" and "mon_status".
+        **kwargs: Arbitrary keyword arguments.
+            cluster_uuid : Set the cluster UUID. Defaults to value found in
+                ceph config file.
+            cluster_name : Set the cluster name. Defaults to "ceph".
+
+    Each section holds the output of the function with the same name, except
+    mon_status is empty on nodes that are not mon nodes.
+    """
+    return session.session_default(**kwargs).inventory(sections)
 
 
 def partition_is(dev):
@@ -188,7 +251,28 @@ def osd_prepare(**kwargs):
             journal_uuid : Set the OSD journal UUID. If set will return if OSD
                 with journal UUID already exists.
     """
-    return osd.osd_prepare(**kwargs)
+    return session.session_default(**kwargs).osd_prepare(**kwargs)
+
+
+def osd_prepare_many(specs, **kwargs):
+    """
+    prepare many OSD with one discovery pass
+
+    Args:
+        specs : List of dictionaries each with the osd_prepare arguments
+            for one OSD, such as osd_dev and journal_dev.
+        **kwargs: Arbitrary keyword arguments.
+            parallelism : Number of OSD prepared at the same time. Defaults
+                to 4.
+            Any other osd_prepare argument is the default for all specs.
+
+    All specs are validated before any OSD is prepared. OSD sharing a data
+    or journal disk are prepared one after the other.
+
+    Returns a list with for each spec the osd_dev, journal_dev, status of
+    "prepared", "skipped" or "failed", the error and the seconds taken.
+    """
+    return session.session_default(**kwargs).osd_prepare_many(specs, **kwargs)
 
 
 def osd_activate(**kwargs):
@@ -209,7 +293,28 @@ def osd_activate(**kwargs):
             journal_uuid : Set the OSD journal UUID. If set will return if OSD
                 with journal UUID already exists.
     """
-    return osd.osd_activate(**kwargs)
+    return session.session_default(**kwargs).osd_activate(**kwargs)
+
+
+def osd_activate_parallel(**kwargs):
+    """
+    Activate OSD partitions concurrently
+
+    Args:
+        **kwargs: Arbitrary keyword arguments.
+            osd_dev : Disk or partition to activate.
+            osd_dev_list : List of disks or partitions to activate.
+            cluster_name : Set the cluster name. Defaults to "ceph".
+            cluster_uuid : Set the cluster UUID. Defaults to the value found
+                in local config.
+            parallelism : Number of partitions activated at the same time.
+                Defaults to 4.
+            timeout : Seconds allowed to activate each partition.
+
+    Returns the count of "activated" and "failed" partitions, the total
+    "seconds" and by partition the status, error and seconds taken.
+    """
+    return session.session_default(**kwargs).osd_activate_parallel(**kwargs)
 
 
 def osd_reweight(**kwargs):
@@ -228,7 +333,103 @@ def osd_reweight(**kwargs):
     Note:
         Setting the weight to 0 will drain an OSD.
     """
-    return ops_osd.reweight(**kwargs)
+    return session.session_default(**kwargs).osd_reweight(**kwargs)
+
+
+def osd_reweight_many(**kwargs):
+    """
+    Reweight many OSD's, or all OSD's on node, in one operation.
+
+    Args:
+        **kwargs: Arbitrary keyword arguments.
+            cluster_name : Set the cluster name. Defaults to "ceph".
+            cluster_uuid : Set the cluster date will be added too. Defaults to
+                the value found in local config.
+            weights : Dictionary of OSD number to the new weight.
+            weight : The new weight for all OSD's of the cluster on this node.
+                Used when weights is not set.
+            crush : Set the CRUSH weight rather than the reweight value.
+                Defaults to False.
+
+    Note:
+        Reweight values must be in the range 0 to 1. CRUSH weights are
+        usually the device size in TiB.
+
+    Returns the weights set by OSD number.
+    """
+    return session.session_default(**kwargs).osd_reweight_many(**kwargs)
+
+
+def osd_drain(**kwargs):
+    """
+    Lower the weight of OSD's in steps, waiting for recovery between steps.
+
+    Args:
+        **kwargs: Arbitrary keyword arguments.
+            cluster_name : Set the cluster name. Defaults to "ceph".
+            cluster_uuid : Set the cluster date will be added too. Defaults to
+                the value found in local config.
+            osd_list : List of OSD numbers to drain. Defaults to all OSD's of
+                the cluster on this node.
+            weight_start : Weight the OSD's have now. Defaults to the current
+                weight of each OSD.
+            weight_target : Weight to end with. Defaults to 0.
+            step : Fraction of the distance from each OSD's starting weight
+                to weight_target changed per step. Defaults to 0.1.
+            crush : Change the CRUSH weight rather than the reweight value.
+                Defaults to False.
+            deadline : Seconds allowed for the whole drain. Defaults to 12
+                hours.
+            interval : Seconds between checks of the cluster state. Defaults
+                to 10.
+
+    The progress is saved while the drain runs, see osd_drain_progress, and
+    it can be paused with osd_drain_pause.
+
+    Returns the final progress of the drain.
+    """
+    return session.session_default(**kwargs).osd_drain(**kwargs)
+
+
+def osd_drain_progress(**kwargs):
+    """
+    Progress of the running or last drain of the cluster.
+
+    Args:
+        **kwargs: Arbitrary keyword arguments.
+            cluster_name : Set the cluster name. Defaults to "ceph".
+            cluster_uuid : Set the cluster date will be added too. Defaults to
+                the value found in local config.
+
+    Returns the saved progress, None if no drain has run.
+    """
+    return session.session_default(**kwargs).osd_drain_progress()
+
+
+def osd_drain_pause(**kwargs):
+    """
+    Pause a drain of the cluster running in another process.
+
+    Args:
+        **kwargs: Arbitrary keyword arguments.
+            cluster_name : Set the cluster name. Defaults to "ceph".
+            cluster_uuid : Set the cluster date will be added too. Defaults to
+                the value found in local config.
+    """
+    return session.session_default(**kwargs).osd_drain_pause(True)
+
+
+def osd_drain_resume(**kwargs):
+    """
+    Resume a drain paused with osd_drain_pause.
+
+    Args:
+        **kwargs: Arbitrary keyword arguments.
+            cluster_name : Set the cluster name. Defaults to "ceph".
+            cluster_uuid : Set the cluster date will be added too. Defaults to
+                the value found in local config.
+    """
+    return session.session_default(**kwargs).osd_drain_pause(False)
 
 
 def keyring_create(**kwargs):
@@ -684,7 +885,7 @@ def mon_is(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    ctrl_mon = mon.mon_facard(**kwargs)
+    ctrl_mon = session.session_default(**kwargs).mon_facard(**kwargs)
     return ctrl_mon.is_mon()
 
 
@@ -698,7 +899,7 @@ def mon_status(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    ctrl_mon = mon.mon_facard(**kwargs)
+    ctrl_mon = session.session_default(**kwargs).mon_facard(**kwargs)
     return ctrl_mon.status()
 
 def mon_quorum(**kwargs):
@@ -711,7 +912,7 @@ def mon_quorum(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    ctrl_mon = mon.mon_facard(**kwargs)
+    ctrl_mon = session.session_default(**kwargs).mon_facard(**kwargs)
     return ctrl_mon.quorum()
 
 
@@ -726,7 +927,7 @@ def mon_active(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    ctrl_mon = mon.mon_facard(**kwargs)
+    ctrl_mon = session.session_default(**kwargs).mon_facard(**kwargs)
     return ctrl_mon.active()
 
 
@@ -739,25 +940,25 @@ def mon_create(**kwargs):
             cluster_uuid : Set the cluster UUID. Defaults to value found in
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
+            bootstrap_keys : Add the osd, mds and rgw bootstrap keyrings
+                present on this node to the new mon store. Defaults to False.
     """
-    ctrl_mon = mon.mon_facard(**kwargs)
-    return ctrl_mon.create()
+    ctrl_mon = session.session_default(**kwargs).mon_facard(**kwargs)
+    return ctrl_mon.create(**kwargs)
 
 
 def rgw_pools_create(**kwargs):
     """
     Create pools for rgw
     """
-    ctrl_rgw = rgw.rgw_ctrl(**kwargs)
-    ctrl_rgw.update()
+    ctrl_rgw = session.session_default(**kwargs).rgw_ctrl(**kwargs)
     return ctrl_rgw.rgw_pools_create()
 
 def rgw_pools_missing(**kwargs):
     """
     Show pools missing for rgw
     """
-    ctrl_rgw = rgw.rgw_ctrl(**kwargs)
-    ctrl_rgw.update()
+    ctrl_rgw = session.session_default(**kwargs).rgw_ctrl(**kwargs)
     return ctrl_rgw.rgw_pools_missing()
 
 
@@ -771,8 +972,7 @@ def rgw_create(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    ctrl_rgw = rgw.rgw_ctrl(**kwargs)
-    ctrl_rgw.update()
+    ctrl_rgw = session.session_default(**kwargs).rgw_ctrl(**kwargs)
     return ctrl_rgw.create()
 
 
@@ -786,8 +986,7 @@ def rgw_destroy(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    ctrl_rgw = rgw.rgw_ctrl(**kwargs)
-    ctrl_rgw.update()
+    ctrl_rgw = session.session_default(**kwargs).rgw_ctrl(**kwargs)
     return ctrl_rgw.destroy()
 
 
@@ -802,8 +1001,7 @@ def mds_create(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    ctrl_mds = mds.mds_ctrl(**kwargs)
-    ctrl_mds.update()
+    ctrl_mds = session.session_default(**kwargs).mds_ctrl(**kwargs)
     return ctrl_mds.create()
 
 
@@ -817,8 +1015,7 @@ def mds_destroy(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    ctrl_mds = mds.mds_ctrl(**kwargs)
-    ctrl_mds.update()
+    ctrl_mds = session.session_default(**kwargs).mds_ctrl(**kwargs)
     return ctrl_mds.destroy()
 
 
@@ -832,19 +1029,7 @@ def keyring_auth_list(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    try:
-        u.defaults_refresh()
-    except:
-        return {}
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    auth_ops = ops_auth.ops_auth(m)
-    auth_ops.auth_list()
-    p = presenter.mdl_presentor(m)
-    return p.auth_list()
+    return session.session_default(**kwargs).keyring_auth_list()
 
 
 def pool_list(**kwargs):
@@ -857,19 +1042,7 @@ def pool_list(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    try:
-        u.defaults_refresh()
-    except:
-        return {}
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    pool_ops = ops_pool.ops_pool(m)
-    pool_ops.pool_list()
-    p = presenter.mdl_presentor(m)
-    return p.pool_list()
+    return session.session_default(**kwargs).pool_list()
 
 
 
@@ -889,15 +1062,7 @@ def pool_add(pool_name, **kwargs):
             erasure_code_profile : Set the "erasure_code_profile"
             crush_ruleset : Set the crush map rule set
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    pool_ops = ops_pool.ops_pool(m)
-    pool_ops.pool_list()
-    return pool_ops.pool_add(pool_name, **kwargs)
+    return session.session_default(**kwargs).pool_add(pool_name, **kwargs)
 
 
 def pool_del(pool_name, **kwargs):
@@ -911,15 +1076,7 @@ def pool_del(pool_name, **kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    pool_ops = ops_pool.ops_pool(m)
-    pool_ops.pool_list()
-    return pool_ops.pool_del(pool_name)
+    return session.session_default(**kwargs).pool_del(pool_name)
 
 
 def purge(**kwargs):
@@ -940,11 +1097,7 @@ def ceph_version():
     """
     Get the version of ceph installed
     """
-    m = model.model()
-    u = mdl_updater.model_updater(m)
-    u.ceph_version_refresh()
-    p = presenter.mdl_presentor(m)
-    return p.ceph_version()
+    return session.session_default().ceph_version()
 
 
 def cluster_quorum(**kwargs):
@@ -957,16 +1110,7 @@ def cluster_quorum(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    cluster_ops = ops_cluster.ops_cluster(m)
-    cluster_ops.status_refresh()
-    q = mdl_query.mdl_query(m)
-    return q.cluster_quorum()
+    return session.session_default(**kwargs).cluster_quorum()
 
 
 def cluster_status(**kwargs):
@@ -979,16 +1123,7 @@ def cluster_status(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    cluster_ops = ops_cluster.ops_cluster(m)
-    cluster_ops.status_refresh()
-    p = presenter.mdl_presentor(m)
-    return p.cluster_status()
+    return session.session_default(**kwargs).cluster_status()
 
 
 def cephfs_ls(**kwargs):
@@ -1001,16 +1136,7 @@ def cephfs_ls(**kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    cephfs_ops = ops_cephfs.ops_cephfs(m)
-    cephfs_ops.cephfs_list()
-    p = presenter.mdl_presentor(m)
-    return p.cephfs_list()
+    return session.session_default(**kwargs).cephfs_ls()
 
 
 def cephfs_add(fs_name, **kwargs):
@@ -1026,18 +1152,7 @@ def cephfs_add(fs_name, **kwargs):
             pool_data : ceph pool to store data in.
             pool_metadata : ceph pool to store file system metadata in.
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    pool_ops = ops_pool.ops_pool(m)
-    pool_ops.pool_list()
-    # list the cephfs so we can check we need to do some thing
-    cephfs_ops = ops_cephfs.ops_cephfs(m)
-    cephfs_ops.cephfs_list()
-    return cephfs_ops.cephfs_add(fs_name, **kwargs)
+    return session.session_default(**kwargs).cephfs_add(fs_name, **kwargs)
 
 
 def cephfs_del(fs_name, **kwargs):
@@ -1051,13 +1166,4 @@ def cephfs_del(fs_name, **kwargs):
                 ceph config file.
             cluster_name : Set the cluster name. Defaults to "ceph".
     """
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    cephfs_ops = ops_cephfs.ops_cephfs(m)
-    # list the cephfs so we can check we need to do some thing
-    cephfs_ops.cephfs_list()
-    return cephfs_ops.cephfs_del(fs_name, **kwargs)
+    return session.session_default(**kwargs).cephfs_del(fs_name, **kwargs)
@@ -0,0 +1,136 @@
+# Import Python Libs
+from __future__ import absolute_import
+import functools
+import glob
+import json
+import logging
+import os
+import socket
+import struct
+
+# Local imports
+from . import constants
+from . import util_parallel
+
+
+log = logging.getLogger(__name__)
+
+
+# Seconds allowed for connecting to, and each read from, an admin socket
+timeout_default = 5
+
+# Largest reply accepted, guards against reading a corrupt length
+reply_size_max = 64 * 1024 * 1024
+
+_struct_length = struct.Struct(">I")
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def path_get(cluster_name, daemon_type, identifier):
+    """
+    Admin socket path of a local daemon, e.g. /var/run/ceph/ceph-mon.a.asok
+    """
+    return os.path.join(constants._path_ceph_run, "%s-%s.%s.asok" % (
+        cluster_name,
+        daemon_type,
+        identifier))
+
+
+def sockets_list(cluster_name):
+    """
+    Admin sockets of all local daemons of the cluster
+    """
+    pattern = os.path.join(constants._path_ceph_run, "%s-*.asok" % (cluster_name))
+    return sorted(glob.glob(pattern))
+
+
+def _recv_exact(conn, length):
+    chunks = []
+    remaining = length
+    while remaining > 0:
+        chunk = conn.recv(min(remaining, 65536))
+        if len(chunk) == 0:
+            raise Error("Connection closed before reply was complete")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def command_raw(path, request, timeout=timeout_default):
+    """
+    Send a request to an admin socket and return the reply bytes.
+
+    The daemon reads the request up to a NUL byte, replies with a 32 bit
+    big endian length and the data, then closes the connection. As the
+    daemon closes every connection there is nothing to reuse, each request
+    costs one connect on the local socket, which is far cheaper than
+    starting the ceph CLI.
+    """
+    if not isinstance(request, bytes):
+        request = request.encode('utf-8')
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.settimeout(timeout)
+        try:
+            conn.connect(path)
+            conn.sendall(request + b"\0")
+            length, = _struct_length.unpack(_recv_exact(conn, _struct_length.size))
+            if length > reply_size_max:
+                raise Error("Reply too large", path, length)
+            return _recv_exact(conn, length)
+        except (socket.error, socket.timeout) as err:
+            raise Error("Failed talking to admin socket", path, err)
+    finally:
+        conn.close()
+
+
+def command(path, prefix, timeout=timeout_default, **kwargs):
+    """
+    Run a command on an admin socket, returning the parsed JSON reply.
+
+    Extra keyword arguments are passed to the daemon as command arguments.
+    """
+    request = dict(kwargs)
+    request["prefix"] = prefix
+    request["format"] = "json"
+    reply = command_raw(path, json.dumps(request, sort_keys=True), timeout)
+    try:
+        return json.loads(reply.decode('utf-8'))
+    except ValueError:
+        raise Error("Invalid reply", path, prefix, reply[:200])
+
+
+def command_many(requests, parallelism=util_parallel.parallelism_default,
+        timeout=timeout_default):
+    """
+    Run (path, prefix) requests on many admin sockets at the same time.
+
+    Returns per request the path, prefix, result, error and seconds taken,
+    in the order given. A failing socket does not stop the others.
+    """
+    tasks = []
+    for path, prefix in requests:
+        tasks.append(((path, prefix), functools.partial(command, path, prefix, timeout)))
+    output = []
+    for task_result in util_parallel.run(tasks, parallelism):
+        path, prefix = task_result.key
+        error = None
+        if task_result.error is not None:
+            error = str(task_result.error)
+        output.append({
+            "path" : path,
+            "prefix" : prefix,
+            "result" : task_result.result,
+            "error" : error,
+            "seconds" : task_result.seconds
+            })
+    return output
@@ -10,6 +10,15 @@ _path_ceph_lib_mon = os.path.join(_path_ceph_lib,"mon")
 _path_ceph_lib_rgw = os.path.join(_path_ceph_lib,"radosgw")
 _path_ceph_lib_mds = os.path.join(_path_ceph_lib,"mds")
 
+# Daemon admin sockets live here
+_path_ceph_run = "/var/run/ceph"
+
+# Results that are expensive to find are cached here between processes.
+_path_cache = "/var/cache/ceph-cfg"
+
 
 # Make time out in seconds for remote operations
 ceph_remote_call_timeout = 20
+
+# Seconds a cached connection keyring choice is trusted
+connection_cache_ttl = 3600
@@ -67,6 +67,62 @@ def _keying_write(key_path,content):
     return
 
 
+def keyring_sections(content):
+    """
+    Parse keyring content to a list of (entity name, lines)
+    """
+    sections = []
+    lines = None
+    for line in content.split('\n'):
+        stripped = line.strip()
+        if len(stripped) == 0:
+            continue
+        if stripped[0] in ['#', ';']:
+            continue
+        if stripped[0] == '[' and stripped[-1] == ']':
+            lines = []
+            sections.append((stripped[1:-1].strip(), lines))
+            continue
+        if lines is None:
+            raise Error("Invalid keyring, entry outside a section", stripped)
+        lines.append(stripped)
+    return sections
+
+
+def keyring_merge(paths, key_path):
+    """
+    Write the entities of many keyrings to one keyring.
+
+    Does what a ceph-authtool --import-keyring per keyring would, an entity
+    in a later keyring replaces the same entity from an earlier one. The
+    result is written with owner only permissions and renamed into place.
+
+    Returns the entity names written.
+    """
+    names = []
+    entities = {}
+    for path in paths:
+        for name, lines in keyring_sections(_keying_read(path)):
+            if not name in entities:
+                names.append(name)
+            entities[name] = lines
+    dirname = os.path.dirname(os.path.abspath(key_path))
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    handle, path_tmp = tempfile.mkstemp(dir=dirname, prefix=".keyring-")
+    try:
+        with os.fdopen(handle, 'w') as outfile:
+            for name in names:
+                outfile.write('[%s]\n' % (name))
+                for line in entities[name]:
+                    outfile.write('\t%s\n' % (line))
+        os.rename(path_tmp, key_path)
+    finally:
+        if os.path.isfile(path_tmp):
+            os.remove(path_tmp)
+    return names
+
+
 def Property(func):
     return property(**func())
 
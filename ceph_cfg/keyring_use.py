@@ -3,12 +3,7 @@ from __future__ import absolute_import
 import logging
 
 # local modules
-from . import model
-from . import mdl_updater
-from . import keyring
-from . import utils
-from . import mdl_query
-from . import ops_auth
+from . import session
 
 
 log = logging.getLogger(__name__)
@@ -25,19 +20,7 @@ class Error(Exception):
 
 
 def keyring_create_type(**kwargs):
-    keyring_type = kwargs.get("keyring_type")
-    if (keyring_type is None):
-        raise Error("keyring_type is None")
-    secret = kwargs.get("secret")
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    keyobj = keyring.keyring_facard(m)
-    keyobj.key_type = keyring_type
-    return keyobj.create(secret=secret)
+    return session.session_default(**kwargs).keyring_create(**kwargs)
 
 
 def keyring_present_type(**kwargs):
@@ -54,77 +37,19 @@ def keyring_present_type(**kwargs):
             keyring_type
                 Set the keyring type
     """
-    keyring_type = kwargs.get("keyring_type")
-    if (keyring_type is None):
-        raise Error("keyring_type is None")
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    try:
-        u.defaults_refresh()
-    except:
-        pass
-    keyobj = keyring.keyring_facard(m)
-    keyobj.key_type = keyring_type
-    return keyobj.present()
+    return session.session_default(**kwargs).keyring_present(**kwargs)
 
 
 def keyring_purge_type(**kwargs):
-    keyring_type = kwargs.get("keyring_type", None)
-    if (keyring_type is None):
-        raise Error("keyring_type is not set")
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    keyobj = keyring.keyring_facard(m)
-    keyobj.key_type = keyring_type
-    return keyobj.remove()
+    return session.session_default(**kwargs).keyring_purge(**kwargs)
 
 
 def keyring_save_type(**kwargs):
-    keyring_type = kwargs.get("keyring_type")
-    key_content = kwargs.get("key_content")
-    secret = kwargs.get("secret")
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    keyobj = keyring.keyring_facard(m)
-    keyobj.key_type = keyring_type
-    if secret is not None:
-        utils.is_valid_base64(secret)
-        return keyobj.write_secret(secret)
-    if key_content is not None:
-        return keyobj.write_content(key_content)
-    raise Error("Set either the key_content or the key `secret`")
+    return session.session_default(**kwargs).keyring_save(**kwargs)
 
 
 def keyring_auth_add_type(**kwargs):
-    keyring_type = kwargs.get("keyring_type")
-    if (keyring_type is None):
-        raise Error("keyring_type is None")
-    if (keyring_type in set(["mon","admin"])):
-        raise Error("keyring_type is %s" % (keyring_type))
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    q = mdl_query.mdl_query(m)
-    if q.mon_is():
-        u.mon_status()
-    keyobj = keyring.keyring_facard(m)
-    keyobj.key_type = keyring_type
-    if not keyobj.present():
-        raise Error("keyring not present")
-    auth_ops = ops_auth.ops_auth(m)
-    return auth_ops.auth_add(keyring_type)
+    return session.session_default(**kwargs).keyring_auth_add(**kwargs)
 
 
 def keyring_auth_del_type(**kwargs):
@@ -141,26 +66,4 @@ def keyring_auth_del_type(**kwargs):
             cluster_name
                 Set the cluster name. Defaults to "ceph".
     """
-    keyring_type = kwargs.get("keyring_type")
-    if (keyring_type is None):
-        raise Error("keyring_type is None")
-    if (keyring_type in set(["mon","admin"])):
-        raise Error("keyring_type is %s" % (keyring_type))
-    m = model.model(**kwargs)
-    u = mdl_updater.model_updater(m)
-    u.hostname_refresh()
-    u.defaults_refresh()
-    u.load_confg(m.cluster_name)
-    u.mon_members_refresh()
-    q = mdl_query.mdl_query(m)
-    if q.mon_is():
-        u.mon_status()
-    keyobj = keyring.keyring_facard(m)
-    keyobj.key_type = keyring_type
-    if not keyobj.present():
-        raise Error("keyring not present")
-    auth_ops = ops_auth.ops_auth(m)
-    return auth_ops.auth_del(keyring_type)
-
-
-
+    return session.session_default(**kwargs).keyring_auth_del(**kwargs)
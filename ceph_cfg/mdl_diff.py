@@ -0,0 +1,112 @@
+# Import Python Libs
+from __future__ import absolute_import
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+# Sections of a snapshot as made by presenter.mdl_presentor.discovery_snapshot,
+# each is a dictionary of records by name.
+snapshot_sections = ["disks", "partitions", "osd", "journals"]
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def _diff_fields(old, new):
+    """
+    Field level changes between two records.
+
+    Each changed field maps to a dictionary with 'old' and 'new' values, a
+    missing key means the field was not present.
+    """
+    output = {}
+    for field in set(old.keys()).union(new.keys()):
+        in_old = field in old
+        in_new = field in new
+        if in_old and in_new and old[field] == new[field]:
+            continue
+        change = {}
+        if in_old:
+            change["old"] = old[field]
+        if in_new:
+            change["new"] = new[field]
+        output[field] = change
+    return output
+
+
+def _diff_section(old, new):
+    added = {}
+    removed = []
+    changed = {}
+    for name in new.keys():
+        if not name in old:
+            added[name] = new[name]
+            continue
+        fields = _diff_fields(old[name], new[name])
+        if len(fields) > 0:
+            changed[name] = fields
+    for name in old.keys():
+        if not name in new:
+            removed.append(name)
+    output = {}
+    if len(added) > 0:
+        output["added"] = added
+    if len(removed) > 0:
+        output["removed"] = sorted(removed)
+    if len(changed) > 0:
+        output["changed"] = changed
+    return output
+
+
+def diff(old, new):
+    """
+    Compare two snapshots.
+
+    Returns a dictionary by section of added records, removed record names
+    and field level changes. Sections without changes are left out, so
+    identical snapshots give an empty dictionary.
+    """
+    output = {}
+    for section in snapshot_sections:
+        section_old = old.get(section, {})
+        section_new = new.get(section, {})
+        section_diff = _diff_section(section_old, section_new)
+        if len(section_diff) > 0:
+            output[section] = section_diff
+    return output
+
+
+def patch(old, delta):
+    """
+    Apply a delta from diff to a snapshot, returning the new snapshot.
+    """
+    output = {}
+    for section in snapshot_sections:
+        records = {}
+        for name, record in old.get(section, {}).items():
+            records[name] = dict(record)
+        section_delta = delta.get(section, {})
+        for name in section_delta.get("removed", []):
+            records.pop(name, None)
+        for name, record in section_delta.get("added", {}).items():
+            records[name] = dict(record)
+        for name, fields in section_delta.get("changed", {}).items():
+            record = records.get(name)
+            if record is None:
+                raise Error("Delta changes missing record", section, name)
+            for field, change in fields.items():
+                if "new" in change:
+                    record[field] = change["new"]
+                    continue
+                record.pop(field, None)
+        output[section] = records
+    return output
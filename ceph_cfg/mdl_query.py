@@ -61,6 +61,8 @@ class mdl_query():
         """
         Present the cluster quorum status
         """
+        if self.model.quorum_status is not None:
+            return len(self.model.quorum_status.get("quorum", [])) > 0
         if self.model.cluster_status is None:
             log.debug("self.model.cluster_status is None")
             return False
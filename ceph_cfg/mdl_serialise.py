@@ -0,0 +1,255 @@
+# Import Python Libs
+from __future__ import absolute_import
+import json
+import logging
+
+# Local imports
+from . import model
+from . import mdl_updater
+
+
+log = logging.getLogger(__name__)
+
+
+# Layout of the serialised model:
+#
+#   header       one line of JSON ending in a newline, with
+#       format       always format_name
+#       version      format_version, readers refuse other versions
+#       meta         host level model data
+#       disks        [name, offset, length] of each disk record
+#   records      one JSON object per disk with its lsblk, parted and
+#                symlink data, separated by commas
+#
+# Offsets are relative to the start of the records, so model_reader only
+# decodes the header when opened and disk() decodes a single record. The
+# records joined by commas form a JSON array body, so a full load is one
+# json.loads call.
+#
+# JSON has no sets or tuples, so sets are stored as sorted lists and
+# restored on load. discovered_osd is stored as [ceph_fsid, osd_list]
+# pairs as its keys may be None.
+format_name = "ceph-cfg-model"
+format_version = 2
+
+_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def _version_to_dict(version):
+    return {
+        "major" : version.major,
+        "minor" : version.minor,
+        "revision" : version.revision,
+        "uuid" : version.uuid
+        }
+
+
+def _version_from_dict(version, data):
+    version.major = data.get("major")
+    version.minor = data.get("minor")
+    version.revision = data.get("revision")
+    version.uuid = data.get("uuid")
+
+
+def dumps(mdl):
+    """
+    Serialise the model to bytes.
+    """
+    disk_names = sorted(set(mdl.lsblk.keys()).union(mdl.parted.keys()))
+    disks = {}
+    symlinks_used = set()
+    for disk_name in disk_names:
+        disk_lsblk = mdl.lsblk.get(disk_name)
+        devices = [disk_name]
+        if disk_lsblk is not None:
+            devices.extend(disk_lsblk.get("PARTITION", {}).keys())
+        symlinks = {}
+        for device in devices:
+            device_links = mdl.symlinks.get(device)
+            if device_links is None:
+                continue
+            symlinks[device] = device_links
+            symlinks_used.add(device)
+        disks[disk_name] = {
+            "lsblk" : disk_lsblk,
+            "parted" : mdl.parted.get(disk_name),
+            "symlinks" : symlinks,
+            }
+    symlinks_other = {}
+    for device, device_links in mdl.symlinks.items():
+        if not device in symlinks_used:
+            symlinks_other[device] = device_links
+    meta = {
+        "hostname" : mdl.hostname,
+        "cluster_name" : mdl.cluster_name,
+        "cluster_uuid" : mdl.cluster_uuid,
+        "ceph_version" : _version_to_dict(mdl.ceph_version),
+        "lsblk_version" : _version_to_dict(mdl.lsblk_version),
+        "mon_members" : [list(member) for member in mdl.mon_members],
+        "mon_status" : mdl.mon_status,
+        "partitions_osd" : sorted(mdl.partitions_osd),
+        "partitions_journal" : sorted(mdl.partitions_journal),
+        "discovered_osd" : [[ceph_fsid, osd_list] for ceph_fsid, osd_list
+            in mdl.discovered_osd.items()],
+        "symlinks" : symlinks_other,
+        }
+    index = []
+    records = []
+    offset = 0
+    try:
+        for disk_name in disk_names:
+            record = _encoder.encode(disks[disk_name]).encode('utf-8')
+            index.append([disk_name, offset, len(record)])
+            records.append(record)
+            offset += len(record) + 1
+        header = _encoder.encode({
+            "format" : format_name,
+            "version" : format_version,
+            "meta" : meta,
+            "disks" : index,
+            })
+    except (TypeError, ValueError) as err:
+        raise Error("Unsupported model data", err)
+    return b"".join([header.encode('utf-8'), b"\n", b",".join(records)])
+
+
+class model_reader(object):
+    """
+    Read a serialised model.
+
+    Only the header is decoded on creation, disks are decoded when
+    requested.
+    """
+    def __init__(self, data):
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        self.data = data
+        end = data.find(b"\n")
+        if end < 0:
+            raise Error("Invalid data", "no header")
+        try:
+            header = json.loads(data[:end].decode('utf-8'))
+        except ValueError as err:
+            raise Error("Invalid data", err)
+        if not isinstance(header, dict) or header.get("format") != format_name:
+            raise Error("Invalid format")
+        version = header.get("version")
+        if version != format_version:
+            raise Error("Unsupported format version", version)
+        self._records_pos = end + 1
+        self._meta = header.get("meta", {})
+        self._disk_names = []
+        self._disk_index = {}
+        for name, offset, length in header.get("disks", []):
+            self._disk_names.append(name)
+            self._disk_index[name] = (offset, length)
+        if len(self._disk_names) > 0:
+            offset, length = self._disk_index[self._disk_names[-1]]
+            if self._records_pos + offset + length != len(data):
+                raise Error("Invalid data", "records do not match the index")
+
+
+    def meta(self):
+        """
+        Host level model data.
+        """
+        return self._meta
+
+
+    def disks(self):
+        """
+        Names of all disks.
+        """
+        return list(self._disk_names)
+
+
+    def disk(self, name):
+        """
+        Decode one disk.
+
+        Returns a dictionary with the disk's "lsblk", "parted" and "symlinks"
+        data as stored in the model.
+        """
+        position = self._disk_index.get(name)
+        if position is None:
+            raise Error("Disk not found", name)
+        start = self._records_pos + position[0]
+        try:
+            return json.loads(self.data[start:start + position[1]].decode('utf-8'))
+        except ValueError as err:
+            raise Error("Invalid data", name, err)
+
+
+    def records(self):
+        """
+        Decode all disks with one json.loads call, in disks() order.
+        """
+        body = b"".join([b"[", self.data[self._records_pos:], b"]"])
+        try:
+            records = json.loads(body.decode('utf-8'))
+        except ValueError as err:
+            raise Error("Invalid data", err)
+        if len(records) != len(self._disk_names):
+            raise Error("Invalid data", "records do not match the index")
+        return records
+
+
+    def load(self, mdl=None):
+        """
+        Decode everything into a model, a new model is made if none is given.
+        """
+        if mdl is None:
+            mdl = model.model()
+        meta = self.meta()
+        mdl.hostname = meta.get("hostname")
+        mdl.cluster_name = meta.get("cluster_name")
+        mdl.cluster_uuid = meta.get("cluster_uuid")
+        _version_from_dict(mdl.ceph_version, meta.get("ceph_version", {}))
+        _version_from_dict(mdl.lsblk_version, meta.get("lsblk_version", {}))
+        mdl.mon_members = [tuple(member) for member in meta.get("mon_members", [])]
+        mdl.mon_status = meta.get("mon_status")
+        mdl.partitions_osd = set(meta.get("partitions_osd", []))
+        mdl.partitions_journal = set(meta.get("partitions_journal", []))
+        mdl.discovered_osd = dict((ceph_fsid, osd_list) for ceph_fsid, osd_list
+            in meta.get("discovered_osd", []))
+        symlinks = dict(meta.get("symlinks", {}))
+        lsblk = {}
+        parted = {}
+        part_pairent = {}
+        records = self.records()
+        for index in range(len(records)):
+            disk_name = self._disk_names[index]
+            record = records[index]
+            disk_lsblk = record.get("lsblk")
+            if disk_lsblk is not None:
+                lsblk[disk_name] = disk_lsblk
+                for part_name in disk_lsblk.get("PARTITION", {}).keys():
+                    part_pairent[part_name] = disk_name
+            disk_parted = record.get("parted")
+            if disk_parted is not None:
+                parted[disk_name] = disk_parted
+            symlinks.update(record.get("symlinks", {}))
+        mdl.lsblk = lsblk
+        mdl.parted = parted
+        mdl.part_pairent = part_pairent
+        mdl.symlinks = symlinks
+        u = mdl_updater.model_updater(mdl)
+        u.index_refresh()
+        return mdl
+
+
+def loads(data, mdl=None):
+    """
+    Deserialise a model from bytes.
+    """
+    return model_reader(data).load(mdl)
@@ -8,13 +8,13 @@ import platform
 import logging
 import shlex
 import tempfile
-import json
 try:
     import ConfigParser
 except:
     import configparser as ConfigParser
 
 # local modules
+from . import admin_socket
 from . import constants
 from . import utils
 from . import util_which
@@ -93,6 +93,95 @@ class model_updater():
     def __init__(self, model):
         self.model = model
 
+
+    def _generation_bump(self):
+        """
+        Mark discovered device data as changed
+        """
+        self.model.generation += 1
+
+
+    def _index_partitions_clear(self):
+        self.model.idx_partition = {}
+        self.model.idx_partuuid = {}
+        self.model.idx_parttype = {}
+        self.model.idx_fstype = {}
+        self.model.idx_mountpoint = {}
+        self.model.idx_dev_parent = {}
+
+
+    def _index_partition_add(self, part_name, partition):
+        """
+        Add a partition discovered with lsblk to the secondary indexes
+        """
+        self.model.idx_partition[part_name] = partition
+        part_uuid = partition.get("PARTUUID")
+        if part_uuid is not None:
+            self.model.idx_partuuid[part_uuid] = part_name
+        part_type = partition.get("PARTTYPE")
+        if part_type is not None:
+            self.model.idx_parttype.setdefault(part_type, set()).add(part_name)
+        fs_type = partition.get("FSTYPE")
+        if fs_type is not None:
+            self.model.idx_fstype.setdefault(fs_type, set()).add(part_name)
+        mount_point = partition.get("MOUNTPOINT")
+        if mount_point is not None:
+            self.model.idx_mountpoint[mount_point] = part_name
+
+
+    def _index_osd_clear(self):
+        self.model.idx_osd_fsid = {}
+        self.model.idx_journal_uuid = {}
+        self.model.idx_whoami = {}
+        self.model.idx_osd_dev = {}
+
+
+    def _index_osd_add(self, osd_md):
+        """
+        Add discovered OSD details to the secondary indexes
+        """
+        osd_fsid = osd_md.get("fsid")
+        if osd_fsid is not None:
+            self.model.idx_osd_fsid[osd_fsid] = osd_md
+        journal_uuid = osd_md.get("journal_uuid")
+        if journal_uuid is not None:
+            self.model.idx_journal_uuid[journal_uuid] = osd_md
+        whoami = osd_md.get("whoami")
+        if whoami is not None:
+            self.model.idx_whoami[(osd_md.get("ceph_fsid"), whoami)] = osd_md
+        osd_dev = osd_md.get("dev")
+        if osd_dev is not None:
+            self.model.idx_osd_dev[osd_dev] = osd_md
+
+    def _index_disk_osd_refresh(self):
+        disk_osd = {}
+        for part_name in self.model.partitions_osd:
+            disk_name = self.model.part_pairent.get(part_name)
+            if disk_name is None:
+                continue
+            disk_osd.setdefault(disk_name, set()).add(part_name)
+        self.model.idx_disk_osd = disk_osd
+
+
+    def index_refresh(self):
+        '''
+        Rebuild all secondary indexes from the model content
+        '''
+        self._index_partitions_clear()
+        for disk_details in self.model.lsblk.values():
+            disk_parts = disk_details.get("PARTITION")
+            if disk_parts is None:
+                continue
+            for part_name, partition in disk_parts.items():
+                self._index_partition_add(part_name, partition)
+        self._index_osd_clear()
+        for osd_list in self.model.discovered_osd.values():
+            for osd_md in osd_list:
+                self._index_osd_add(osd_md)
+        self._index_disk_osd_refresh()
+        self._generation_bump()
+
+
     def hostname_refresh(self):
         self.model.hostname = platform.node().split('.')[0]
 
@@ -128,6 +217,7 @@ class model_updater():
                     paths[real_path] = []
                 paths[real_path].append(file_path)
         self.model.symlinks = paths
+        self._generation_bump()
 
 
     def lsblk_version_refresh(self):
@@ -199,6 +289,7 @@ class model_updater():
         if output['retcode'] != 0:
             raise Error("Failed running: lsblk --ascii --output-all")
         all_parts = {}
+        self._index_partitions_clear()
         for line in output['stdout'].split('\n'):
             partition = {}
             for token in shlex.split(line):
@@ -225,8 +316,10 @@ class model_updater():
             if None == all_parts[disk_name].get("PARTITION"):
                 all_parts[disk_name]["PARTITION"] = {}
             all_parts[disk_name]["PARTITION"][part_name] = partition
+            self._index_partition_add(part_name, partition)
         self.model.lsblk = all_parts
         self.model.part_pairent = part_map
+        self._generation_bump()
 
 
     def partitions_all_refresh_parted(self):
@@ -292,6 +385,7 @@ class model_updater():
                 parted_dict_disk['partition'][part_path] = part_line_dict
             parted_dict[disk_line_split[0]] = parted_dict_disk
         self.model.parted = parted_dict
+        self._generation_bump()
 
 
     def partitions_all_refresh(self):
@@ -352,6 +446,7 @@ class model_updater():
         # Now we combine our data to find incorrectly labeled OSD's
         # and build osd data structure discovered_osd
         discovered_osd = {}
+        self._index_osd_clear()
         for osd_dev_data in osd_details.keys():
             # Agregate data into osd_all.
             osd_all.add(osd_dev_data)
@@ -370,9 +465,12 @@ class model_updater():
             if not ceph_fsid in discovered_osd.keys():
                 discovered_osd[ceph_fsid] = []
             discovered_osd[ceph_fsid].append(osd_md)
+            self._index_osd_add(osd_md)
         self.model.partitions_osd = osd_all
         self.model.partitions_journal = journal_all
         self.model.discovered_osd = discovered_osd
+        self._index_disk_osd_refresh()
+        self._generation_bump()
 
 
     def load_confg(self, cluster_name):
@@ -417,22 +515,12 @@ class model_updater():
             raise Error("Hostname not set")
         if self.model.cluster_name is None:
             raise Error("cluster_name not set")
-        arguments = [
-            "ceph",
-            "--cluster=%s" % (self.model.cluster_name),
-            "--admin-daemon",
-            "/var/run/ceph/ceph-mon.%s.asok" % (self.model.hostname),
-            "mon_status"
-            ]
-        output = utils.execute_local_command(arguments)
-        if output["retcode"] != 0:
-            raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
-                        " ".join(arguments),
-                        output["retcode"],
-                        output["stdout"],
-                        output["stderr"])
-                        )
-        self.model.mon_status = json.loads(output['stdout'])
+        path = admin_socket.path_get(self.model.cluster_name, "mon",
+            self.model.hostname)
+        try:
+            self.model.mon_status = admin_socket.command(path, "mon_status")
+        except admin_socket.Error as err:
+            raise Error("Failed to get mon status", err)
 
 
     def ceph_version_refresh(self):
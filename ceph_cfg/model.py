@@ -30,6 +30,8 @@ class connection(object):
         self.keyring_type = kwargs.get("keyring_type")
         self.keyring_path = kwargs.get("keyring_path")
         self.keyring_identity = kwargs.get("keyring_identity")
+        # True when the keyring was chosen from the connection cache
+        self.keyring_cached = kwargs.get("keyring_cached", False)
 
 
 class model(object):
@@ -47,6 +49,39 @@ class model(object):
         self.part_pairent = {}
         self.partitions_osd = {}
         self.partitions_journal = {}
+        # Discovered OSD details by cluster uuid
+        self.discovered_osd = {}
+        # Secondary indexes maintained by mdl_updater, so queries do not need
+        # to walk the nested lsblk and discovered_osd structures.
+        # map partition to lsblk partition details
+        self.idx_partition = {}
+        # map PARTUUID to partition
+        self.idx_partuuid = {}
+        # map PARTTYPE to set of partitions
+        self.idx_parttype = {}
+        # map FSTYPE to set of partitions
+        self.idx_fstype = {}
+        # map mount point to partition
+        self.idx_mountpoint = {}
+        # map OSD fsid to OSD details
+        self.idx_osd_fsid = {}
+        # map journal uuid to OSD details
+        self.idx_journal_uuid = {}
+        # map OSD (ceph_fsid, whoami) to OSD details, OSD's of different
+        # clusters on one host can share a whoami
+        self.idx_whoami = {}
+        # map OSD data partition to OSD details
+        self.idx_osd_dev = {}
+        # map disk to set of OSD partitions
+        self.idx_disk_osd = {}
+        # map device (major, minor) to parent disk name, None for disks
+        self.idx_dev_parent = {}
+        # Incremented by mdl_updater whenever discovered devices change.
+        self.generation = 0
+        # Presented device details cached by mdl_presentor for generation
+        self.presented_generation = None
+        self.presented_disks = {}
+        self.presented_partitions = {}
         self.ceph_conf = ConfigParser()
         # list of (hostname,addr) touples
         self.mon_members = []
@@ -56,6 +91,12 @@ class model(object):
         self.lsblk_version = version()
         # Result of local query of mon status
         self.mon_status = None
+        # Result of cluster status query
+        self.cluster_status = None
+        # Result of quorum query, only the quorum members are relied on
+        self.quorum_status = None
+        # Epoch of each cluster map the cached lists were read at
+        self.map_epochs = {}
         # Remote connection details
         self.connection = connection()
 
@@ -1,13 +1,14 @@
 # Import Python Libs
 from __future__ import absolute_import
+import hashlib
 import logging
 import os
 import pwd
 import tempfile
 import shutil
-import time
 
 # Local imports
+from . import admin_socket
 from . import keyring
 from . import mdl_query
 from . import mdl_updater
@@ -16,6 +17,8 @@ from . import presenter
 from . import utils
 from . import service
 from . import util_which
+from . import util_cache
+from . import util_wait
 
 
 log = logging.getLogger(__name__)
@@ -45,42 +48,66 @@ class mon_implementation_base(object):
         return utils.execute_local_command(arguments)
 
 
+    def _monmap_cache_name(self):
+        """
+        Cache name for the monmap of the current fsid and mon members
+        """
+        digest = hashlib.sha256()
+        digest.update(self.model.cluster_uuid.encode('utf-8'))
+        for name, addr in self.model.mon_members:
+            digest.update(b"\0")
+            digest.update(name.encode('utf-8'))
+            digest.update(b"\0")
+            digest.update(addr.encode('utf-8'))
+        return "monmap-%s" % (digest.hexdigest())
+
+
     def _create_monmap(self, path_monmap):
         """
         create_monmap file
+
+        All mon members are added by one monmaptool call writing a temporary
+        file that is renamed into place, so a failure never leaves a half
+        built monmap. The result is cached by fsid and mon members so that
+        retries reuse it.
         """
-        if not os.path.isfile(path_monmap):
+        if os.path.isfile(path_monmap):
+            return True
+        cache_name = self._monmap_cache_name()
+        if util_cache.file_load(cache_name, path_monmap):
+            log.debug("Using cached monmap %s" % (cache_name))
+            return True
+        directory = os.path.dirname(os.path.abspath(path_monmap))
+        handle, path_tmp = tempfile.mkstemp(dir=directory, prefix=".monmap-")
+        os.close(handle)
+        try:
             arguments = [
                 "monmaptool",
                 "--create",
+                "--clobber",
                 "--fsid",
                 self.model.cluster_uuid,
-                path_monmap
                 ]
+            for name, addr in self.model.mon_members:
+                arguments += [
+                    "--add",
+                    name,
+                    addr
+                    ]
+            arguments.append(path_tmp)
             output = utils.execute_local_command(arguments)
             if output["retcode"] != 0:
-                    raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
-                        " ".join(arguments),
-                        output["retcode"],
-                        output["stdout"],
-                        output["stderr"])
-                        )
-            for name, addr in self.model.mon_members:
-                arguments = [
-                        "monmaptool",
-                        "--add",
-                        name,
-                        addr,
-                        path_monmap
-                        ]
-                output = utils.execute_local_command(arguments)
-                if output["retcode"] != 0:
-                    raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
-                        " ".join(arguments),
-                        output["retcode"],
-                        output["stdout"],
-                        output["stderr"])
-                        )
+                raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
+                    " ".join(arguments),
+                    output["retcode"],
+                    output["stdout"],
+                    output["stderr"])
+                    )
+            os.rename(path_tmp, path_monmap)
+        finally:
+            if os.path.isfile(path_tmp):
+                os.remove(path_tmp)
+        util_cache.file_save(cache_name, path_monmap)
         return True
 
 
@@ -181,16 +208,11 @@ class mon_implementation_base(object):
         """
         # Number of seconds before a time out.
         timeout = 60
-        time_start = time.clock()
-        time_end = time_start + timeout
-        if self._create_check_responding():
+        path_asok = admin_socket.path_get(self.model.cluster_name, "mon",
+            self.model.hostname)
+        waiter = util_wait.waiter(timeout, watch_path=path_asok)
+        if waiter.wait(self._create_check_responding):
             return True
-        while time.clock() < time_end:
-            log.info("Mon service did not start up, waiting.")
-            time.sleep(5)
-            log.info("Retrying mon service.")
-            if self._create_check_responding():
-                return True
         log.error("Timed out starting mon service")
         raise Error("Failed to get mon service status after '%s' seconds." % (timeout))
 
@@ -206,7 +228,12 @@ class mon_implementation_base(object):
                     config file.
                 cluster_name
                     Set the cluster name. Defaults to "ceph".
+                bootstrap_keys
+                    Add the osd, mds and rgw bootstrap keyrings present on
+                    this node to the mon store, so no auth import is needed
+                    once the cluster has quorum. Defaults to False.
         """
+        bootstrap_keys = kwargs.get("bootstrap_keys", False)
         if util_which.which_ceph_mon.path is None:
             raise Error("Could not find executable 'ceph-mon'")
 
@@ -272,35 +299,16 @@ class mon_implementation_base(object):
             log.info("Create monmap %s" % (path_monmap))
             self._create_monmap(path_monmap)
             os.chown(path_monmap, self.uid, self.gid)
-            arguments = [
-                util_which.which_ceph_authtool.path,
-                "--create-keyring",
-                key_path,
-                "--import-keyring",
-                keyring_path_mon,
-                ]
-            output = utils.execute_local_command(arguments)
-            if output["retcode"] != 0:
-                raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
-                    " ".join(arguments),
-                    output["retcode"],
-                    output["stdout"],
-                    output["stderr"]
-                    ))
-            arguments = [
-                util_which.which_ceph_authtool.path,
-                key_path,
-                "--import-keyring",
-                path_admin_keyring,
-                ]
-            output = utils.execute_local_command(arguments)
-            if output["retcode"] != 0:
-                raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
-                    " ".join(arguments),
-                    output["retcode"],
-                    output["stdout"],
-                    output["stderr"]
-                    ))
+            keyring_paths = [keyring_path_mon, path_admin_keyring]
+            if bootstrap_keys:
+                for path_bootstrap in [
+                        keyring._get_path_keyring_osd(self.model.cluster_name),
+                        keyring._get_path_keyring_mds(self.model.cluster_name),
+                        keyring._get_path_keyring_rgw(self.model.cluster_name)]:
+                    if os.path.isfile(path_bootstrap):
+                        keyring_paths.append(path_bootstrap)
+            entities = keyring.keyring_merge(keyring_paths, key_path)
+            log.info("Keyring for mkfs has %s" % (", ".join(entities)))
             # Now chown the new file
             os.chown(key_path, self.uid, self.gid)
             # Now clean the install area
@@ -0,0 +1,213 @@
+# Import Python Libs
+from __future__ import absolute_import
+import functools
+import logging
+import socket
+import time
+
+# Local imports
+from . import util_cache
+from . import util_parallel
+
+
+log = logging.getLogger(__name__)
+
+
+# Port used by mons when mon_host gives no port
+port_default = 6789
+
+# Seconds allowed for a TCP connect to a mon
+probe_timeout = 2
+
+# Seconds a mon ranking is reused
+ranking_ttl = 30
+
+# Number of mons passed to the ceph client, None for every reachable mon so
+# the client can hunt to another mon if one stalls.
+targets_count = None
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def addr_parse(addr):
+    """
+    Host and port of a mon_host entry, None if not understood.
+
+    Accepts "host", "host:port", "[v6addr]:port" and a bare IPv6 address,
+    with an optional "v1:" / "v2:" prefix and "/nonce" suffix.
+    """
+    addr = addr.strip()
+    for prefix in ["v1:", "v2:"]:
+        if addr.startswith(prefix):
+            addr = addr[len(prefix):]
+    addr = addr.split("/")[0]
+    if len(addr) == 0:
+        return None
+    if addr.startswith("["):
+        end = addr.find("]")
+        if end < 0:
+            return None
+        host = addr[1:end]
+        port_raw = addr[end + 1:]
+        if len(port_raw) == 0:
+            return (host, port_default)
+        if not port_raw.startswith(":"):
+            return None
+        port_raw = port_raw[1:]
+    elif addr.count(":") == 1:
+        host, port_raw = addr.split(":")
+    else:
+        # A host name, an IPv4 address or a bare IPv6 address
+        return (addr, port_default)
+    try:
+        port = int(port_raw)
+    except ValueError:
+        return None
+    return (host, port)
+
+
+def addr_format(host, port):
+    if ":" in host:
+        return "[%s]:%s" % (host, port)
+    return "%s:%s" % (host, port)
+
+
+def probe(host, port, timeout=probe_timeout):
+    """
+    Seconds taken to open a TCP connection, None if it failed
+    """
+    time_start = time.time()
+    try:
+        conn = socket.create_connection((host, port), timeout)
+    except (socket.error, socket.timeout) as err:
+        log.debug("Mon '%s' not reachable: %s" % (addr_format(host, port), err))
+        return None
+    latency = time.time() - time_start
+    conn.close()
+    return latency
+
+
+class mon_selector(object):
+    """
+    Rank the mons in model.mon_members by connect latency.
+
+    A mon can accept connections while out of quorum, so when the model
+    has a quorum_status only mons in quorum are used, unless none of them
+    is reachable.
+
+    The ranking is cached per cluster for ranking_ttl seconds so that
+    later calls, including from other processes, do not probe again. The
+    quorum it was made with is cached with it, so a ranking made with a
+    different or unknown quorum is not reused.
+    """
+    def __init__(self, model):
+        self.model = model
+
+
+    def _cache_name(self):
+        cluster = self.model.cluster_uuid
+        if cluster is None:
+            cluster = self.model.cluster_name
+        if cluster is None:
+            return None
+        return "mon-ranking-%s" % (cluster)
+
+
+    def _members(self):
+        members = []
+        for name, addr in self.model.mon_members:
+            parsed = addr_parse(addr)
+            if parsed is None:
+                log.debug("Mon '%s' address '%s' not understood" % (name, addr))
+                continue
+            members.append([name, addr_format(parsed[0], parsed[1])])
+        return members
+
+
+    def _quorum_names(self):
+        """
+        Names of the mons in quorum, None if not known
+        """
+        quorum_status = self.model.quorum_status
+        if not isinstance(quorum_status, dict):
+            return None
+        quorum_names = quorum_status.get("quorum_names")
+        if quorum_names is None:
+            return None
+        return sorted(quorum_names)
+
+
+    def _quorum_filter(self, ranking, quorum_names):
+        if quorum_names is None:
+            return ranking
+        in_quorum = [item for item in ranking if item[0] in quorum_names]
+        if len(in_quorum) == 0:
+            log.debug("No mon in quorum is reachable")
+            return ranking
+        return in_quorum
+
+
+    def _probe_all(self, members):
+        tasks = []
+        for name, addr in members:
+            host, port = addr_parse(addr)
+            tasks.append((name, functools.partial(probe, host, port)))
+        results = util_parallel.run(tasks, len(tasks))
+        ranking = []
+        for index in range(len(members)):
+            latency = results[index].result
+            if latency is None:
+                continue
+            ranking.append([members[index][0], members[index][1], latency])
+        ranking.sort(key=lambda item: item[2])
+        return ranking
+
+
+    def ranking(self):
+        """
+        Reachable mons as [name, addr, seconds], fastest first
+        """
+        members = self._members()
+        if len(members) == 0:
+            return []
+        quorum_names = self._quorum_names()
+        cache_name = self._cache_name()
+        if cache_name is not None:
+            cached = util_cache.load(cache_name, ranking_ttl)
+            if (isinstance(cached, dict) and cached.get("members") == members
+                    and cached.get("quorum") == quorum_names):
+                return cached.get("ranking", [])
+        ranking = self._quorum_filter(self._probe_all(members), quorum_names)
+        if cache_name is not None:
+            util_cache.save(cache_name, {
+                "members" : members,
+                "quorum" : quorum_names,
+                "ranking" : ranking
+                })
+        return ranking
+
+
+    def targets(self, count=targets_count):
+        """
+        Addresses of the reachable mons, fastest first
+        """
+        return [addr for name, addr, latency in self.ranking()[:count]]
+
+
+    def arguments_get(self):
+        """
+        ceph client arguments to use the reachable mons, empty if none is
+        known to be reachable so the client falls back to its config.
+        """
+        targets = self.targets()
+        if len(targets) == 0:
+            return []
+        return ["-m", ",".join(targets)]
@@ -5,9 +5,7 @@ import shlex
 
 
 # Local imports
-from . import util_which
 from . import remote_connection
-from . import utils
 from . import keyring
 from . import mdl_query
 
@@ -36,16 +34,11 @@ class ops_auth(object):
 
 
     def auth_list(self):
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             "auth",
             "list"
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
@@ -95,18 +88,13 @@ class ops_auth(object):
         q = mdl_query.mdl_query(self.model)
         if q.mon_is() and q.mon_quorum() is False:
             raise Error("mon daemon is not in quorum")
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             "auth",
             "import",
             "-i",
             keyringobj.keyring_path_get()
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
@@ -126,17 +114,12 @@ class ops_auth(object):
         q = mdl_query.mdl_query(self.model)
         if q.mon_is() and q.mon_quorum() is False:
             raise Error("mon daemon is not in quorum")
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             "auth",
             "del",
             keyringobj.keyring_identity_get()
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
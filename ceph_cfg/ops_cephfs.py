@@ -4,9 +4,7 @@ import logging
 import json
 
 # Local imports
-from . import util_which
 from . import remote_connection
-from . import utils
 
 log = logging.getLogger(__name__)
 
@@ -32,18 +30,13 @@ class ops_cephfs(object):
 
 
     def cephfs_list(self):
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             "-f",
             "json",
             "fs",
             "ls"
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
@@ -104,9 +97,6 @@ class ops_cephfs(object):
             msg = "Invalid pool set for pool_data '{pool_data}'".format(pool_data)
             log.error(msg)
             raise Error(msg)
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             'fs',
             'new',
@@ -114,9 +104,7 @@ class ops_cephfs(object):
             pool_metadata,
             pool_data
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
@@ -130,17 +118,12 @@ class ops_cephfs(object):
         if not cephfs_name in self.model.cephfs_list.keys():
             log.debug("No action needed as '{cephfs_name}' does not exist".format(cephfs_name=cephfs_name))
             return True
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             'fs',
             'rm',
             cephfs_name
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
@@ -5,14 +5,29 @@ import json
 
 
 # Local imports
-from . import util_which
+from . import mdl_query
+from . import mdl_updater
 from . import remote_connection
-from . import utils
 
 
 log = logging.getLogger(__name__)
 
 
+# PG states of active PG's that show data is still moving. PG's that are
+# not active are always unsettled.
+#
+# degraded and undersized are not included, as PG's stay in them while an
+# OSD is down, which data movement does not change.
+pg_states_unsettled = [
+    "backfill_wait",
+    "backfilling",
+    "backfill_toofull",
+    "peering",
+    "recovering",
+    "recovery_wait",
+    ]
+
+
 class Error(Exception):
     """
     Error
@@ -36,19 +51,15 @@ class ops_cluster(object):
         """
         Get the cluster status
 
-        This is not normally needed as connect method has updated this information
+        connect only stores the quorum status, so this is needed before the
+        cluster status is used.
         """
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             "-f",
             "json-pretty",
             "status"
         ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
 
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
@@ -58,3 +69,91 @@ class ops_cluster(object):
                         output["stderr"])
                         )
         self.model.cluster_status = json.loads(output["stdout"].strip())
+
+
+    def _quorum_refresh_local(self):
+        """
+        Quorum from the local mon admin socket, True if the mon is in quorum.
+
+        A mon out of quorum only knows its own view, so the cluster must be
+        asked in that case.
+        """
+        updater = mdl_updater.model_updater(self.model)
+        try:
+            updater.mon_status()
+        except mdl_updater.Error as err:
+            log.debug("Local mon status failed: %s" % (err))
+            return False
+        if not self.model.mon_status.get("state") in ["leader", "peon"]:
+            return False
+        self.model.quorum_status = self.model.mon_status
+        return True
+
+
+    def quorum_refresh(self):
+        """
+        Get the quorum state without a full cluster status
+
+        Uses the local mon admin socket on mon nodes and `quorum_status`
+        otherwise, which the mons answer without summarising the pg and osd
+        maps.
+        """
+        self.model.quorum_status = None
+        if self.model.hostname is not None:
+            query = mdl_query.mdl_query(self.model)
+            if query.mon_is() and self._quorum_refresh_local():
+                return
+        postfix_arguments = [
+            "-f",
+            "json",
+            "quorum_status"
+        ]
+        arguments, output = self.connection.execute(postfix_arguments)
+        if output["retcode"] != 0:
+            raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
+                        " ".join(arguments),
+                        output["retcode"],
+                        output["stdout"],
+                        output["stderr"])
+                        )
+        self.model.quorum_status = json.loads(output["stdout"].strip())
+
+
+    def pg_summary(self):
+        """
+        Summarise the PG states of the last cluster status
+
+        Returns the total PG count, the count by state name and the count of
+        PG's that are inactive or have recovery / backfill outstanding.
+        """
+        if self.model.cluster_status is None:
+            raise Error("cluster status is not known")
+        return pg_summary_parse(self.model.cluster_status)
+
+
+def pg_summary_parse(cluster_status):
+    """
+    PG summary from parsed `ceph status` output, see ops_cluster.pg_summary
+    """
+    pgmap = cluster_status.get("pgmap")
+    if pgmap is None:
+        raise Error("cluster status has no pgmap")
+    output = {
+        "total" : 0,
+        "states" : {},
+        "unsettled" : 0,
+        }
+    for item in pgmap.get("pgs_by_state", []):
+        state_name = item.get("state_name")
+        count = int(item.get("count", 0))
+        output["total"] += count
+        output["states"][state_name] = output["states"].get(state_name, 0) + count
+        states = state_name.split("+")
+        if not "active" in states:
+            output["unsettled"] += count
+            continue
+        for state in states:
+            if state in pg_states_unsettled:
+                output["unsettled"] += count
+                break
+    return output
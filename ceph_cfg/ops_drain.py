@@ -0,0 +1,332 @@
+# Import Python Libs
+from __future__ import absolute_import
+import logging
+import threading
+import time
+
+# Local imports
+from . import ops_cluster
+from . import ops_osd
+from . import util_cache
+
+
+log = logging.getLogger(__name__)
+
+
+# Seconds allowed for a drain, so a PG that never settles does not keep it
+# waiting forever.
+deadline_default = 43200
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def weight_steps(weight_start, weight_target, step):
+    """
+    Weights to set going from weight_start to weight_target by step.
+
+    The last weight is always weight_target.
+    """
+    weight_start = float(weight_start)
+    weight_target = float(weight_target)
+    step = float(step)
+    if step <= 0:
+        raise Error("step must be greater than 0", step)
+    if weight_start == weight_target:
+        return [weight_target]
+    output = []
+    direction = 1
+    if weight_target < weight_start:
+        direction = -1
+    count = 1
+    while True:
+        weight = round(weight_start + direction * step * count, 6)
+        if (weight - weight_target) * direction >= 0:
+            break
+        output.append(weight)
+        count += 1
+    output.append(weight_target)
+    return output
+
+
+def _cache_name(model):
+    """
+    Name drain progress is saved under, None if the cluster is not known
+    """
+    cluster = model.cluster_uuid
+    if cluster is None:
+        cluster = model.cluster_name
+    if cluster is None:
+        return None
+    return "osd-drain-%s" % (cluster)
+
+
+def progress_load(model, cache_dir=None):
+    """
+    Progress last saved by a drain of the cluster, None if there is none
+    """
+    cache_name = _cache_name(model)
+    if cache_name is None:
+        return None
+    return util_cache.load(cache_name, cache_dir=cache_dir)
+
+
+def pause_set(model, paused, cache_dir=None):
+    """
+    Ask a running drain of the cluster, in any process, to pause or resume
+    """
+    cache_name = _cache_name(model)
+    if cache_name is None:
+        raise Error("Cluster not known")
+    if not util_cache.save("%s-control" % (cache_name), {"paused" : paused}, cache_dir):
+        raise Error("Failed to save drain control")
+
+
+class drain(object):
+    """
+    Change the weight of OSD's in steps, waiting for recovery between steps.
+
+    Setting the weight of an OSD to 0 in one step moves all its data at
+    once and hurts client latency across the cluster. Each step is only
+    taken once no PG is inactive or waiting on recovery / backfill.
+
+    Each OSD steps from its own current weight, read from the cluster unless
+    weight_start is given, so all OSD's reach weight_target together.
+
+    Progress is saved after every check, see progress_load, and the drain
+    can be paused from another process with pause_set.
+
+    Args:
+        model : The model, used by the default status and reweight.
+        osd_list : List of OSD numbers to drain.
+        **kwargs: Arbitrary keyword arguments.
+            weight_start : Weight the OSD's have now. Defaults to the weight
+                of each OSD read from the cluster.
+            weight_target : Weight to end with. Defaults to 0.
+            step : Fraction of the distance from each OSD's starting weight
+                to weight_target changed per step. Defaults to 0.1.
+            crush : Change the CRUSH weight rather than the reweight value.
+                Defaults to False.
+            deadline : Seconds allowed for the whole drain. Defaults to
+                deadline_default.
+            interval : Seconds between checks of the cluster state. Defaults
+                to 10.
+            clock : Function returning the time in seconds.
+            sleep : Function sleeping for a number of seconds.
+            status : Function returning a PG summary as made by
+                ops_cluster.pg_summary.
+            reweight : Function taking a dictionary of OSD number to weight.
+            weights_get : Function taking a list of OSD numbers and
+                returning their current weights.
+            cache_dir : Directory progress is saved in.
+    """
+    def __init__(self, model, osd_list, **kwargs):
+        self.model = model
+        self.osd_list = sorted(int(osd) for osd in osd_list)
+        if len(self.osd_list) == 0:
+            raise Error("No OSD to drain")
+        self.weight_start = kwargs.get("weight_start")
+        self.weight_target = float(kwargs.get("weight_target", 0))
+        self.step_fraction = float(kwargs.get("step", 0.1))
+        if self.step_fraction <= 0 or self.step_fraction > 1:
+            raise Error("step must be greater than 0 and at most 1", self.step_fraction)
+        self.crush = kwargs.get("crush", False)
+        self.deadline = kwargs.get("deadline", deadline_default)
+        self.interval = kwargs.get("interval", 10)
+        self.clock = kwargs.get("clock", time.time)
+        self.sleep = kwargs.get("sleep", time.sleep)
+        self.status = kwargs.get("status", self._status_default)
+        self.reweight = kwargs.get("reweight", self._reweight_default)
+        self.weights_get = kwargs.get("weights_get", self._weights_get_default)
+        self.cache_dir = kwargs.get("cache_dir")
+        self.cache_name = _cache_name(model)
+        self.lock = threading.Lock()
+        self.state = "pending"
+        self.step = 0
+        self.steps = None
+        self.plans = None
+        self.weights = None
+        self.pg_summary = None
+        self.time_start = None
+        self._paused = False
+
+
+    def _status_default(self):
+        cluster_ops = ops_cluster.ops_cluster(self.model)
+        cluster_ops.status_refresh()
+        return cluster_ops.pg_summary()
+
+
+    def _reweight_default(self, weights):
+        osd_ops = ops_osd.ops_osd(self.model)
+        return osd_ops.reweight_many(weights, self.crush)
+
+
+    def _weights_get_default(self, osd_list):
+        osd_ops = ops_osd.ops_osd(self.model)
+        return osd_ops.weights_get(osd_list, self.crush)
+
+
+    def _plan(self):
+        """
+        Weights to set per OSD, every OSD has the same number of steps
+        """
+        if self.weight_start is None:
+            weights_start = self.weights_get(self.osd_list)
+        else:
+            weights_start = dict((osd, float(self.weight_start)) for osd in self.osd_list)
+        plans = {}
+        for osd in self.osd_list:
+            weight_start = weights_start[osd]
+            distance = abs(weight_start - self.weight_target)
+            if distance == 0:
+                plans[osd] = []
+                continue
+            plans[osd] = weight_steps(weight_start, self.weight_target,
+                distance * self.step_fraction)
+        with self.lock:
+            self.plans = plans
+            self.weights = weights_start
+            self.steps = max(len(plan) for plan in plans.values())
+
+
+    def _step_weights(self, step):
+        """
+        Weights of the OSD's changed by step
+        """
+        output = {}
+        for osd, plan in self.plans.items():
+            if step < len(plan):
+                output[osd] = plan[step]
+        return output
+
+
+    def _state_set(self, state):
+        with self.lock:
+            self.state = state
+        self._progress_save()
+
+
+    def _progress_save(self):
+        if self.cache_name is None:
+            return
+        util_cache.save(self.cache_name, self.progress(), self.cache_dir)
+
+
+    def _control_name(self):
+        return "%s-control" % (self.cache_name)
+
+
+    def _paused_get(self):
+        """
+        True if paused by pause() or by pause_set from any process
+        """
+        with self.lock:
+            paused = self._paused
+        if self.cache_name is None:
+            return paused
+        control = util_cache.load(self._control_name(), cache_dir=self.cache_dir)
+        if isinstance(control, dict) and control.get("paused"):
+            return True
+        return paused
+
+
+    def pause(self):
+        """
+        Take no further steps until resumed
+        """
+        with self.lock:
+            self._paused = True
+
+
+    def resume(self):
+        with self.lock:
+            self._paused = False
+
+
+    def progress(self):
+        """
+        Current state, step and PG counts of the drain
+        """
+        with self.lock:
+            output = {
+                "state" : self.state,
+                "osd_list" : list(self.osd_list),
+                "step" : self.step,
+                "steps" : self.steps,
+                "weights" : None,
+                "weight_target" : self.weight_target,
+                "pgs_total" : None,
+                "pgs_unsettled" : None,
+                "seconds" : None,
+                "deadline" : self.deadline,
+                }
+            if self.weights is not None:
+                output["weights"] = dict(self.weights)
+            if self.pg_summary is not None:
+                output["pgs_total"] = self.pg_summary["total"]
+                output["pgs_unsettled"] = self.pg_summary["unsettled"]
+            if self.time_start is not None:
+                output["seconds"] = self.clock() - self.time_start
+        return output
+
+
+    def _deadline_check(self):
+        if self.deadline is None:
+            return
+        if self.clock() - self.time_start < self.deadline:
+            return
+        self._state_set("expired")
+        raise Error("Drain deadline exceeded", self.progress())
+
+
+    def _settled(self):
+        summary = self.status()
+        with self.lock:
+            self.pg_summary = summary
+        return summary["unsettled"] == 0
+
+
+    def run(self):
+        """
+        Take all steps, returning the final progress.
+
+        Raises Error if the deadline is exceeded, the weights set so far are
+        left in place.
+        """
+        self.time_start = self.clock()
+        if self.cache_name is not None:
+            # A pause requested for an earlier drain does not apply.
+            util_cache.remove(self._control_name(), self.cache_dir)
+        self._plan()
+        while True:
+            self._deadline_check()
+            if self._paused_get():
+                self._state_set("paused")
+                self.sleep(self.interval)
+                continue
+            if not self._settled():
+                self._state_set("waiting")
+                self.sleep(self.interval)
+                continue
+            if self.step == self.steps:
+                break
+            weights = self._step_weights(self.step)
+            self._state_set("running")
+            log.info("Setting weight of OSD's to %s" % (weights))
+            self.reweight(weights)
+            with self.lock:
+                self.weights.update(weights)
+                self.step += 1
+            self._progress_save()
+            # Give the mons time to start peering before checking again.
+            self.sleep(self.interval)
+        self._state_set("done")
+        return self.progress()
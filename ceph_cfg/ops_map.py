@@ -0,0 +1,171 @@
+# Import Python Libs
+from __future__ import absolute_import
+import json
+import logging
+
+# Local imports
+from . import util_cache
+from . import remote_connection
+from . import ops_pool
+from . import ops_cephfs
+
+
+log = logging.getLogger(__name__)
+
+
+# Cluster maps cached by this module, osdmap for pool_list and fsmap for
+# cephfs_list.
+#
+# The auth database has no epoch that can be queried cheaply, so auth_list
+# is always fetched in full.
+map_names = ["osdmap", "fsmap"]
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def _epoch_find(stat, keys):
+    """
+    Epoch from `osd stat` / `mds stat` output
+
+    Newer releases put the epoch at the top level, older ones nest it
+    under the map name.
+    """
+    epoch = stat.get("epoch")
+    if epoch is not None:
+        return int(epoch)
+    for key in keys:
+        nested = stat.get(key)
+        if isinstance(nested, dict) and nested.get("epoch") is not None:
+            return int(nested["epoch"])
+    raise Error("No epoch found in", keys)
+
+
+class ops_map(object):
+    """
+    Keep the pool and cephfs lists in the model while their map epoch is
+    unchanged.
+
+    The lists and their epochs are also saved per cluster uuid, so later
+    processes only need the epoch query when nothing has changed.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.connection = remote_connection.connection(self.model)
+
+
+    def _execute(self, postfix_arguments):
+        arguments, output = self.connection.execute(postfix_arguments)
+        if output["retcode"] != 0:
+            raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
+                        " ".join(arguments),
+                        output["retcode"],
+                        output["stdout"],
+                        output["stderr"])
+                        )
+        return json.loads(output["stdout"].strip())
+
+
+    def epoch_get(self, map_name):
+        """
+        Current epoch of a map from the small stat summary
+        """
+        if map_name == "osdmap":
+            stat = self._execute(["-f", "json", "osd", "stat"])
+            return _epoch_find(stat, ["osdmap"])
+        if map_name == "fsmap":
+            stat = self._execute(["-f", "json", "mds", "stat"])
+            return _epoch_find(stat, ["fsmap", "mdsmap"])
+        raise Error("Invalid map name", map_name)
+
+
+    def _epochs(self):
+        return self.model.map_epochs
+
+
+    def _cache_name(self):
+        if self.model.cluster_uuid is None:
+            return None
+        return "cluster-maps-%s" % (self.model.cluster_uuid)
+
+
+    def _cache_load(self, map_name, epoch):
+        cache_name = self._cache_name()
+        if cache_name is None:
+            return False
+        cached = util_cache.load(cache_name)
+        if not isinstance(cached, dict):
+            return False
+        entry = cached.get(map_name)
+        if not isinstance(entry, dict) or entry.get("epoch") != epoch:
+            return False
+        if map_name == "osdmap":
+            self.model.pool_list = entry["data"]
+        else:
+            self.model.cephfs_list = entry["data"]
+        self._epochs()[map_name] = epoch
+        return True
+
+
+    def _cache_save(self, map_name, data):
+        cache_name = self._cache_name()
+        if cache_name is None:
+            return
+        content = util_cache.load(cache_name)
+        if not isinstance(content, dict):
+            content = {}
+        content[map_name] = {
+            "epoch" : self._epochs()[map_name],
+            "data" : data
+            }
+        util_cache.save(cache_name, content)
+
+
+    def invalidate(self, map_name):
+        """
+        Forget a map, used after changing it
+        """
+        if not map_name in map_names:
+            raise Error("Invalid map name", map_name)
+        self._epochs()[map_name] = None
+
+
+    def refresh(self, map_name):
+        """
+        Load the list for map_name unless the cached one is current
+
+        The epoch is read before the list, so a change made while fetching
+        the list is seen on the next refresh.
+        """
+        epoch = self.epoch_get(map_name)
+        if self._epochs().get(map_name) == epoch:
+            log.debug("Using cached %s epoch %s" % (map_name, epoch))
+            return
+        if self._cache_load(map_name, epoch):
+            log.debug("Using saved %s epoch %s" % (map_name, epoch))
+            return
+        if map_name == "osdmap":
+            ops_pool.ops_pool(self.model).pool_list()
+            data = self.model.pool_list
+        else:
+            ops_cephfs.ops_cephfs(self.model).cephfs_list()
+            data = self.model.cephfs_list
+        self._epochs()[map_name] = epoch
+        self._cache_save(map_name, data)
+
+
+    def pool_list(self):
+        self.refresh("osdmap")
+        return self.model.pool_list
+
+
+    def cephfs_list(self):
+        self.refresh("fsmap")
+        return self.model.cephfs_list
@@ -1,17 +1,21 @@
 # Import Python Libs
 from __future__ import absolute_import
+import json
 import logging
 
 # Local imports
 from . import model
 from . import mdl_updater
-from . import util_which
 from . import remote_connection
-from . import utils
 
 log = logging.getLogger(__name__)
 
 
+# Weight of a fully in OSD as used by `osd reweightn`, weights are sent as
+# 16.16 fixed point integers.
+_weight_in = 0x10000
+
+
 class Error(Exception):
     """
     Error
@@ -34,28 +38,15 @@ class ops_osd(object):
 
     def _osd_local(self):
         local_osd = []
-        osd_list_existing = self.model.discovered_osd.get(self.cluster_uuid)
-        if osd_list_existing is not None:
-            for osd_existing in osd_list_existing:
-                whoami = osd_existing.get("whoami")
-                if whoami is not None:
-                    local_osd.append(int(whoami))
-        return local_osd
+        for ceph_fsid, whoami in self.model.idx_whoami.keys():
+            if ceph_fsid != self.model.cluster_uuid:
+                continue
+            local_osd.append(int(whoami))
+        return sorted(local_osd)
 
 
-    def reweight(self, osd, weight):
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
-        postfix_arguments = [
-            'osd',
-            'reweight',
-            str(osd),
-            str(weight)
-        ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+    def _execute(self, postfix_arguments):
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                     " ".join(arguments),
@@ -63,9 +54,150 @@ class ops_osd(object):
                     output["stdout"],
                     output["stderr"])
                     )
+        return output
+
+
+    def _weights_validate(self, weights, crush):
+        validated = {}
+        for osd, weight in weights.items():
+            try:
+                osd_number = int(osd)
+                weight_float = float(weight)
+            except (TypeError, ValueError):
+                raise Error("Invalid OSD weight", osd, weight)
+            if weight_float < 0:
+                raise Error("Invalid OSD weight", osd, weight)
+            if not crush and weight_float > 1:
+                raise Error("OSD weight must be in the range 0 to 1", osd, weight)
+            validated[osd_number] = weight_float
+        return validated
+
+
+    def weights_get(self, osd_list, crush=False):
+        """
+        Current weights of OSD's from `osd df`
+
+        Returns the reweight value, or the CRUSH weight if crush is set, by
+        OSD number.
+        """
+        output = self._execute(['-f', 'json', 'osd', 'df'])
+        nodes = json.loads(output["stdout"].strip()).get("nodes", [])
+        key = "reweight"
+        if crush:
+            key = "crush_weight"
+        found = {}
+        for node in nodes:
+            found[node.get("id")] = node.get(key)
+        weights = {}
+        for osd_number in osd_list:
+            weight = found.get(int(osd_number))
+            if weight is None:
+                raise Error("OSD not found in osd df", osd_number)
+            weights[int(osd_number)] = float(weight)
+        return weights
+
+
+    def reweight(self, osd, weight):
+        postfix_arguments = [
+            'osd',
+            'reweight',
+            str(osd),
+            str(weight)
+        ]
+        self._execute(postfix_arguments)
         return True
 
 
+    def reweight_many(self, weights, crush=False):
+        """
+        Set the weight of many OSD's
+
+        weights maps OSD number to weight. The reweight weights are set with
+        one `osd reweightn` call. CRUSH has no bulk command for a list of
+        OSD's so crush weights are set one OSD at a time.
+
+        Returns the weights set by OSD number.
+        """
+        validated = self._weights_validate(weights, crush)
+        if len(validated) == 0:
+            return validated
+        if crush:
+            for osd_number in sorted(validated.keys()):
+                self._execute([
+                    'osd',
+                    'crush',
+                    'reweight',
+                    'osd.%s' % (osd_number),
+                    str(validated[osd_number])
+                ])
+            return validated
+        weights_fixed = {}
+        for osd_number, weight in validated.items():
+            weights_fixed[str(osd_number)] = str(int(weight * _weight_in))
+        self._execute([
+            'osd',
+            'reweightn',
+            json.dumps(weights_fixed, sort_keys=True)
+        ])
+        return validated
+
+
+    def _crush_buckets(self, osd_list):
+        """
+        CRUSH buckets holding only OSD's in osd_list
+
+        Returns a dictionary of bucket name to the OSD's in it, and the OSD's
+        not covered by such a bucket.
+        """
+        output = self._execute(['-f', 'json', 'osd', 'tree'])
+        tree = json.loads(output["stdout"].strip())
+        nodes = tree.get("nodes", [])
+        osd_set = set(osd_list)
+        parents = {}
+        for node in nodes:
+            for child in node.get("children", []):
+                parents[child] = node
+        buckets = {}
+        remaining = []
+        for osd_number in sorted(osd_set):
+            bucket = parents.get(osd_number)
+            if bucket is None or not set(bucket.get("children", [])).issubset(osd_set):
+                remaining.append(osd_number)
+                continue
+            buckets.setdefault(bucket["name"], []).append(osd_number)
+        return buckets, remaining
+
+
+    def reweight_local(self, weight, crush=False):
+        """
+        Set the weight of all OSD's of the cluster on this node
+
+        The crush weight is set with one `osd crush reweight-subtree` call
+        per CRUSH bucket holding only local OSD's, found with `osd tree`.
+        Other local OSD's are reweighted one at a time.
+
+        Returns the weights set by OSD number.
+        """
+        local_osd = self._osd_local()
+        weights = dict((osd_number, weight) for osd_number in local_osd)
+        if not crush:
+            return self.reweight_many(weights)
+        validated = self._weights_validate(weights, crush)
+        if len(validated) == 0:
+            return validated
+        buckets, remaining = self._crush_buckets(validated.keys())
+        for bucket_name in sorted(buckets.keys()):
+            self._execute([
+                'osd',
+                'crush',
+                'reweight-subtree',
+                bucket_name,
+                str(float(weight))
+            ])
+        self.reweight_many(dict((osd_number, weight) for osd_number in remaining), crush)
+        return validated
+
+
 def reweight(**kwargs):
     """
     Reweight an OSD, or OSD's on node.
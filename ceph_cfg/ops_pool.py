@@ -4,9 +4,7 @@ import logging
 import json
 
 # Local imports
-from . import util_which
 from . import remote_connection
-from . import utils
 
 log = logging.getLogger(__name__)
 
@@ -32,18 +30,13 @@ class ops_pool(object):
 
 
     def pool_list(self):
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             "-f",
             "json",
             "osd",
             "lspools"
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
@@ -65,9 +58,6 @@ class ops_pool(object):
         pool_type = kwargs.get("pool_type")
         er_profile = kwargs.get("erasure_code_profile")
         crush_ruleset_name = kwargs.get("crush_ruleset")
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             'osd',
             'pool',
@@ -75,18 +65,16 @@ class ops_pool(object):
             name,
             str(pg_num)
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
         if pgp_num is not None:
-            arguments.append(str(pgp_num))
+            postfix_arguments.append(str(pgp_num))
         if pool_type == "replicated":
-            arguments.append("replicated")
+            postfix_arguments.append("replicated")
         if pool_type == "erasure":
-            arguments.append("erasure")
-            arguments.append("erasure-code-profile=%s" % (er_profile))
+            postfix_arguments.append("erasure")
+            postfix_arguments.append("erasure-code-profile=%s" % (er_profile))
         if crush_ruleset_name is not None:
-            arguments.append(crush_ruleset_name)
-        output = utils.execute_local_command(arguments)
+            postfix_arguments.append(crush_ruleset_name)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
@@ -105,9 +93,6 @@ class ops_pool(object):
     def pool_del(self, name):
         if not name in self.model.pool_list.keys():
             return True
-        prefix_arguments = [
-            util_which.which_ceph.path
-        ]
         postfix_arguments = [
             'osd',
             'pool',
@@ -116,9 +101,7 @@ class ops_pool(object):
             name,
             '--yes-i-really-really-mean-it'
             ]
-        connection_arguments = self.connection.arguments_get()
-        arguments = prefix_arguments + connection_arguments + postfix_arguments
-        output = utils.execute_local_command(arguments)
+        arguments, output = self.connection.execute(postfix_arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                         " ".join(arguments),
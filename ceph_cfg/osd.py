@@ -1,8 +1,14 @@
 # Import Python Libs
 from __future__ import absolute_import
+import functools
 import logging
 import os
 import stat
+import time
+try:
+    import ConfigParser
+except:
+    import configparser as ConfigParser
 
 # Local imports
 from . import utils
@@ -11,11 +17,21 @@ from . import constants
 from . import model
 from . import mdl_updater
 from . import util_which
+from . import util_parallel
+from . import service
 
 
 log = logging.getLogger(__name__)
 
 
+# Mount options used by ceph-disk when mounting OSD data partitions, unless
+# ceph.conf sets "osd mount options <fstype>".
+_mount_options = {
+    "xfs" : "rw,noatime,inode64",
+    }
+_mount_options_default = "rw,noatime"
+
+
 class Error(Exception):
     """
     Error
@@ -49,6 +65,24 @@ class osd_ctrl(object):
         return base.replace('/', '!')
 
 
+    def _get_dev_parent(self, name):
+        """
+        Parent disk name of a partition from sysfs, None for a whole disk.
+
+        The partition's sysfs directory sits inside its disk's directory,
+        so the parent is found without scanning /sys/block.
+        """
+        path_sys = os.path.join('/sys/class/block', name)
+        if not os.path.exists(path_sys):
+            raise Error('not a disk or partition', name)
+        if not os.path.exists(os.path.join(path_sys, 'partition')):
+            return None
+        parent = os.path.basename(os.path.dirname(os.path.realpath(path_sys)))
+        if not os.path.exists(os.path.join('/sys/block', parent)):
+            raise Error('not a disk or partition', name)
+        return parent
+
+
     def is_partition(self, dev):
         """
         Check whether a given device path is a partition or a full disk.
@@ -57,32 +91,19 @@ class osd_ctrl(object):
             raise Error('device not found', dev)
 
         dev = os.path.realpath(dev)
-        if not stat.S_ISBLK(os.lstat(dev).st_mode):
+        dev_stat = os.lstat(dev)
+        if not stat.S_ISBLK(dev_stat.st_mode):
             raise Error('not a block device', dev)
 
-        name = self._get_dev_name(dev)
-        if os.path.exists(os.path.join('/sys/block', name)):
-            return False
-
-        # make sure it is a partition of something else
-        for basename in os.listdir('/sys/block'):
-            if os.path.exists(os.path.join('/sys/block', basename, name)):
-                return True
-        raise Error('not a disk or partition', dev)
+        dev_id = (os.major(dev_stat.st_rdev), os.minor(dev_stat.st_rdev))
+        if not dev_id in self.model.idx_dev_parent:
+            name = self._get_dev_name(dev)
+            self.model.idx_dev_parent[dev_id] = self._get_dev_parent(name)
+        return self.model.idx_dev_parent[dev_id] is not None
 
 
     def _get_osd_partitons_by_disk(self, disk):
-        output = set()
-        disk_details = self.model.lsblk.get(disk)
-        if disk_details is None:
-            return output
-        part_details = disk_details.get('PARTITION')
-        if part_details is None:
-            return output
-        for part_name in part_details.keys():
-            if part_name in self.model.partitions_osd:
-                output.add(part_name)
-        return output
+        return set(self.model.idx_disk_osd.get(disk, set()))
 
 
     def _activate_targets_item(self, osd_dev_raw):
@@ -96,9 +117,118 @@ class osd_ctrl(object):
         return activate_list
 
 
+    def _activate_native_details(self, partition, **kwargs):
+        """
+        OSD details for activating without ceph-disk, None if not possible.
+
+        Only an OSD that has been activated before has its whoami in the
+        model, so ceph-disk still handles the first activation.
+        """
+        if kwargs.get("dmcrypt") is not None:
+            return None
+        part_details = self.model.idx_partition.get(partition)
+        if part_details is None:
+            return None
+        fs_type = part_details.get("FSTYPE")
+        if fs_type is None:
+            return None
+        osd_md = self.model.idx_osd_dev.get(partition)
+        if osd_md is None or osd_md.get("whoami") is None:
+            return None
+        if self.model.cluster_uuid is not None:
+            if osd_md.get("ceph_fsid") != self.model.cluster_uuid:
+                return None
+        cluster_name = self.model.cluster_name
+        if cluster_name is None:
+            cluster_name = "ceph"
+        path = os.path.join(constants._path_ceph_lib_osd, "%s-%s" % (
+            cluster_name,
+            osd_md["whoami"])
+            )
+        mount_point = part_details.get("MOUNTPOINT")
+        if mount_point is not None and mount_point != path:
+            return None
+        return {
+            "whoami" : osd_md["whoami"],
+            "path" : path,
+            "fstype" : fs_type,
+            "mounted" : mount_point is not None,
+            }
+
+
+    def _mount_options_get(self, fs_type):
+        """
+        Mount options for fs_type, looked up in ceph.conf as ceph-disk does.
+        """
+        for option in ["osd_mount_options_%s", "osd_fs_mount_options_%s"]:
+            for section in ["osd", "global"]:
+                try:
+                    value = self.model.ceph_conf.get(section, option % (fs_type))
+                except (ConfigParser.NoSectionError, ConfigParser.NoOptionError):
+                    continue
+                value = value.strip()
+                if len(value) > 0:
+                    return value
+        return _mount_options.get(fs_type, _mount_options_default)
+
+
+    def _activate_native(self, partition, details, timeout=None, services_defer=None):
+        """
+        Mount an already prepared OSD and start its service.
+
+        If services_defer is a list the service is appended to it as
+        (partition, unit) rather than started, so the caller can start many
+        OSD's together.
+        """
+        if not details["mounted"]:
+            if not os.path.isdir(details["path"]):
+                os.makedirs(details["path"])
+            arguments = [
+                'mount',
+                '-t',
+                details["fstype"],
+                '-o',
+                self._mount_options_get(details["fstype"]),
+                partition,
+                details["path"]
+                ]
+            output = utils.execute_local_command(arguments, timeout=timeout)
+            if output.get("timeout"):
+                raise Error("Timed out after '%s' seconds executing '%s'" % (
+                    timeout,
+                    " ".join(arguments))
+                    )
+            if output["retcode"] != 0:
+                raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
+                    " ".join(arguments),
+                    output["retcode"],
+                    output["stdout"],
+                    output["stderr"])
+                    )
+        arguments = {
+            'identifier' : details["whoami"],
+            'service' : "ceph-osd"
+        }
+        if services_defer is not None:
+            services_defer.append((partition, arguments))
+            return True
+        init_system = service.init_system(init_type=self.model.init)
+        init_system.start(**arguments)
+        init_system.on_boot_enable(**arguments)
+        return True
+
+
     def activate_partition(self, partition, **kwargs):
         dmcrypt = kwargs.get("dmcrypt")
         dmcrypt_key_dir = kwargs.get("dmcrypt_key_dir")
+        timeout = kwargs.get("timeout")
+        details = self._activate_native_details(partition, **kwargs)
+        if details is not None:
+            log.debug("Activating '%s' as osd.%s without ceph-disk" % (
+                partition,
+                details["whoami"]))
+            return self._activate_native(partition, details, timeout,
+                kwargs.get("services_defer"))
         arguments = [
                 'ceph-disk',
                 '-v',
@@ -114,7 +244,12 @@ class osd_ctrl(object):
             arguments.append(dmcrypt_key_dir)
         arguments.append(partition)
 
-        output = utils.execute_local_command(arguments)
+        output = utils.execute_local_command(arguments, timeout=timeout)
+        if output.get("timeout"):
+            raise Error("Timed out after '%s' seconds executing '%s'" % (
+                timeout,
+                " ".join(arguments))
+                )
         if output["retcode"] != 0:
                 raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
                     " ".join(arguments),
@@ -125,12 +260,9 @@ class osd_ctrl(object):
         return True
 
 
-    def activate_targets(self, **kwargs):
+    def _activate_targets_list(self, **kwargs):
         osd_dev_raw = kwargs.get("osd_dev")
         osd_dev_list_raw = kwargs.get("osd_dev_list")
-        if osd_dev_raw is None and osd_dev_list_raw is None:
-            return self.model.partitions_osd
-
         activate_list = set()
         if osd_dev_raw is not None:
             for dev_norm in self._activate_targets_item(osd_dev_raw):
@@ -139,22 +271,105 @@ class osd_ctrl(object):
             for dev_raw in osd_dev_list_raw:
                 for dev_norm in self._activate_targets_item(dev_raw):
                     activate_list.add(dev_norm)
+        return activate_list
+
+
+    def activate_targets(self, **kwargs):
+        osd_dev_raw = kwargs.get("osd_dev")
+        osd_dev_list_raw = kwargs.get("osd_dev_list")
+        if osd_dev_raw is None and osd_dev_list_raw is None:
+            return self.model.partitions_osd
+
+        activate_list = self._activate_targets_list(**kwargs)
         for part in activate_list:
             self.activate_partition(part, **kwargs)
         return True
 
 
+    def activate_targets_parallel(self, **kwargs):
+        """
+        Activate partitions concurrently
+
+        Takes the activate_targets arguments plus parallelism, the number of
+        partitions activated at the same time, and timeout, the seconds
+        allowed per partition. One failing partition does not stop the
+        others.
+
+        Returns the count of activated and failed partitions, the total
+        seconds and per partition the status, error and seconds taken.
+        """
+        osd_dev_raw = kwargs.get("osd_dev")
+        osd_dev_list_raw = kwargs.get("osd_dev_list")
+        if osd_dev_raw is None and osd_dev_list_raw is None:
+            raise Error("osd_dev or osd_dev_list must be specified")
+        params = dict(kwargs)
+        parallelism = params.pop("parallelism", util_parallel.parallelism_default)
+        # OSD's activated without ceph-disk have their services started and
+        # enabled together once all partitions are mounted.
+        services_defer = []
+        params["services_defer"] = services_defer
+        tasks = []
+        for part in sorted(self._activate_targets_list(**params)):
+            tasks.append((part, functools.partial(self.activate_partition, part, **params)))
+        time_start = time.time()
+        task_results = util_parallel.run(tasks, parallelism)
+        services_failed = self._activate_services(services_defer, parallelism)
+        output = {
+            "activated" : 0,
+            "failed" : 0,
+            "seconds" : time.time() - time_start,
+            "partitions" : {}
+            }
+        for task_result in task_results:
+            result = {
+                "status" : "activated",
+                "error" : None,
+                "seconds" : task_result.seconds
+                }
+            if task_result.error is not None:
+                result["status"] = "failed"
+                result["error"] = str(task_result.error)
+            elif task_result.key in services_failed:
+                result["status"] = "failed"
+                result["error"] = services_failed[task_result.key]
+            output[result["status"]] += 1
+            output["partitions"][task_result.key] = result
+        return output
+
+
+    def _activate_services(self, services, parallelism):
+        """
+        Start and enable the services of many activated OSD's
+
+        Returns a dictionary of partition to error for the services that
+        failed.
+        """
+        if len(services) == 0:
+            return {}
+        init_system = service.init_system(init_type=self.model.init)
+        units = [unit for partition, unit in services]
+        # sysV unit names do not include the identifier
+        unit_partition = {}
+        for partition, unit in services:
+            unit_partition[(unit.get("service"), unit.get("identifier"))] = partition
+        failed = {}
+        results = init_system.start_many(units, parallelism=parallelism)
+        results += init_system.on_boot_enable_many(units, parallelism=parallelism)
+        for result in results:
+            partition = unit_partition.get((result.get("service"), result.get("identifier")))
+            if result["status"] == "ok" or partition is None or partition in failed:
+                continue
+            failed[partition] = result["error"]
+        return failed
+
+
     def _get_part_details(self,partition):
         disk_name = self.model.part_pairent.get(partition)
         if disk_name is None:
             raise Error("Programming error")
-        disk_details = self.model.lsblk.get(disk_name)
-        if disk_details is None:
-            raise Error("Programming error")
-        disk_parts = disk_details.get('PARTITION')
-        if disk_parts is None:
+        if self.model.lsblk.get(disk_name) is None:
             raise Error("Programming error")
-        return disk_parts.get(partition)
+        return self.model.idx_partition.get(partition)
 
 
     def _get_part_type(self,partition):
@@ -196,7 +411,12 @@ class osd_ctrl(object):
         return True
 
 
-    def prepare(self, **kwargs):
+    def _prepare_arguments(self, **kwargs):
+        """
+        Validate a prepare request against the model
+
+        Returns the ceph-disk arguments, or None if there is nothing to do.
+        """
         dmcrypt = kwargs.get("dmcrypt")
         dmcrypt_key_dir = kwargs.get("dmcrypt_key_dir")
         osd_dev_raw = kwargs.get("osd_dev")
@@ -231,28 +451,25 @@ class osd_ctrl(object):
         log.debug("Transfromed from '%s' to '%s'" % (osd_dev_raw, osd_dev))
 
         # Validate the osd_uuid and journal_uuid dont already exist
-
-        osd_list_existing = self.model.discovered_osd.get(cluster_uuid)
-        if osd_list_existing is not None:
-            for osd_existing in osd_list_existing:
-                if osd_uuid is not None:
-                    osd_existing_fsid = osd_existing.get("fsid")
-                    if osd_existing_fsid == osd_uuid:
-                        log.debug("osd_uuid already exists:%s" % (osd_uuid))
-                        return True
-
-                if journal_uuid is not None:
-                    journal_existing_uuid = osd_existing.get("journal_uuid")
-                    if journal_existing_uuid == journal_uuid:
-                        log.debug("journal_uuid already exists:%s" % (journal_uuid))
-                        return True
+        if osd_uuid is not None:
+            osd_existing = self.model.idx_osd_fsid.get(osd_uuid)
+            if osd_existing is not None:
+                if osd_existing.get("ceph_fsid") == cluster_uuid:
+                    log.debug("osd_uuid already exists:%s" % (osd_uuid))
+                    return None
+        if journal_uuid is not None:
+            osd_existing = self.model.idx_journal_uuid.get(journal_uuid)
+            if osd_existing is not None:
+                if osd_existing.get("ceph_fsid") == cluster_uuid:
+                    log.debug("journal_uuid already exists:%s" % (journal_uuid))
+                    return None
         if self.is_partition(osd_dev):
             if osd_dev in self.model.partitions_journal:
-                return True
+                return None
             partion_details = self._get_part_details(osd_dev)
             osd_mountpoint = partion_details.get("MOUNTPOINT")
             if osd_mountpoint is not None:
-                return True
+                return None
             if journal_dev is None:
                 # We could try and default journal_dev if a journel disk is found.
                 raise Error("Journel device must be specified")
@@ -266,7 +483,7 @@ class osd_ctrl(object):
             part_table = block_details_osd.get("PARTITION")
             if part_table is not None:
                 if len(part_table.keys()) > 0:
-                    return True
+                    return None
 
         arguments = [
             util_which.which_ceph_disk.path,
@@ -300,6 +517,10 @@ class osd_ctrl(object):
             arguments.append(osd_dev)
         if journal_dev is not None:
             arguments.append(journal_dev)
+        return arguments
+
+
+    def _prepare_execute(self, arguments):
         output = utils.execute_local_command(arguments)
         if output["retcode"] != 0:
             raise Error("Failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
@@ -311,6 +532,116 @@ class osd_ctrl(object):
         return True
 
 
+    def prepare(self, **kwargs):
+        arguments = self._prepare_arguments(**kwargs)
+        if arguments is None:
+            return True
+        return self._prepare_execute(arguments)
+
+
+    def _prepare_disk(self, dev):
+        disk = self.model.part_pairent.get(dev)
+        if disk is None:
+            return dev
+        return disk
+
+
+    def prepare_many(self, specs, **kwargs):
+        """
+        Prepare many OSD at once
+
+        specs is a list of dictionaries with the prepare arguments of each
+        OSD, kwargs are defaults for all of them and may set parallelism.
+        All specs are validated before any OSD is prepared, a data device or
+        journal partition used by more than one spec is rejected. A journal
+        disk may be shared, ceph-disk adds a journal partition per OSD.
+        Specs sharing a data or journal disk are prepared one after the
+        other so partition tables are not changed concurrently, others are
+        prepared in parallel.
+
+        Returns a result per spec with the osd_dev, journal_dev, status of
+        "prepared", "skipped" or "failed", the error and the seconds taken.
+        """
+        params_default = dict(kwargs)
+        parallelism = params_default.pop("parallelism", util_parallel.parallelism_default)
+        requests = []
+        errors = {}
+        devices_used = {}
+        for spec in specs:
+            params = dict(params_default)
+            params.update(spec)
+            osd_dev_raw = params.get("osd_dev")
+            if osd_dev_raw is None:
+                raise Error("osd_dev not specified")
+            osd_dev = os.path.realpath(osd_dev_raw)
+            if osd_dev in devices_used:
+                errors[osd_dev] = "osd_dev already used as %s" % (devices_used[osd_dev])
+                continue
+            devices_used[osd_dev] = "osd_dev"
+            journal_dev_raw = params.get("journal_dev")
+            if journal_dev_raw is not None:
+                journal_dev = os.path.realpath(journal_dev_raw)
+                # Only partitions are exclusive, a journal disk is shared.
+                if self._prepare_disk(journal_dev) != journal_dev:
+                    if journal_dev in devices_used:
+                        errors[osd_dev] = "journal_dev '%s' already used as %s" % (
+                            journal_dev,
+                            devices_used[journal_dev])
+                        continue
+                    devices_used[journal_dev] = "journal_dev"
+            try:
+                arguments = self._prepare_arguments(**params)
+            except (Error, utils.Error) as err:
+                errors[osd_dev] = str(err)
+                continue
+            requests.append((osd_dev, params.get("journal_dev"), arguments))
+        if len(errors) > 0:
+            raise Error("Invalid OSD specifications", errors)
+        disks = util_parallel.disjoint_set()
+        for osd_dev, journal_dev, arguments in requests:
+            disk_data = self._prepare_disk(osd_dev)
+            disks.find(disk_data)
+            if journal_dev is not None:
+                disk_journal = self._prepare_disk(os.path.realpath(journal_dev))
+                disks.union(disk_data, disk_journal)
+        groups = {}
+        groups_order = []
+        for index in range(len(requests)):
+            osd_dev, journal_dev, arguments = requests[index]
+            if arguments is None:
+                continue
+            root = disks.find(self._prepare_disk(osd_dev))
+            if not root in groups:
+                groups[root] = []
+                groups_order.append(root)
+            task = functools.partial(self._prepare_execute, arguments)
+            groups[root].append((index, task))
+        task_results = util_parallel.run_groups(
+            [groups[root] for root in groups_order], parallelism)
+        results_by_index = {}
+        for task_result in task_results:
+            results_by_index[task_result.key] = task_result
+        output = []
+        for index in range(len(requests)):
+            osd_dev, journal_dev, arguments = requests[index]
+            result = {
+                "osd_dev" : osd_dev,
+                "journal_dev" : journal_dev,
+                "status" : "skipped",
+                "error" : None,
+                "seconds" : 0.0
+                }
+            task_result = results_by_index.get(index)
+            if task_result is not None:
+                result["seconds"] = task_result.seconds
+                result["status"] = "prepared"
+                if task_result.error is not None:
+                    result["status"] = "failed"
+                    result["error"] = str(task_result.error)
+            output.append(result)
+        return output
+
+
 def update_model(mdl):
     # Utility function to update model for osd_ctrl
     u = mdl_updater.model_updater(mdl)
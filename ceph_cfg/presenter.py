@@ -1,8 +1,74 @@
 import logging
 
+# Local imports
+from . import mdl_diff
+from . import util_columnar
+
 log = logging.getLogger(__name__)
 
 
+# Fields available to mdl_presentor.partition_query taken directly from lsblk,
+# for both disks and partitions.
+query_fields_lsblk = [
+    'SIZE', 'NAME', 'VENDOR', 'UUID', 'PARTLABEL', 'PKNAME', 'FSTYPE',
+    'PARTTYPE', 'MOUNTPOINT', 'PARTUUID', 'ROTA', 'SCHED', 'RQ-SIZE'
+    ]
+
+# Query fields taken from parted by query field.
+query_fields_parted_disk = {
+    'DRIVER' : 'driver',
+    'SECTOR_SIZE_LOGICAL' : 'sector_size_logical',
+    'SECTOR_SIZE_PHYSICAL' : 'sector_size_physical',
+    'TABLE' : 'table',
+    'VENDOR_NAME' : 'vendor'
+    }
+
+query_fields_parted_partition = {
+    'NUMBER' : 'Number',
+    'SIZE_HUMAN' : 'Size'
+    }
+
+# Query fields that are not in the lsblk or parted output.
+query_fields_other = ['LINK', 'TYPE', 'DISK']
+
+query_kinds = ['disk', 'part']
+
+# Columns of mdl_presentor.columnar, one row per disk and partition.
+columnar_schema = [
+    ("host", "str"),
+    ("disk", "str"),
+    ("partition", "str"),
+    ("size", "int"),
+    ("rota", "bool"),
+    ("parttype", "str"),
+    ("fstype", "str"),
+    ("osd_id", "int"),
+    ("cluster_fsid", "str"),
+    ]
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def _details_copy(details):
+    """
+    Copy of presented details, including the lists such as LINK and Flags
+    """
+    output = {}
+    for key, value in details.items():
+        if isinstance(value, list):
+            value = list(value)
+        output[key] = value
+    return output
+
+
 class mdl_presentor():
     """
     Since presentation should be clean to the end user
@@ -115,16 +181,40 @@ class mdl_presentor():
         return output
 
 
-    def _partition_details(self, disk, partition):
+    def _presented_check(self):
+        """
+        Drop cached details when the model has been refreshed
+        """
+        if self.model.presented_generation == self.model.generation:
+            return
+        self.model.presented_disks = {}
+        self.model.presented_partitions = {}
+        self.model.presented_generation = self.model.generation
+
+
+    def _partition_details(self, disk, partition, memoise=True):
+        """
+        Presented partition details
+
+        With memoise False details not already cached are not added to the
+        cache, so streaming output does not grow with the host size.
+        """
+        self._presented_check()
+        key = (disk, partition)
+        output = self.model.presented_partitions.get(key)
+        if output is not None:
+            return _details_copy(output)
         output = {}
         symlinks = self.model.symlinks.get(partition)
         if symlinks is not None:
-            output["LINK"] = symlinks
+            output["LINK"] = list(symlinks)
         lsblk = self._partition_details_lsblk(disk, partition)
         output.update(lsblk)
         parted = self._partition_details_parted(disk, partition)
         output.update(parted)
-        return output
+        if memoise:
+            self.model.presented_partitions[key] = output
+        return _details_copy(output)
 
 
 
@@ -182,20 +272,26 @@ class mdl_presentor():
         return output
 
 
-    def _disk_details(self, disk):
-        output = {}
-        symlinks = self.model.symlinks.get(disk)
-        if symlinks is not None:
-            output["LINK"] = symlinks
-        parted = self._disk_details_parted(disk)
-        output.update(parted)
-        lsblk = self._disk_details_lsblk(disk)
-        output.update(lsblk)
+    def _disk_details(self, disk, memoise=True):
+        self._presented_check()
+        output = self.model.presented_disks.get(disk)
+        if output is None:
+            output = {}
+            symlinks = self.model.symlinks.get(disk)
+            if symlinks is not None:
+                output["LINK"] = list(symlinks)
+            parted = self._disk_details_parted(disk)
+            output.update(parted)
+            lsblk = self._disk_details_lsblk(disk)
+            output.update(lsblk)
+            if memoise:
+                self.model.presented_disks[disk] = output
+        output = _details_copy(output)
         partitions = self._disk_partitions(disk)
         log.info("All partitons = %s" % (partitions))
         output["PARTITION"] = {}
         for part in partitions:
-            partition_details = self._partition_details(disk, part)
+            partition_details = self._partition_details(disk, part, memoise)
             output["PARTITION"][part] = partition_details
         return output
 
@@ -212,12 +308,248 @@ class mdl_presentor():
         return output
 
 
+    def partitions_all_iter(self):
+        '''
+        Yield (disk, details) for each disk in name order
+
+        Same records as partitions_all, one disk at a time.
+        '''
+        for disk in sorted(self._disks_all()):
+            yield disk, self._disk_details(disk, memoise=False)
+
+
+
+    def _query_lsblk(self, disk, partition):
+        details = self.model.lsblk.get(disk)
+        if details is None:
+            return {}
+        if partition is None:
+            return details
+        allpart = details.get("PARTITION")
+        if allpart is None:
+            return {}
+        return allpart.get(partition, {})
+
+
+    def _query_parted(self, disk, partition):
+        details = self.model.parted.get(disk)
+        if details is None:
+            return {}
+        if partition is None:
+            return details
+        allpart = details.get("partition")
+        if allpart is None:
+            return {}
+        return allpart.get(partition, {})
+
+
+    def _query_field(self, disk, partition, field):
+        """
+        Value of a single field of a disk or partition, None if not known.
+
+        Only the model data backing the field is read.
+        """
+        if field == 'LINK':
+            if partition is None:
+                return self.model.symlinks.get(disk)
+            return self.model.symlinks.get(partition)
+        if field == 'TYPE':
+            if partition is None:
+                return 'disk'
+            return 'part'
+        if field == 'DISK':
+            if partition is None:
+                return None
+            return disk
+        if field in query_fields_lsblk:
+            return self._query_lsblk(disk, partition).get(field)
+        if partition is None:
+            parted_key = query_fields_parted_disk.get(field)
+        else:
+            parted_key = query_fields_parted_partition.get(field)
+        if parted_key is None:
+            return None
+        return self._query_parted(disk, partition).get(parted_key)
+
+
+    def _query_fields_default(self, partition):
+        fields = query_fields_other + query_fields_lsblk
+        if partition is None:
+            return fields + sorted(query_fields_parted_disk.keys())
+        return fields + sorted(query_fields_parted_partition.keys())
+
+
+    def _query_records(self, kind):
+        """
+        All (disk, partition) pairs sorted by name, partition is None for disks.
+        """
+        records = []
+        for disk in self._disks_all():
+            if kind in [None, 'disk']:
+                records.append((disk, disk, None))
+            if kind in [None, 'part']:
+                for part in self._disk_partitions(disk):
+                    records.append((part, disk, part))
+        records.sort(key=lambda record: record[0])
+        return [(disk, part) for name, disk, part in records]
+
+
+    def _query_cluster_partitions(self, cluster_fsid):
+        output = set()
+        for osd_details in self.model.discovered_osd.get(cluster_fsid, []):
+            for key in ["dev", "dev_journal"]:
+                part = osd_details.get(key)
+                if part is not None:
+                    output.add(part)
+        return output
+
+
+    def _query_match(self, disk, partition, **kwargs):
+        rotational = kwargs.get("rotational")
+        if rotational is not None:
+            rota = self._query_field(disk, partition, 'ROTA')
+            if rota is None:
+                rota = self._query_field(disk, None, 'ROTA')
+            if (rota == "1") != bool(rotational):
+                return False
+        size_min = kwargs.get("size_min")
+        size_max = kwargs.get("size_max")
+        if size_min is not None or size_max is not None:
+            size = self._query_field(disk, partition, 'SIZE')
+            if size is None:
+                return False
+            size = int(size)
+            if size_min is not None and size < int(size_min):
+                return False
+            if size_max is not None and size > int(size_max):
+                return False
+        parttype = kwargs.get("parttype")
+        if parttype is not None:
+            if not isinstance(parttype, (list, tuple, set)):
+                parttype = [parttype]
+            value = self._query_field(disk, partition, 'PARTTYPE')
+            if value is None:
+                return False
+            if not value.lower() in [item.lower() for item in parttype]:
+                return False
+        mounted = kwargs.get("mounted")
+        if mounted is not None:
+            mountpoint = self._query_field(disk, partition, 'MOUNTPOINT')
+            if (mountpoint is not None) != bool(mounted):
+                return False
+        cluster_partitions = kwargs.get("cluster_partitions")
+        if cluster_partitions is not None:
+            if partition is None:
+                if not cluster_partitions.intersection(self._disk_partitions(disk)):
+                    return False
+            elif not partition in cluster_partitions:
+                return False
+        return True
+
+
+    def partition_query(self, **kwargs):
+        '''
+        List disks and partitions matching filters with selected fields
+
+        Args:
+            **kwargs: Arbitrary keyword arguments.
+                fields : List of fields to return, defaults to all fields.
+                kind : 'disk' or 'part', defaults to both.
+                rotational : True or False to match the ROTA field.
+                size_min : Minimum size in bytes.
+                size_max : Maximum size in bytes.
+                parttype : PARTTYPE GUID or list of GUIDs.
+                mounted : True or False to match on having a mount point.
+                cluster_fsid : Only OSD data and journal partitions of this
+                    cluster, and the disks they are on.
+                offset : Skip this many matching records.
+                limit : Return at most this many records.
+
+        Records are sorted by name and only the requested fields are read
+        from the model, fields without a value are left out.
+        '''
+        kind = kwargs.get("kind")
+        if kind is not None and not kind in query_kinds:
+            raise Error("Invalid kind '%s'" % (kind))
+        fields = kwargs.get("fields")
+        if fields is not None:
+            valid_fields = set(self._query_fields_default(None))
+            valid_fields.update(self._query_fields_default(''))
+            for field in fields:
+                if not field in valid_fields:
+                    raise Error("Invalid field '%s'" % (field))
+        filters = dict(kwargs)
+        cluster_fsid = kwargs.get("cluster_fsid")
+        if cluster_fsid is not None:
+            filters["cluster_partitions"] = self._query_cluster_partitions(cluster_fsid)
+        offset = int(kwargs.get("offset", 0))
+        limit = kwargs.get("limit")
+        output = []
+        for disk, partition in self._query_records(kind):
+            if limit is not None and len(output) >= int(limit):
+                break
+            if not self._query_match(disk, partition, **filters):
+                continue
+            if offset > 0:
+                offset -= 1
+                continue
+            record_fields = fields
+            if record_fields is None:
+                record_fields = self._query_fields_default(partition)
+            record = {}
+            for field in record_fields:
+                value = self._query_field(disk, partition, field)
+                if value is None:
+                    continue
+                record[field] = value
+            output.append(record)
+        return output
+
+
+    def _columnar_rows(self):
+        osd_by_partition = {}
+        for cluster_fsid, osd_list in self.model.discovered_osd.items():
+            for osd_details in osd_list:
+                for key in ["dev", "dev_journal"]:
+                    part = osd_details.get(key)
+                    if part is None:
+                        continue
+                    osd_by_partition[part] = (osd_details.get("whoami"), cluster_fsid)
+        for disk, partition in self._query_records(None):
+            rota = self._query_field(disk, partition, 'ROTA')
+            if rota is not None:
+                rota = (rota == "1")
+            osd_id, cluster_fsid = osd_by_partition.get(partition, (None, None))
+            yield (
+                self.model.hostname,
+                disk,
+                partition,
+                self._query_field(disk, partition, 'SIZE'),
+                rota,
+                self._query_field(disk, partition, 'PARTTYPE'),
+                self._query_field(disk, partition, 'FSTYPE'),
+                osd_id,
+                cluster_fsid
+                )
+
+
+    def columnar(self):
+        '''
+        Disks and partitions as typed columns by name, see columnar_schema
+
+        Partition, OSD and cluster columns are null for disk rows. Use
+        util_columnar to pack, merge or write the columns as CSV.
+        '''
+        return util_columnar.encode(columnar_schema, self._columnar_rows())
+
 
     def discover_osd_by_cluster_uuid(self,cluster_uuid):
-        osd_out_list = []
+        return list(self.discover_osd_by_cluster_uuid_iter(cluster_uuid))
+
+    def discover_osd_by_cluster_uuid_iter(self, cluster_uuid, memoise=True):
         osd_in_list = self.model.discovered_osd.get(cluster_uuid)
         if osd_in_list is None:
-            return osd_out_list
+            return
         for osd_in in osd_in_list:
             osd_out = {}
             for key in osd_in.keys():
@@ -230,11 +562,10 @@ class mdl_presentor():
                     disk = self.model.part_pairent.get(part)
                     if disk is None:
                         continue
-                    osd_out[key] = self._partition_details(disk, part)
+                    osd_out[key] = self._partition_details(disk, part, memoise)
                     continue
                 osd_out[key] = osd_in.get(key)
-            osd_out_list.append(osd_out)
-        return osd_out_list
+            yield osd_out
 
     def discover_osd(self):
         output = {}
@@ -242,6 +573,17 @@ class mdl_presentor():
             output[cluster] = self.discover_osd_by_cluster_uuid(cluster)
         return output
 
+    def discover_osd_iter(self):
+        '''
+        Yield (cluster_uuid, osd) for each discovered OSD
+
+        Same records as discover_osd, one OSD at a time.
+        '''
+        # Cluster keys may be None, when an OSD's fsid could not be read
+        for cluster in sorted(self.model.discovered_osd.keys(), key=str):
+            for osd_out in self.discover_osd_by_cluster_uuid_iter(cluster, memoise=False):
+                yield cluster, osd_out
+
     def discover_osd_partitions(self):
         '''
         List all OSD and journal partitions
@@ -272,6 +614,49 @@ class mdl_presentor():
             output.append(part_info)
         return output
 
+    def discovery_snapshot(self):
+        '''
+        Snapshot of disks, partitions, OSD and journals by name
+
+        The snapshot can be stored by the caller and passed to
+        discovery_delta on a later run.
+        '''
+        disks = {}
+        partitions = {}
+        for disk_name, disk_details in self.partitions_all().items():
+            disk_partitions = disk_details.pop("PARTITION", {})
+            disk_details["PARTITION"] = sorted(disk_partitions.keys())
+            disks[disk_name] = disk_details
+            for part_name, part_details in disk_partitions.items():
+                part_details["DISK"] = disk_name
+                partitions[part_name] = part_details
+        osd = {}
+        for cluster_uuid, osd_list in self.discover_osd().items():
+            for osd_details in osd_list:
+                osd_fsid = osd_details.get("fsid")
+                if osd_fsid is None:
+                    continue
+                osd_details["ceph_fsid"] = cluster_uuid
+                osd[osd_fsid] = osd_details
+        journals = {}
+        for journal_details in self.discover_journal_partitions():
+            journal_name = journal_details.get("NAME")
+            if journal_name is None:
+                continue
+            journals[journal_name] = journal_details
+        return {
+            "disks" : disks,
+            "partitions" : partitions,
+            "osd" : osd,
+            "journals" : journals,
+            }
+
+    def discovery_delta(self, previous):
+        '''
+        Changes since the snapshot 'previous' was made
+        '''
+        return mdl_diff.diff(previous, self.discovery_snapshot())
+
     def mon_status(self):
         """
         Present the monitor status
@@ -63,16 +63,7 @@ class purger(object):
 
     def unmount_osd(self):
         for part in self.model.partitions_osd:
-            disk = self.model.part_pairent.get(part)
-            if disk is None:
-                continue
-            disk_details = self.model.lsblk.get(disk)
-            if disk_details is None:
-                continue
-            all_parts = disk_details.get('PARTITION')
-            if all_parts is None:
-                continue
-            part_details = all_parts.get(part)
+            part_details = self.model.idx_partition.get(part)
             if part_details is None:
                 continue
             mountpoint =  part_details.get("MOUNTPOINT")
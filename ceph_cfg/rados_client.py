@@ -7,6 +7,7 @@ import os
 import pwd
 
 # Local imports
+from . import admin_socket
 from . import utils
 from . import model
 from . import mdl_updater
@@ -15,10 +16,15 @@ from . import util_which
 from . import keyring
 from . import mdl_query
 from . import constants
+from . import util_wait
 
 
 log = logging.getLogger(__name__)
 
+
+# Seconds allowed for a started daemon to answer on its admin socket
+activate_timeout = 60
+
 class Error(Exception):
     """
     Error
@@ -89,6 +95,32 @@ class ctrl_rados_client(object):
         if not isrunning:
             self.init_system.start(**arguments)
         self.init_system.on_boot_enable(**arguments)
+        if not isrunning:
+            self._activate_wait()
+
+
+    def _responding(self, path_asok):
+        if not os.path.exists(path_asok):
+            return False
+        try:
+            admin_socket.command(path_asok, "version")
+        except admin_socket.Error:
+            return False
+        return True
+
+
+    def _activate_wait(self):
+        """
+        Wait for a started daemon to answer on its admin socket
+        """
+        daemon_type, identifier = self.keyring_service_name.split(".", 1)
+        path_asok = admin_socket.path_get(self.model.cluster_name, daemon_type,
+            identifier)
+        waiter = util_wait.waiter(activate_timeout, watch_path=path_asok)
+        if not waiter.wait(lambda: self._responding(path_asok)):
+            raise Error("'%s' did not respond after '%s' seconds" % (
+                self.keyring_service_name,
+                activate_timeout))
 
 
 
@@ -2,20 +2,28 @@
 
 # Import Python Libs
 from __future__ import absolute_import
+import functools
+import json
 import logging
 import os
-import json
 
 # Local imports
 from . import keyring
 from . import utils
 from . import util_which
+from . import util_cache
+from . import util_parallel
 from . import constants
+from . import mon_select
 
 
 log = logging.getLogger(__name__)
 
 
+# Keyring types tried by connect, the first one that works is used.
+keyring_types_priority = ["admin", "osd", "mds", "rgw", "mon"]
+
+
 class Error(Exception):
     """
     Error
@@ -37,7 +45,7 @@ class connection():
     def arguments_get(self):
         if not self.has_connected():
             self.connect()
-        if self.has_connected:
+        if self.has_connected():
             return [
                     '--connect-timeout',
                     '%s' % (constants.ceph_remote_call_timeout),
@@ -45,10 +53,18 @@ class connection():
                     self.model.connection.keyring_path,
                     "--name",
                     self.model.connection.keyring_identity,
-                ]
+                ] + self.mon_arguments_get()
         raise Error("Failed to connect to cluster")
 
 
+    def mon_arguments_get(self):
+        """
+        Point the client at the reachable mons
+        """
+        selector = mon_select.mon_selector(self.model)
+        return selector.arguments_get()
+
+
     def has_connected(self):
         if self.model.connection.keyring_type is None:
             return False
@@ -59,36 +75,177 @@ class connection():
         return True
 
 
-    def connect(self):
-        if self.has_connected() is True:
-            return True
+    def _cache_name(self):
+        cluster = self.model.cluster_uuid
+        if cluster is None:
+            cluster = self.model.cluster_name
+        if cluster is None:
+            return None
+        return "connection-%s" % (cluster)
+
+
+    def _candidates(self):
+        """
+        Existing keyrings as (type, path, identity) in priority order
+        """
+        candidates = []
         keyring_obj = keyring.keyring_facard(self.model)
-        for keytype in ["admin", "osd", "mds", "rgw", "mon"]:
-            log.debug("Trying keyring:%s" % (keytype))
+        for keytype in keyring_types_priority:
             keyring_obj.key_type = keytype
             keyring_path = keyring_obj.keyring_path_get()
             if not os.path.isfile(keyring_path):
                 log.debug("Skipping keyring %s" % (keyring_path))
                 continue
-            keyring_identity = keyring_obj.keyring_identity_get()
-            arguments = [
-                util_which.which_ceph.path,
-                '--connect-timeout',
-                '%s' % (constants.ceph_remote_call_timeout),
-                "--keyring",
-                keyring_path,
-                "--name",
-                keyring_identity,
-                "-f",
-                "json-pretty",
-                "status"
-            ]
-            output = utils.execute_local_command(arguments)
-            if output["retcode"] != 0:
+            candidates.append((keytype, keyring_path, keyring_obj.keyring_identity_get()))
+        return candidates
+
+
+    def _probe(self, keyring_path, keyring_identity):
+        """
+        Check a keyring can talk to the mons, using quorum_status which
+        is far cheaper for the mons than a full status.
+
+        Returns the quorum status, None if the keyring did not work.
+        """
+        arguments = [
+            util_which.which_ceph.path,
+            '--connect-timeout',
+            '%s' % (constants.ceph_remote_call_timeout),
+            "--keyring",
+            keyring_path,
+            "--name",
+            keyring_identity,
+        ] + self.mon_arguments_get() + [
+            "-f",
+            "json",
+            "quorum_status"
+        ]
+        output = utils.execute_local_command(arguments)
+        if output["retcode"] != 0:
+            return None
+        try:
+            return json.loads(output["stdout"].strip())
+        except ValueError:
+            return None
+
+
+    def _cache_load(self, candidates):
+        cache_name = self._cache_name()
+        if cache_name is None:
+            return None
+        cached = util_cache.load(cache_name, constants.connection_cache_ttl)
+        if not isinstance(cached, dict):
+            return None
+        for keytype, keyring_path, keyring_identity in candidates:
+            if keytype != cached.get("keyring_type"):
                 continue
-            self.model.cluster_status = json.loads(output["stdout"].strip())
-            self.model.connection.keyring_type = keytype
-            self.model.connection.keyring_path = keyring_path
-            self.model.connection.keyring_identity = keyring_identity
+            if keyring_path != cached.get("keyring_path"):
+                return None
+            if keyring_identity != cached.get("keyring_identity"):
+                return None
+            if util_cache.file_signature(keyring_path) != cached.get("keyring_signature"):
+                return None
+            return (keytype, keyring_path, keyring_identity)
+        return None
+
+
+    def _cache_save(self, candidate):
+        cache_name = self._cache_name()
+        if cache_name is None:
+            return
+        keytype, keyring_path, keyring_identity = candidate
+        util_cache.save(cache_name, {
+            "keyring_type" : keytype,
+            "keyring_path" : keyring_path,
+            "keyring_identity" : keyring_identity,
+            "keyring_signature" : util_cache.file_signature(keyring_path)
+            })
+
+
+    def connect(self):
+        """
+        Find a keyring that can talk to the cluster
+
+        All existing keyrings are probed at the same time and the first in
+        priority order that works is used. The choice is cached per cluster
+        until the keyring file changes, so later processes skip probing.
+        The quorum status from the probe is stored in the model, the cluster
+        status is not.
+        """
+        if self.has_connected() is True:
             return True
-        return False
+        candidates = self._candidates()
+        if len(candidates) == 0:
+            return False
+        chosen = self._cache_load(candidates)
+        cached = chosen is not None
+        if chosen is None:
+            # Fail here rather than in every probe if ceph is missing.
+            util_which.which_ceph.path
+            # Rank the mons once rather than in every probe.
+            self.mon_arguments_get()
+            tasks = []
+            for keytype, keyring_path, keyring_identity in candidates:
+                log.debug("Trying keyring:%s" % (keytype))
+                tasks.append((keytype, functools.partial(self._probe,
+                    keyring_path,
+                    keyring_identity)))
+            results = util_parallel.run(tasks, len(tasks))
+            for index in range(len(candidates)):
+                if results[index].result is not None:
+                    chosen = candidates[index]
+                    self.model.quorum_status = results[index].result
+                    break
+            if chosen is None:
+                return False
+            self._cache_save(chosen)
+        keytype, keyring_path, keyring_identity = chosen
+        self.model.connection.keyring_type = keytype
+        self.model.connection.keyring_path = keyring_path
+        self.model.connection.keyring_identity = keyring_identity
+        self.model.connection.keyring_cached = cached
+        return True
+
+
+    def _reconnect(self):
+        """
+        Forget the cached keyring and probe all keyrings again
+
+        Returns True if a different keyring was chosen.
+        """
+        previous = (self.model.connection.keyring_type,
+            self.model.connection.keyring_path,
+            self.model.connection.keyring_identity)
+        cache_name = self._cache_name()
+        if cache_name is not None:
+            util_cache.remove(cache_name)
+        self.model.connection.keyring_type = None
+        self.model.connection.keyring_path = None
+        self.model.connection.keyring_identity = None
+        self.model.connection.keyring_cached = False
+        if not self.connect():
+            return False
+        chosen = (self.model.connection.keyring_type,
+            self.model.connection.keyring_path,
+            self.model.connection.keyring_identity)
+        return chosen != previous
+
+
+    def execute(self, postfix_arguments):
+        """
+        Run a ceph command connected to the cluster
+
+        Returns the arguments run and the output of
+        utils.execute_local_command. A cached keyring is not probed, so if
+        a command fails with one the keyrings are probed again, and the
+        command is run once more if a different keyring is chosen.
+        """
+        arguments = [util_which.which_ceph.path] + self.arguments_get() + postfix_arguments
+        output = utils.execute_local_command(arguments)
+        if output["retcode"] == 0 or not self.model.connection.keyring_cached:
+            return arguments, output
+        log.debug("Command failed with cached keyring:%s" % (self.model.connection.keyring_type))
+        if not self._reconnect():
+            return arguments, output
+        arguments = [util_which.which_ceph.path] + self.arguments_get() + postfix_arguments
+        return arguments, utils.execute_local_command(arguments)
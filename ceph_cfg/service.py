@@ -1,10 +1,14 @@
 # Import Python Libs
 from __future__ import absolute_import
+import functools
 import logging
+import threading
+import time
 
 # Local imports
 from . import utils
 from . import util_which
+from . import util_parallel
 
 
 log = logging.getLogger(__name__)
@@ -13,6 +17,57 @@ log = logging.getLogger(__name__)
 init_types_available = set([ "systemd" , "sysV"])
 
 
+# Unit properties read by the batched state queries
+unit_properties = ["Id", "ActiveState", "SubState", "UnitFileState"]
+
+# Seconds a unit state is reused, short as units change outside this module
+unit_cache_ttl = 5
+
+# systemd unit name to [time read, properties]
+_unit_cache = {}
+_unit_cache_lock = threading.Lock()
+
+
+def unit_cache_clear():
+    with _unit_cache_lock:
+        _unit_cache.clear()
+
+
+def _unit_cache_get(name):
+    with _unit_cache_lock:
+        entry = _unit_cache.get(name)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > unit_cache_ttl:
+            del _unit_cache[name]
+            return None
+        return dict(entry[1])
+
+
+def _unit_cache_set(name, properties):
+    with _unit_cache_lock:
+        _unit_cache[name] = [time.time(), dict(properties)]
+
+
+def _unit_cache_update(name, **properties):
+    """
+    Record a state change made by this module on a cached unit
+    """
+    with _unit_cache_lock:
+        entry = _unit_cache.get(name)
+        if entry is not None:
+            entry[1].update(properties)
+
+
+def _unit_cache_drop(name):
+    """
+    Forget a unit whose new state cannot be known yet, such as a started
+    daemon that may die right away
+    """
+    with _unit_cache_lock:
+        _unit_cache.pop(name, None)
+
+
 def Property(func):
     return property(**func())
 
@@ -37,6 +92,72 @@ class init_exception_service(init_exception):
         self.msg = msg
 
 
+# systemctl verb of each init_system action
+_systemctl_verbs = {
+    "start" : "start",
+    "stop" : "stop",
+    "restart" : "restart",
+    "on_boot_enable" : "enable",
+    "on_boot_disable" : "disable",
+    }
+
+# Unit property and values showing an action is done
+_action_targets = {
+    "start" : ("ActiveState", ["active"]),
+    "stop" : ("ActiveState", ["inactive", "failed"]),
+    "restart" : ("ActiveState", ["active"]),
+    "on_boot_enable" : ("UnitFileState", ["enabled"]),
+    "on_boot_disable" : ("UnitFileState", ["disabled"]),
+    }
+
+
+def _action_cache_update(action, name):
+    """
+    Record a successful action in the unit cache
+    """
+    if action in ["start", "restart"]:
+        _unit_cache_drop(name)
+    elif action == "stop":
+        _unit_cache_update(name, ActiveState="inactive", SubState="dead")
+    elif action == "on_boot_enable":
+        _unit_cache_update(name, UnitFileState="enabled")
+    elif action == "on_boot_disable":
+        _unit_cache_update(name, UnitFileState="disabled")
+
+
+def _action_results(units, names, task_results):
+    """
+    Per unit results of action_many from util_parallel task results
+    """
+    output = []
+    for index in range(len(units)):
+        task_result = task_results[index]
+        result = {
+            "service" : units[index].get("service"),
+            "identifier" : units[index].get("identifier"),
+            "unit" : names[index],
+            "status" : "ok",
+            "error" : None,
+            "seconds" : task_result.seconds
+            }
+        if task_result.error is not None:
+            result["status"] = "failed"
+            result["error"] = str(task_result.error)
+        output.append(result)
+    return output
+
+
+def _action_many_each(implementation, method_name, units, names, parallelism, *args):
+    """
+    Call an init system method per unit, at most parallelism at a time
+    """
+    method = getattr(implementation, method_name)
+    tasks = []
+    for index in range(len(units)):
+        tasks.append((names[index], functools.partial(method, *args, **units[index])))
+    return _action_results(units, names, util_parallel.run(tasks, parallelism))
+
+
 class init_system(object):
     def __init__(self, **kwargs):
         self.log = logging.getLogger("init_system_facade")
@@ -107,6 +228,50 @@ class init_system(object):
         self._check_properties()
         return self._init_type_implementation.on_boot_disable(**kwargs)
 
+    def state_many(self, units):
+        """Get the state of many services at once
+        units is a list of dictionaries with service and identifier.
+        return:
+        List of dictionaries with service, identifier, unit and the unit
+        properties, in the order given.
+        """
+        self._check_properties()
+        return self._init_type_implementation.state_many(units)
+
+    def start_many(self, units, **kwargs):
+        """Start many services
+        units is a list of dictionaries with service and identifier.
+        kwargs:
+        parallelism -- services handled at the same time when they cannot
+            be handled in one call. Defaults to 4.
+        return:
+        List of dictionaries with service, identifier, unit, status of "ok"
+        or "failed", error and seconds, in the order given.
+        """
+        self._check_properties()
+        return self._init_type_implementation.action_many("start", units, **kwargs)
+
+    def stop_many(self, units, **kwargs):
+        self._check_properties()
+        return self._init_type_implementation.action_many("stop", units, **kwargs)
+
+    def restart_many(self, units, **kwargs):
+        self._check_properties()
+        return self._init_type_implementation.action_many("restart", units, **kwargs)
+
+    def on_boot_enable_many(self, units, **kwargs):
+        self._check_properties()
+        return self._init_type_implementation.action_many("on_boot_enable", units, **kwargs)
+
+    def on_boot_disable_many(self, units, **kwargs):
+        self._check_properties()
+        return self._init_type_implementation.action_many("on_boot_disable", units, **kwargs)
+
+    def state_cache_clear(self):
+        """Forget cached service states
+        """
+        unit_cache_clear()
+
 class init_system_systemd():
 
     def _get_systemctl_name(self, **kwargs):
@@ -119,38 +284,159 @@ class init_system_systemd():
         return service
 
 
-    def is_running(self, **kwargs):
+    def _units_show(self, names):
+        """
+        Properties of many units with one systemctl call
 
-        systemctl_name = self._get_systemctl_name(**kwargs)
+        systemctl prints the properties of each unit in the order given,
+        with a blank line between units.
+        """
         arguments = [
                 util_which.which_systemctl.path,
                 'show',
                 '--property',
-                'ActiveState',
-                systemctl_name,
-            ]
+                ",".join(unit_properties),
+            ] + names
         output = utils.execute_local_command(arguments)
         if output["retcode"] != 0:
             raise init_exception_service("failed to query state from '%s' Error rc=%s, stdout=%s stderr=%s" % (
-                    systemctl_name,
+                    " ".join(names),
                     output["retcode"],
                     output["stdout"],
                     output["stderr"])
                     )
-        running = None
+        blocks = []
+        block = {}
         for item in output["stdout"].split('\n'):
+            if len(item.strip()) == 0:
+                if len(block) > 0:
+                    blocks.append(block)
+                block = {}
+                continue
             split_item = item.split('=')
-            key = split_item[0]
-            value = "=".join(split_item[1:])
-            if key == "ActiveState":
-                if value == "active":
-                    running = True
-                else:
-                    running = False
-        if running == None:
+            block[split_item[0]] = "=".join(split_item[1:])
+        if len(block) > 0:
+            blocks.append(block)
+        if len(blocks) != len(names):
+            raise init_exception_service("failed to get state of '%s', got %s results" % (
+                    " ".join(names),
+                    len(blocks)))
+        states = {}
+        for index in range(len(names)):
+            states[names[index]] = blocks[index]
+            _unit_cache_set(names[index], blocks[index])
+        return states
+
+
+    def _states(self, names):
+        states = {}
+        missing = []
+        for name in names:
+            properties = _unit_cache_get(name)
+            if properties is None:
+                if not name in missing:
+                    missing.append(name)
+                continue
+            states[name] = properties
+        if len(missing) > 0:
+            states.update(self._units_show(missing))
+        return states
+
+
+    def state_many(self, units):
+        names = [self._get_systemctl_name(**unit) for unit in units]
+        states = self._states(names)
+        output = []
+        for index in range(len(units)):
+            item = dict(states[names[index]])
+            item["service"] = units[index].get("service")
+            item["identifier"] = units[index].get("identifier")
+            item["unit"] = names[index]
+            output.append(item)
+        return output
+
+
+    def action_many(self, action, units, **kwargs):
+        """
+        Run an action on many units with one systemctl call
+
+        If the grouped call fails the units are queried, and those not yet
+        in the state the action leads to are retried per unit, at most
+        parallelism at a time. Units are never restarted twice, a unit not
+        active after a failed grouped restart is reported as failed.
+        """
+        parallelism = kwargs.get("parallelism", util_parallel.parallelism_default)
+        verb = _systemctl_verbs.get(action)
+        if verb is None:
+            raise init_exception_service("Invalid action '%s'" % (action))
+        names = [self._get_systemctl_name(**unit) for unit in units]
+        if len(names) == 0:
+            return []
+        arguments = [
+                util_which.which_systemctl.path,
+                verb
+            ] + names
+        time_start = time.time()
+        output = utils.execute_local_command(arguments)
+        seconds = time.time() - time_start
+        results = []
+        for index in range(len(units)):
+            results.append({
+                "service" : units[index].get("service"),
+                "identifier" : units[index].get("identifier"),
+                "unit" : names[index],
+                "status" : "ok",
+                "error" : None,
+                "seconds" : seconds
+                })
+        if output["retcode"] == 0:
+            for name in names:
+                _action_cache_update(action, name)
+            return results
+        log.info("Failed executing '%s': %s" % (
+                " ".join(arguments),
+                output["stderr"]))
+        for name in names:
+            _unit_cache_drop(name)
+        try:
+            states = self._units_show(names)
+        except init_exception_service as err:
+            log.info("Failed to query unit states: %s" % (err))
+            states = {}
+        property_name, values = _action_targets[action]
+        retry = []
+        for index in range(len(units)):
+            value = states.get(names[index], {}).get(property_name)
+            if value in values:
+                continue
+            if action == "restart":
+                results[index]["status"] = "failed"
+                results[index]["error"] = "%s=%s after restart: %s" % (
+                    property_name,
+                    value,
+                    output["stderr"])
+                continue
+            retry.append(index)
+        if len(retry) == 0:
+            return results
+        log.info("Retrying '%s' per unit for %s" % (verb,
+            " ".join([names[index] for index in retry])))
+        retried = _action_many_each(self, "_action_execute",
+            [units[index] for index in retry],
+            [names[index] for index in retry],
+            parallelism, action)
+        for position in range(len(retry)):
+            results[retry[position]] = retried[position]
+        return results
+
+
+    def is_running(self, **kwargs):
+        systemctl_name = self._get_systemctl_name(**kwargs)
+        active_state = self._states([systemctl_name])[systemctl_name].get("ActiveState")
+        if active_state is None:
             raise init_exception_service("failed to get ActiveState from '%s'" % (
                     systemctl_name))
-        return running
+        return active_state == "active"
 
     def start(self, **kwargs):
         systemctl_name = self._get_systemctl_name(**kwargs)
@@ -167,6 +453,7 @@ class init_system_systemd():
                     output["stdout"],
                     output["stderr"])
                     )
+        _unit_cache_drop(systemctl_name)
         return True
 
     def stop(self, **kwargs):
@@ -184,6 +471,7 @@ class init_system_systemd():
                     output["stdout"],
                     output["stderr"])
                     )
+        _unit_cache_update(systemctl_name, ActiveState="inactive", SubState="dead")
         return True
 
     def restart(self, **kwargs):
@@ -201,6 +489,7 @@ class init_system_systemd():
                     output["stdout"],
                     output["stderr"])
                     )
+        _unit_cache_drop(systemctl_name)
         return True
 
 
@@ -212,7 +501,18 @@ class init_system_systemd():
                 'enable',
                 systemctl_name
             ]
-        utils.execute_local_command(arguments)
+        output = utils.execute_local_command(arguments)
+        if output["retcode"] != 0:
+            # Not raised as callers do not expect it, on_boot_enable_many
+            # reports the failure.
+            log.error("failed to enable '%s' Error rc=%s, stdout=%s stderr=%s" % (
+                    systemctl_name,
+                    output["retcode"],
+                    output["stdout"],
+                    output["stderr"])
+                    )
+            return
+        _unit_cache_update(systemctl_name, UnitFileState="enabled")
 
     def on_boot_disable(self, **kwargs):
         systemctl_name = self._get_systemctl_name(**kwargs)
@@ -221,7 +521,38 @@ class init_system_systemd():
                 'disable',
                 systemctl_name
             ]
-        utils.execute_local_command(arguments)
+        output = utils.execute_local_command(arguments)
+        if output["retcode"] != 0:
+            log.error("failed to disable '%s' Error rc=%s, stdout=%s stderr=%s" % (
+                    systemctl_name,
+                    output["retcode"],
+                    output["stdout"],
+                    output["stderr"])
+                    )
+            return
+        _unit_cache_update(systemctl_name, UnitFileState="disabled")
+
+
+    def _action_execute(self, action, **kwargs):
+        """
+        Run an action on one unit, raising if it fails
+        """
+        systemctl_name = self._get_systemctl_name(**kwargs)
+        arguments = [
+                util_which.which_systemctl.path,
+                _systemctl_verbs[action],
+                systemctl_name
+            ]
+        output = utils.execute_local_command(arguments)
+        if output["retcode"] != 0:
+            raise init_exception_service("failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
+                    " ".join(arguments),
+                    output["retcode"],
+                    output["stdout"],
+                    output["stderr"])
+                    )
+        _action_cache_update(action, systemctl_name)
+        return True
 
 class init_system_sysV():
     # TODO: this is largely untested
@@ -292,3 +623,64 @@ class init_system_sysV():
                     'status'
             ]
         utils.execute_local_command(arguments)
+
+
+    def _action_execute(self, action, **kwargs):
+        """
+        Run an action on one service, raising if it fails
+        """
+        service_name = self._get_sysvinit_name(**kwargs)
+        if action in ["on_boot_enable", "on_boot_disable"]:
+            arguments = [
+                    'chkconfig',
+                    service_name,
+                    {"on_boot_enable" : "on", "on_boot_disable" : "off"}[action]
+                ]
+        else:
+            arguments = [
+                    'service',
+                    service_name,
+                    action
+                ]
+        output = utils.execute_local_command(arguments)
+        if output["retcode"] != 0:
+            raise init_exception_service("failed executing '%s' Error rc=%s, stdout=%s stderr=%s" % (
+                    " ".join(arguments),
+                    output["retcode"],
+                    output["stdout"],
+                    output["stderr"])
+                    )
+        return True
+
+
+    def action_many(self, action, units, **kwargs):
+        parallelism = kwargs.get("parallelism", util_parallel.parallelism_default)
+        if not action in ["start", "stop", "restart", "on_boot_enable", "on_boot_disable"]:
+            raise init_exception_service("Invalid action '%s'" % (action))
+        names = [self._get_sysvinit_name(**unit) for unit in units]
+        return _action_many_each(self, "_action_execute", units, names, parallelism, action)
+
+
+    def state_many(self, units):
+        output = []
+        for unit in units:
+            service_name = self._get_sysvinit_name(**unit)
+            arguments = [
+                    'service',
+                    service_name,
+                    'status'
+                ]
+            result = utils.execute_local_command(arguments)
+            active_state = "inactive"
+            if result["retcode"] == 0:
+                active_state = "active"
+            output.append({
+                "service" : unit.get("service"),
+                "identifier" : unit.get("identifier"),
+                "unit" : service_name,
+                "Id" : service_name,
+                "ActiveState" : active_state,
+                "SubState" : None,
+                "UnitFileState" : None,
+                })
+        return output
@@ -0,0 +1,781 @@
+# Import Python Libs
+from __future__ import absolute_import
+import functools
+import logging
+import os
+import os.path
+import threading
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# local modules
+from . import model
+from . import mdl_updater
+from . import mdl_query
+from . import presenter
+from . import remote_connection
+from . import util_configparser
+from . import keyring
+from . import utils
+from . import osd
+from . import mon
+from . import rgw
+from . import mds
+from . import ops_osd
+from . import ops_pool
+from . import ops_cephfs
+from . import ops_auth
+from . import ops_cluster
+from . import ops_drain
+from . import ops_map
+from . import util_json_stream
+from . import util_columnar
+from . import admin_socket
+
+
+log = logging.getLogger(__name__)
+
+
+# Sections of session state that can be invalidated.
+#
+#   cluster      hostname and the cluster name / uuid pair
+#   config       parsed ceph config file and mon members
+#   connection   keyring used to talk to the cluster
+#   disks        symlinks, partitions and discovered OSD
+#   status       mon, cluster and quorum status read from the cluster
+#
+# Pool and cephfs lists are not a section, ops_map checks their map epoch
+# with the cluster every time they are used.
+session_sections = ["cluster", "config", "connection", "disks", "status"]
+
+# Sections of session.inventory, named after the module level functions
+# giving the same output.
+inventory_sections = [
+    "partition_list",
+    "partition_list_osd",
+    "partition_list_journal",
+    "osd_discover",
+    "ceph_version",
+    "mon_status",
+    ]
+
+# Steps of disk discovery in the order they are run.
+_disks_steps = ["symlinks", "partitions", "osd"]
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def _locked(func):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return func(self, *args, **kwargs)
+    return wrapper
+
+
+def _config_path(cluster_name):
+    return "/etc/ceph/%s.conf" % (cluster_name)
+
+
+def _config_mtime(cluster_name):
+    try:
+        return os.stat(_config_path(cluster_name)).st_mtime
+    except OSError:
+        return None
+
+
+class session(object):
+    """
+    Keep one model, updater and connection for many operations.
+
+    State is reused until invalidated. The parsed config is reused while the
+    config file modification time is unchanged and the connection while the
+    keyring it uses still exists. Disk discovery and cluster status are
+    reused until the "disks" and "status" sections are invalidated.
+    """
+    def __init__(self, **kwargs):
+        self.cluster_name = kwargs.get("cluster_name")
+        self.cluster_uuid = kwargs.get("cluster_uuid")
+        self.lock = threading.RLock()
+        self.model = model.model(cluster_name=self.cluster_name,
+            cluster_uuid=self.cluster_uuid)
+        self.updater = mdl_updater.model_updater(self.model)
+        self.connection = remote_connection.connection(self.model)
+        self._cluster_valid = False
+        self._cluster_mtime = None
+        self._config_mtime = None
+        self._disks_done = set()
+
+
+    def _cluster_kwargs(self, kwargs):
+        """
+        kwargs for code that builds its own model
+        """
+        params = dict(kwargs)
+        params.setdefault("cluster_name", self.cluster_name)
+        params.setdefault("cluster_uuid", self.cluster_uuid)
+        return params
+
+
+    @_locked
+    def invalidate(self, *sections):
+        """
+        Drop cached state of sections, all sections if none are given
+        """
+        if len(sections) == 0:
+            sections = session_sections
+        for section in sections:
+            if not section in session_sections:
+                raise Error("Invalid section", section)
+        if "cluster" in sections:
+            self._cluster_valid = False
+            self.model.kargs_apply(cluster_name=self.cluster_name,
+                cluster_uuid=self.cluster_uuid)
+        if "cluster" in sections or "config" in sections:
+            self._config_mtime = None
+        if "connection" in sections:
+            self.model.connection = model.connection()
+        if "disks" in sections:
+            self._disks_done = set()
+        if "status" in sections:
+            self.model.mon_status = None
+            self.model.cluster_status = None
+            self.model.quorum_status = None
+
+
+    @_locked
+    def refresh(self, *sections):
+        """
+        Invalidate then reload sections, all sections if none are given
+        """
+        self.invalidate(*sections)
+        if len(sections) == 0:
+            sections = session_sections
+        if "cluster" in sections:
+            self.cluster_refresh()
+        if "config" in sections:
+            self.config_refresh()
+        if "connection" in sections:
+            self.connect()
+        if "disks" in sections:
+            self.disks_refresh()
+
+
+    @_locked
+    def cluster_refresh(self):
+        """
+        Load hostname and cluster name / uuid
+
+        The cluster name / uuid pair is read from config files so is
+        reloaded when the config file changes.
+        """
+        if self._cluster_valid:
+            if self._cluster_mtime == _config_mtime(self.model.cluster_name):
+                return
+            self._cluster_valid = False
+            self.model.kargs_apply(cluster_name=self.cluster_name,
+                cluster_uuid=self.cluster_uuid)
+        self.updater.hostname_refresh()
+        self.updater.defaults_refresh()
+        self._cluster_mtime = _config_mtime(self.model.cluster_name)
+        self._cluster_valid = True
+
+
+    def _config_refresh_optional(self):
+        """
+        Load the config file if possible, for settings that have defaults
+        """
+        self.cluster_refresh()
+        try:
+            self.config_refresh()
+        except mdl_updater.Error as err:
+            log.debug("Config not loaded: %s" % (err))
+
+
+    @_locked
+    def config_refresh(self):
+        """
+        Load the config file and mon members if the file changed
+        """
+        self.cluster_refresh()
+        mtime = _config_mtime(self.model.cluster_name)
+        if mtime is not None and mtime == self._config_mtime:
+            return
+        self._config_mtime = None
+        self.model.ceph_conf = util_configparser.ConfigParserCeph()
+        self.updater.load_confg(self.model.cluster_name)
+        self.updater.mon_members_refresh()
+        self._config_mtime = mtime
+
+
+    @_locked
+    def connect(self):
+        """
+        Connect to the cluster unless the keyring in use still exists
+        """
+        self._connection_check()
+        return self.connection.connect()
+
+
+    @_locked
+    def disks_refresh(self, symlinks=True, osd_discover=True):
+        """
+        Discover disks, only running steps not yet done
+        """
+        steps = ["partitions"]
+        if symlinks:
+            steps.append("symlinks")
+        if osd_discover:
+            steps.append("osd")
+        for step in _disks_steps:
+            if not step in steps:
+                continue
+            if step in self._disks_done:
+                continue
+            if step == "symlinks":
+                self.updater.symlinks_refresh()
+            if step == "partitions":
+                self.updater.partitions_all_refresh()
+            if step == "osd":
+                self.updater.discover_partitions_refresh()
+            self._disks_done.add(step)
+
+
+    def _connection_check(self):
+        # Ops classes connect on demand, make sure they do not use a
+        # keyring that has since been removed.
+        keyring_path = self.model.connection.keyring_path
+        if keyring_path is not None and not os.path.isfile(keyring_path):
+            log.info("Keyring '%s' removed, reconnecting" % (keyring_path))
+            self.model.connection = model.connection()
+
+
+    def _cluster_ready(self):
+        self.config_refresh()
+        self._connection_check()
+
+
+    @_locked
+    def partition_list(self):
+        self.disks_refresh(osd_discover=False)
+        p = presenter.mdl_presentor(self.model)
+        return p.partitions_all()
+
+
+    @_locked
+    def partition_query(self, **kwargs):
+        fields = kwargs.get("fields")
+        self.disks_refresh(
+            symlinks=(fields is None or "LINK" in fields),
+            osd_discover=(kwargs.get("cluster_fsid") is not None))
+        p = presenter.mdl_presentor(self.model)
+        return p.partition_query(**kwargs)
+
+
+    @_locked
+    def partition_list_stream(self, fp):
+        self.disks_refresh(osd_discover=False)
+        p = presenter.mdl_presentor(self.model)
+        stream = util_json_stream.object_stream(p.partitions_all_iter())
+        util_json_stream.dump(stream, fp)
+
+
+    @_locked
+    def partition_list_columnar(self, output_format="binary"):
+        if not output_format in ["binary", "csv"]:
+            raise Error("Invalid output_format", output_format)
+        self.updater.hostname_refresh()
+        self.disks_refresh(symlinks=False)
+        p = presenter.mdl_presentor(self.model)
+        columns = p.columnar()
+        if output_format == "binary":
+            return util_columnar.pack(presenter.columnar_schema, columns)
+        output = StringIO()
+        util_columnar.write_csv(presenter.columnar_schema, columns, output)
+        return output.getvalue()
+
+
+    @_locked
+    def partition_list_osd(self):
+        self.disks_refresh()
+        p = presenter.mdl_presentor(self.model)
+        return p.discover_osd_partitions()
+
+
+    @_locked
+    def partition_list_journal(self):
+        self.disks_refresh()
+        p = presenter.mdl_presentor(self.model)
+        return p.discover_journal_partitions()
+
+
+    @_locked
+    def osd_discover(self):
+        self.disks_refresh()
+        p = presenter.mdl_presentor(self.model)
+        return p.discover_osd()
+
+
+    @_locked
+    def osd_discover_stream(self, fp):
+        self.disks_refresh()
+        p = presenter.mdl_presentor(self.model)
+        clusters = []
+        for cluster in sorted(self.model.discovered_osd.keys(), key=str):
+            osd_stream = util_json_stream.array_stream(
+                p.discover_osd_by_cluster_uuid_iter(cluster, memoise=False))
+            clusters.append((cluster, osd_stream))
+        stream = util_json_stream.object_stream(clusters)
+        util_json_stream.dump(stream, fp)
+
+
+    @_locked
+    def discovery_snapshot(self):
+        self.disks_refresh()
+        p = presenter.mdl_presentor(self.model)
+        return p.discovery_snapshot()
+
+
+    @_locked
+    def discovery_delta(self, previous):
+        self.disks_refresh()
+        p = presenter.mdl_presentor(self.model)
+        return p.discovery_delta(previous)
+
+
+    @_locked
+    def mon_status(self):
+        try:
+            self.cluster_refresh()
+        except:
+            return {}
+        self.config_refresh()
+        q = mdl_query.mdl_query(self.model)
+        if not q.mon_is():
+            raise mon.Error("Not a mon node")
+        self.updater.mon_status()
+        p = presenter.mdl_presentor(self.model)
+        return p.mon_status()
+
+
+    @_locked
+    def inventory(self, sections=None):
+        """
+        Disks, OSD, ceph version and mon status from one discovery pass
+
+        sections is a list of inventory_sections to include, defaults to all.
+        The mon_status section is empty on nodes that are not mon nodes and
+        on mon nodes whose mon is not running.
+        """
+        if sections is None:
+            sections = inventory_sections
+        for section in sections:
+            if not section in inventory_sections:
+                raise Error("Invalid inventory section", section)
+        output = {}
+        if "partition_list" in sections:
+            output["partition_list"] = self.partition_list()
+        if "partition_list_osd" in sections:
+            output["partition_list_osd"] = self.partition_list_osd()
+        if "partition_list_journal" in sections:
+            output["partition_list_journal"] = self.partition_list_journal()
+        if "osd_discover" in sections:
+            output["osd_discover"] = self.osd_discover()
+        if "ceph_version" in sections:
+            output["ceph_version"] = self.ceph_version()
+        if "mon_status" in sections:
+            try:
+                output["mon_status"] = self.mon_status()
+            except (mon.Error, mdl_updater.Error, admin_socket.Error) as err:
+                log.info("No mon status: %s" % (err))
+                output["mon_status"] = {}
+        return output
+
+
+    @_locked
+    def osd_prepare(self, **kwargs):
+        self.disks_refresh()
+        self.cluster_refresh()
+        osdc = osd.osd_ctrl(self.model)
+        try:
+            return osdc.prepare(**kwargs)
+        finally:
+            self.invalidate("disks")
+
+
+    @_locked
+    def osd_prepare_many(self, specs, **kwargs):
+        self.disks_refresh()
+        self.cluster_refresh()
+        osdc = osd.osd_ctrl(self.model)
+        try:
+            return osdc.prepare_many(specs, **kwargs)
+        finally:
+            self.invalidate("disks")
+
+
+    @_locked
+    def osd_activate(self, **kwargs):
+        self.disks_refresh()
+        self._config_refresh_optional()
+        osdc = osd.osd_ctrl(self.model)
+        try:
+            return osdc.activate_targets(**kwargs)
+        finally:
+            self.invalidate("disks")
+
+
+    @_locked
+    def osd_activate_parallel(self, **kwargs):
+        self.disks_refresh()
+        self._config_refresh_optional()
+        osdc = osd.osd_ctrl(self.model)
+        try:
+            return osdc.activate_targets_parallel(**kwargs)
+        finally:
+            self.invalidate("disks")
+
+
+    @_locked
+    def osd_reweight(self, **kwargs):
+        self.disks_refresh()
+        self._cluster_ready()
+        osd_number_input = kwargs.get("osd_number")
+        weight = kwargs.get("weight")
+        if weight is None:
+            raise Error("weight is not specified")
+        if osd_number_input is None:
+            raise Error("osd_number is not specified")
+        osd_ops = ops_osd.ops_osd(self.model)
+        return osd_ops.reweight(osd_number_input, weight)
+
+
+    @_locked
+    def osd_reweight_many(self, **kwargs):
+        self.disks_refresh()
+        self._cluster_ready()
+        weights = kwargs.get("weights")
+        weight = kwargs.get("weight")
+        crush = kwargs.get("crush", False)
+        osd_ops = ops_osd.ops_osd(self.model)
+        if weights is not None:
+            return osd_ops.reweight_many(weights, crush)
+        if weight is None:
+            raise Error("weights or weight is not specified")
+        return osd_ops.reweight_local(weight, crush)
+
+
+    def _call_locked(self, func, *args):
+        with self.lock:
+            return func(*args)
+
+
+    def osd_drain(self, **kwargs):
+        """
+        Drain OSD's in steps, see ops_drain.drain
+
+        The session is only locked while the cluster is queried or weights
+        are set, not while waiting for recovery.
+        """
+        with self.lock:
+            self.disks_refresh()
+            self._cluster_ready()
+            params = dict(kwargs)
+            osd_list = params.pop("osd_list", None)
+            if osd_list is None:
+                osd_ops = ops_osd.ops_osd(self.model)
+                osd_list = osd_ops._osd_local()
+            scheduler = ops_drain.drain(self.model, osd_list, **params)
+        if not "status" in params:
+            scheduler.status = functools.partial(self._call_locked,
+                scheduler._status_default)
+        if not "reweight" in params:
+            scheduler.reweight = functools.partial(self._call_locked,
+                scheduler._reweight_default)
+        if not "weights_get" in params:
+            scheduler.weights_get = functools.partial(self._call_locked,
+                scheduler._weights_get_default)
+        return scheduler.run()
+
+
+    @_locked
+    def osd_drain_progress(self):
+        """
+        Progress last saved by a drain of this cluster, in any process
+        """
+        self.cluster_refresh()
+        return ops_drain.progress_load(self.model)
+
+
+    @_locked
+    def osd_drain_pause(self, paused=True):
+        """
+        Pause or resume a drain of this cluster running in any process
+        """
+        self.cluster_refresh()
+        ops_drain.pause_set(self.model, paused)
+        return True
+
+
+    def _keyring_facard(self, keyring_type):
+        keyobj = keyring.keyring_facard(self.model)
+        keyobj.key_type = keyring_type
+        return keyobj
+
+
+    @_locked
+    def keyring_create(self, **kwargs):
+        keyring_type = kwargs.get("keyring_type")
+        if (keyring_type is None):
+            raise Error("keyring_type is None")
+        self._cluster_ready()
+        keyobj = self._keyring_facard(keyring_type)
+        return keyobj.create(secret=kwargs.get("secret"))
+
+
+    @_locked
+    def keyring_present(self, **kwargs):
+        keyring_type = kwargs.get("keyring_type")
+        if (keyring_type is None):
+            raise Error("keyring_type is None")
+        try:
+            self.cluster_refresh()
+        except:
+            pass
+        keyobj = self._keyring_facard(keyring_type)
+        return keyobj.present()
+
+
+    @_locked
+    def keyring_purge(self, **kwargs):
+        keyring_type = kwargs.get("keyring_type", None)
+        if (keyring_type is None):
+            raise Error("keyring_type is not set")
+        self._cluster_ready()
+        keyobj = self._keyring_facard(keyring_type)
+        try:
+            return keyobj.remove()
+        finally:
+            self._connection_check()
+
+
+    @_locked
+    def keyring_save(self, **kwargs):
+        key_content = kwargs.get("key_content")
+        secret = kwargs.get("secret")
+        self._cluster_ready()
+        keyobj = self._keyring_facard(kwargs.get("keyring_type"))
+        if secret is not None:
+            utils.is_valid_base64(secret)
+            return keyobj.write_secret(secret)
+        if key_content is not None:
+            return keyobj.write_content(key_content)
+        raise Error("Set either the key_content or the key `secret`")
+
+
+    def _keyring_auth_prepare(self, keyring_type):
+        if (keyring_type is None):
+            raise Error("keyring_type is None")
+        if (keyring_type in set(["mon","admin"])):
+            raise Error("keyring_type is %s" % (keyring_type))
+        self._cluster_ready()
+        q = mdl_query.mdl_query(self.model)
+        if q.mon_is():
+            self.updater.mon_status()
+        keyobj = self._keyring_facard(keyring_type)
+        if not keyobj.present():
+            raise Error("keyring not present")
+
+
+    @_locked
+    def keyring_auth_add(self, **kwargs):
+        keyring_type = kwargs.get("keyring_type")
+        self._keyring_auth_prepare(keyring_type)
+        auth_ops = ops_auth.ops_auth(self.model)
+        return auth_ops.auth_add(keyring_type)
+
+
+    @_locked
+    def keyring_auth_del(self, **kwargs):
+        keyring_type = kwargs.get("keyring_type")
+        self._keyring_auth_prepare(keyring_type)
+        auth_ops = ops_auth.ops_auth(self.model)
+        return auth_ops.auth_del(keyring_type)
+
+
+    @_locked
+    def keyring_auth_list(self):
+        try:
+            self.cluster_refresh()
+        except:
+            return {}
+        self._cluster_ready()
+        auth_ops = ops_auth.ops_auth(self.model)
+        auth_ops.auth_list()
+        p = presenter.mdl_presentor(self.model)
+        return p.auth_list()
+
+
+    @_locked
+    def pool_list(self):
+        try:
+            self.cluster_refresh()
+        except:
+            return {}
+        self._cluster_ready()
+        map_ops = ops_map.ops_map(self.model)
+        map_ops.pool_list()
+        p = presenter.mdl_presentor(self.model)
+        return p.pool_list()
+
+
+    @_locked
+    def pool_add(self, pool_name, **kwargs):
+        self._cluster_ready()
+        map_ops = ops_map.ops_map(self.model)
+        map_ops.pool_list()
+        pool_ops = ops_pool.ops_pool(self.model)
+        try:
+            return pool_ops.pool_add(pool_name, **kwargs)
+        finally:
+            map_ops.invalidate("osdmap")
+
+
+    @_locked
+    def pool_del(self, pool_name):
+        self._cluster_ready()
+        map_ops = ops_map.ops_map(self.model)
+        map_ops.pool_list()
+        pool_ops = ops_pool.ops_pool(self.model)
+        try:
+            return pool_ops.pool_del(pool_name)
+        finally:
+            map_ops.invalidate("osdmap")
+
+
+    @_locked
+    def ceph_version(self):
+        self.updater.ceph_version_refresh()
+        p = presenter.mdl_presentor(self.model)
+        return p.ceph_version()
+
+
+    @_locked
+    def cluster_quorum(self):
+        self._cluster_ready()
+        cluster_ops = ops_cluster.ops_cluster(self.model)
+        cluster_ops.quorum_refresh()
+        q = mdl_query.mdl_query(self.model)
+        return q.cluster_quorum()
+
+
+    @_locked
+    def cluster_status(self):
+        self._cluster_ready()
+        cluster_ops = ops_cluster.ops_cluster(self.model)
+        cluster_ops.status_refresh()
+        p = presenter.mdl_presentor(self.model)
+        return p.cluster_status()
+
+
+    @_locked
+    def cephfs_ls(self):
+        self._cluster_ready()
+        map_ops = ops_map.ops_map(self.model)
+        map_ops.cephfs_list()
+        p = presenter.mdl_presentor(self.model)
+        return p.cephfs_list()
+
+
+    @_locked
+    def cephfs_add(self, fs_name, **kwargs):
+        self._cluster_ready()
+        map_ops = ops_map.ops_map(self.model)
+        map_ops.pool_list()
+        # list the cephfs so we can check we need to do some thing
+        map_ops.cephfs_list()
+        cephfs_ops = ops_cephfs.ops_cephfs(self.model)
+        try:
+            return cephfs_ops.cephfs_add(fs_name, **kwargs)
+        finally:
+            map_ops.invalidate("fsmap")
+
+
+    @_locked
+    def cephfs_del(self, fs_name, **kwargs):
+        self._cluster_ready()
+        map_ops = ops_map.ops_map(self.model)
+        # list the cephfs so we can check we need to do some thing
+        map_ops.cephfs_list()
+        cephfs_ops = ops_cephfs.ops_cephfs(self.model)
+        try:
+            return cephfs_ops.cephfs_del(fs_name, **kwargs)
+        finally:
+            map_ops.invalidate("fsmap")
+
+
+    # mon, rgw and mds controllers keep their own model so are created
+    # per call with this sessions cluster.
+
+    def mon_facard(self, **kwargs):
+        return mon.mon_facard(**self._cluster_kwargs(kwargs))
+
+
+    def rgw_ctrl(self, **kwargs):
+        ctrl_rgw = rgw.rgw_ctrl(**self._cluster_kwargs(kwargs))
+        ctrl_rgw.update()
+        return ctrl_rgw
+
+
+    def mds_ctrl(self, **kwargs):
+        ctrl_mds = mds.mds_ctrl(**self._cluster_kwargs(kwargs))
+        ctrl_mds.update()
+        return ctrl_mds
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session_get(**kwargs):
+    """
+    Shared session for the cluster_name and cluster_uuid in kwargs
+    """
+    key = (kwargs.get("cluster_name"), kwargs.get("cluster_uuid"))
+    with _sessions_lock:
+        output = _sessions.get(key)
+        if output is None:
+            output = session(cluster_name=key[0], cluster_uuid=key[1])
+            _sessions[key] = output
+        return output
+
+
+def session_default(**kwargs):
+    """
+    Shared session for module level functions
+
+    Disks and cluster status may have changed since the previous call so
+    both are always invalidated, other sections are checked for validity
+    as used.
+    """
+    output = session_get(**kwargs)
+    output.invalidate("disks", "status")
+    return output
+
+
+def sessions_clear():
+    """
+    Forget all shared sessions
+    """
+    with _sessions_lock:
+        _sessions.clear()
@@ -0,0 +1,64 @@
+"""
+Fake ceph daemon admin socket for tests and benchmarks.
+"""
+import json
+import os
+import socket
+import struct
+import threading
+
+
+class asok_fake(object):
+    """
+    Answer admin socket requests from replies, a dictionary of command
+    prefix to reply value. Like a daemon it closes each connection after
+    one reply.
+    """
+    def __init__(self, path, replies):
+        self.path = path
+        self.replies = replies
+        self.requests = []
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen(16)
+        self.thread = threading.Thread(target=self._serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def _serve(self):
+        while True:
+            try:
+                conn, addr = self.listener.accept()
+            except socket.error:
+                return
+            try:
+                self._handle(conn)
+            finally:
+                conn.close()
+
+
+    def _handle(self, conn):
+        data = b""
+        while not data.endswith(b"\0"):
+            chunk = conn.recv(4096)
+            if len(chunk) == 0:
+                return
+            data += chunk
+        request = json.loads(data[:-1].decode('utf-8'))
+        self.requests.append(request)
+        reply = self.replies.get(request["prefix"])
+        if reply is None:
+            reply = {"error" : "unknown command"}
+        reply_bytes = json.dumps(reply).encode('utf-8')
+        conn.sendall(struct.pack(">I", len(reply_bytes)) + reply_bytes)
+
+
+    def close(self):
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.listener.close()
+        self.thread.join()
+        os.remove(self.path)
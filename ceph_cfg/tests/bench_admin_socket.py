@@ -0,0 +1,79 @@
+"""
+Benchmark the native admin socket client against the ceph CLI.
+
+The native client talks to a fake daemon socket. The CLI is only timed
+when a ceph binary is installed, against the same socket.
+
+Run with:
+
+    python -m ceph_cfg.tests.bench_admin_socket [socket_count]
+"""
+from __future__ import print_function
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import ceph_cfg.admin_socket
+import ceph_cfg.tests.asok_fake
+
+try:
+    from distutils.spawn import find_executable
+except ImportError:
+    from shutil import which as find_executable
+
+
+mon_status = {
+    "name" : "node1",
+    "rank" : 0,
+    "state" : "leader",
+    "quorum" : [0, 1, 2],
+    "outside_quorum" : [],
+    }
+
+
+def _cli(ceph_path, path):
+    with open(os.devnull, "w") as devnull:
+        subprocess.check_call([ceph_path, "--admin-daemon", path, "mon_status"],
+            stdout=devnull)
+
+
+def main(socket_count):
+    run_dir = tempfile.mkdtemp()
+    servers = []
+    try:
+        paths = []
+        for index in range(socket_count):
+            path = os.path.join(run_dir, "ceph-osd.%s.asok" % (index))
+            servers.append(ceph_cfg.tests.asok_fake.asok_fake(path,
+                {"mon_status" : mon_status}))
+            paths.append(path)
+        requests = [(path, "mon_status") for path in paths]
+        number = 20
+        results = [
+            ("native one", lambda: ceph_cfg.admin_socket.command(paths[0], "mon_status")),
+            ("native serial", lambda: [ceph_cfg.admin_socket.command(path, "mon_status") for path in paths]),
+            ("native parallel", lambda: ceph_cfg.admin_socket.command_many(requests, parallelism=8)),
+            ]
+        ceph_path = find_executable("ceph")
+        if ceph_path is not None:
+            results.append(("cli one", lambda: _cli(ceph_path, paths[0])))
+        print("sockets: %s" % (socket_count))
+        for name, func in results:
+            seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+            print("%-16s %8.2f ms" % (name, seconds * 1000))
+        if ceph_path is None:
+            print("ceph not installed, CLI not timed")
+    finally:
+        for server in servers:
+            server.close()
+        shutil.rmtree(run_dir)
+
+
+if __name__ == "__main__":
+    socket_count = 60
+    if len(sys.argv) > 1:
+        socket_count = int(sys.argv[1])
+    main(socket_count)
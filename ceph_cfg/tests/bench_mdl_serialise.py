@@ -0,0 +1,135 @@
+"""
+Benchmark model serialisation against plain json of the same data for a
+host with many disks.
+
+Run with:
+
+    python -m ceph_cfg.tests.bench_mdl_serialise [disk_count]
+"""
+from __future__ import print_function
+import json
+import sys
+import timeit
+
+import ceph_cfg.model
+import ceph_cfg.mdl_serialise
+
+
+lsblk_keys = [
+    "NAME", "KNAME", "MAJ:MIN", "FSTYPE", "MOUNTPOINT", "LABEL", "UUID",
+    "PARTTYPE", "PARTLABEL", "PARTUUID", "PARTFLAGS", "RA", "RO", "RM",
+    "MODEL", "SERIAL", "SIZE", "STATE", "OWNER", "GROUP", "MODE", "ALIGNMENT",
+    "MIN-IO", "OPT-IO", "PHY-SEC", "LOG-SEC", "ROTA", "SCHED", "RQ-SIZE",
+    "TYPE", "DISC-ALN", "DISC-GRAN", "DISC-MAX", "DISC-ZERO", "WSAME", "WWN",
+    "RAND", "PKNAME", "HCTL", "TRAN", "REV", "VENDOR"
+    ]
+
+
+def _lsblk_device(name, index, parent):
+    device = {}
+    for key in lsblk_keys:
+        device[key] = "0"
+    device["NAME"] = name
+    device["KNAME"] = name
+    device["MAJ:MIN"] = "8:%s" % (index)
+    device["SIZE"] = "4000787030016"
+    device["ROTA"] = "1"
+    device["OWNER"] = "root"
+    device["GROUP"] = "disk"
+    device["MODE"] = "brw-rw----"
+    device["SCHED"] = "deadline"
+    device["TYPE"] = "disk"
+    device["SERIAL"] = "ZC1%07d" % (index)
+    device["WWN"] = "0x5000c500%08x" % (index)
+    if parent is not None:
+        device["TYPE"] = "part"
+        device["PKNAME"] = parent
+        device["PARTUUID"] = "a8d6b1a6-0000-4000-8000-%012d" % (index)
+        device["UUID"] = "5c2f3f4a-0000-4000-8000-%012d" % (index)
+        device["PARTTYPE"] = "4fbd7e29-9d25-41b8-afd0-062c0ceff05d"
+        device["FSTYPE"] = "xfs"
+    return device
+
+
+def make_model(disk_count):
+    mdl = ceph_cfg.model.model(cluster_name="ceph")
+    mdl.hostname = "node"
+    for disk_index in range(disk_count):
+        disk_name = "/dev/disk%s" % (disk_index)
+        disk = _lsblk_device(disk_name, disk_index * 16, None)
+        disk["PARTITION"] = {}
+        parted_parts = {}
+        for part_index in (1, 2):
+            part_name = "%s%s" % (disk_name, part_index)
+            disk["PARTITION"][part_name] = _lsblk_device(part_name,
+                disk_index * 16 + part_index, disk_name)
+            mdl.part_pairent[part_name] = disk_name
+            parted_parts[part_name] = {
+                'Path' : part_name,
+                'Number' : str(part_index),
+                'Start' : '1049kB',
+                'End' : '4001GB',
+                'Size' : '4001GB',
+                'File system' : 'xfs',
+                'Flags' : ['xfs']
+                }
+            mdl.symlinks[part_name] = [
+                "/dev/disk/by-partuuid/%s" % (disk["PARTITION"][part_name]["PARTUUID"]),
+                "/dev/disk/by-id/wwn-%s-part%s" % (disk["WWN"], part_index),
+                ]
+        mdl.lsblk[disk_name] = disk
+        mdl.parted[disk_name] = {
+            'disk' : disk_name,
+            'size' : '4001GB',
+            'driver' : 'scsi',
+            'sector_size_logical' : '512',
+            'sector_size_physical' : '4096',
+            'table' : 'gpt',
+            'vendor' : 'ATA ST4000NM0035',
+            'partition' : parted_parts
+            }
+        mdl.symlinks[disk_name] = [
+            "/dev/disk/by-id/wwn-%s" % (disk["WWN"]),
+            "/dev/disk/by-path/pci-0000:00:1f.2-ata-%s" % (disk_index),
+            ]
+    return mdl
+
+
+def _json_dumps(mdl):
+    return json.dumps({
+        "lsblk" : mdl.lsblk,
+        "parted" : mdl.parted,
+        "symlinks" : mdl.symlinks,
+        "part_pairent" : mdl.part_pairent,
+        })
+
+
+def main(disk_count):
+    mdl = make_model(disk_count)
+    number = 5
+    json_data = _json_dumps(mdl)
+    model_data = ceph_cfg.mdl_serialise.dumps(mdl)
+    reader = ceph_cfg.mdl_serialise.model_reader(model_data)
+    disk_name = reader.disks()[disk_count // 2]
+    results = [
+        ("json dump", lambda: _json_dumps(mdl)),
+        ("json load", lambda: json.loads(json_data)),
+        ("model dump", lambda: ceph_cfg.mdl_serialise.dumps(mdl)),
+        ("model decode", lambda: reader.records()),
+        ("model load", lambda: ceph_cfg.mdl_serialise.loads(model_data)),
+        ("model open", lambda: ceph_cfg.mdl_serialise.model_reader(model_data)),
+        ("model one disk", lambda: reader.disk(disk_name)),
+        ]
+    print("disks: %s" % (disk_count))
+    print("json size: %s bytes" % (len(json_data)))
+    print("model size: %s bytes" % (len(model_data)))
+    for name, func in results:
+        seconds = min(timeit.repeat(func, number=number, repeat=7)) / number
+        print("%-16s %8.2f ms" % (name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    disk_count = 1000
+    if len(sys.argv) > 1:
+        disk_count = int(sys.argv[1])
+    main(disk_count)
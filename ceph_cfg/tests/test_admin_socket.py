@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import pytest
+import ceph_cfg.admin_socket
+import ceph_cfg.constants
+import ceph_cfg.model
+import ceph_cfg.mdl_updater
+import ceph_cfg.tests.asok_fake
+
+import mock
+
+
+class Test_admin_socket(object):
+    def setup(self):
+        self.run_dir = tempfile.mkdtemp()
+        self.patch = mock.patch.object(ceph_cfg.constants, '_path_ceph_run', self.run_dir)
+        self.patch.start()
+        self.servers = []
+        for daemon, state in [("mon.node1", "leader"), ("osd.0", "active"), ("osd.1", "active")]:
+            path = os.path.join(self.run_dir, "ceph-%s.asok" % (daemon))
+            self.servers.append(ceph_cfg.tests.asok_fake.asok_fake(path, {
+                "mon_status" : {"name" : "node1", "state" : state, "outside_quorum" : []},
+                "status" : {"state" : state},
+                }))
+
+
+    def teardown(self):
+        for server in self.servers:
+            server.close()
+        self.patch.stop()
+        shutil.rmtree(self.run_dir)
+
+
+    def test_command(self):
+        path = ceph_cfg.admin_socket.path_get("ceph", "mon", "node1")
+        output = ceph_cfg.admin_socket.command(path, "mon_status")
+        assert output["state"] == "leader"
+        assert self.servers[0].requests == [{"prefix" : "mon_status", "format" : "json"}]
+
+
+    def test_missing_socket(self):
+        path = ceph_cfg.admin_socket.path_get("ceph", "mon", "other")
+        with pytest.raises(ceph_cfg.admin_socket.Error):
+            ceph_cfg.admin_socket.command(path, "mon_status")
+
+
+    def test_command_many(self):
+        paths = ceph_cfg.admin_socket.sockets_list("ceph")
+        assert len(paths) == 3
+        requests = [(path, "status") for path in paths]
+        requests.append((os.path.join(self.run_dir, "ceph-osd.9.asok"), "status"))
+        output = ceph_cfg.admin_socket.command_many(requests, parallelism=4)
+        assert [item["path"] for item in output] == [path for path, prefix in requests]
+        assert [item["result"]["state"] for item in output[:3]] == ["leader", "active", "active"]
+        assert output[3]["result"] is None
+        assert "Failed talking" in output[3]["error"]
+
+
+    def test_mon_status_updater(self):
+        model = ceph_cfg.model.model(cluster_name="ceph")
+        model.hostname = "node1"
+        updater = ceph_cfg.mdl_updater.model_updater(model)
+        with mock.patch('ceph_cfg.utils.execute_local_command') as execute:
+            updater.mon_status()
+            assert execute.call_count == 0
+        assert model.mon_status["state"] == "leader"
+        model.hostname = "node2"
+        with pytest.raises(ceph_cfg.mdl_updater.Error):
+            updater.mon_status()
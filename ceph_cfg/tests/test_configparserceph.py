@@ -61,3 +61,14 @@ class Test_util_configparser(object):
         config.read(file_name)
         value = config.get("mysqld", "user_2")
         assert value == "mysql"
+
+
+    def test_dash_as_underscore(self):
+        config = ConfigParser()
+        file_name = os.path.join(self.test_dir,"file")
+        with open(file_name, 'wt') as fp:
+            fp.write("[osd]\n")
+            fp.write("osd-mount-options-xfs = rw\n")
+        config.read(file_name)
+        value = config.get("osd", "osd mount options xfs")
+        assert value == "rw"
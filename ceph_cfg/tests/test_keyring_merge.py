@@ -0,0 +1,69 @@
+import os
+import shutil
+import stat
+import tempfile
+import pytest
+import ceph_cfg.keyring
+
+
+keyring_mon = """[mon.]
+key = AQBvaBFZAAAAABAA9VHgwCg3rWn8fMaX8KL01A==
+caps mon = "allow *"
+"""
+
+keyring_admin = """# written by ceph-authtool
+[client.admin]
+\tkey = AQBvaBFZAAAAABAAz1T1Ee8F6BFs1nCHBOMYpA==
+\tcaps mds = "allow *"
+\tcaps mon = "allow *"
+\tcaps osd = "allow *"
+"""
+
+keyring_osd = """[client.bootstrap-osd]
+\tkey = AQBvaBFZAAAAABAAhwJ4AJMaRvlShkIEQoqsBg==
+\tcaps mon = "allow profile bootstrap-osd"
+"""
+
+
+class Test_keyring_merge(object):
+    def setup(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.paths = []
+        for name, content in [("mon", keyring_mon), ("admin", keyring_admin), ("osd", keyring_osd)]:
+            path = os.path.join(self.test_dir, name)
+            with open(path, "w") as keyring_file:
+                keyring_file.write(content)
+            self.paths.append(path)
+
+
+    def teardown(self):
+        shutil.rmtree(self.test_dir)
+
+
+    def test_merge(self):
+        key_path = os.path.join(self.test_dir, "tmp", "keyring")
+        names = ceph_cfg.keyring.keyring_merge(self.paths, key_path)
+        assert names == ["mon.", "client.admin", "client.bootstrap-osd"]
+        assert stat.S_IMODE(os.stat(key_path).st_mode) == 0o600
+        with open(key_path) as keyring_file:
+            sections = ceph_cfg.keyring.keyring_sections(keyring_file.read())
+        assert sections[2] == ("client.bootstrap-osd", [
+            "key = AQBvaBFZAAAAABAAhwJ4AJMaRvlShkIEQoqsBg==",
+            'caps mon = "allow profile bootstrap-osd"'
+            ])
+        assert len(sections[1][1]) == 4
+
+
+    def test_later_replaces(self):
+        path = os.path.join(self.test_dir, "mon2")
+        with open(path, "w") as keyring_file:
+            keyring_file.write("[mon.]\nkey = other\n")
+        key_path = os.path.join(self.test_dir, "keyring")
+        assert ceph_cfg.keyring.keyring_merge([self.paths[0], path], key_path) == ["mon."]
+        with open(key_path) as keyring_file:
+            assert keyring_file.read() == "[mon.]\n\tkey = other\n"
+
+
+    def test_invalid(self):
+        with pytest.raises(ceph_cfg.keyring.Error):
+            ceph_cfg.keyring.keyring_sections("key = x\n[mon.]\n")
@@ -0,0 +1,63 @@
+import pytest
+import copy
+import ceph_cfg.mdl_diff
+
+
+snapshot_old = {
+    "disks" : {
+        "/dev/vda" : {"NAME" : "/dev/vda", "SIZE" : "21474836480", "PARTITION" : ["/dev/vda1"]},
+        "/dev/vdb" : {"NAME" : "/dev/vdb", "SIZE" : "21474836480", "PARTITION" : []},
+        },
+    "partitions" : {
+        "/dev/vda1" : {"NAME" : "/dev/vda1", "FSTYPE" : "ext4", "MOUNTPOINT" : "/boot"},
+        },
+    "osd" : {},
+    "journals" : {},
+    }
+
+
+class Test_mdl_diff(object):
+    def setup(self):
+        self.old = copy.deepcopy(snapshot_old)
+        self.new = copy.deepcopy(snapshot_old)
+
+
+    def test_identical(self):
+        assert ceph_cfg.mdl_diff.diff(self.old, self.new) == {}
+
+
+    def test_added_removed_changed(self):
+        del self.new["disks"]["/dev/vdb"]
+        self.new["disks"]["/dev/vdc"] = {"NAME" : "/dev/vdc"}
+        self.new["partitions"]["/dev/vda1"]["FSTYPE"] = "xfs"
+        del self.new["partitions"]["/dev/vda1"]["MOUNTPOINT"]
+        self.new["osd"]["fsid-1"] = {"whoami" : "1"}
+        delta = ceph_cfg.mdl_diff.diff(self.old, self.new)
+        assert delta["disks"]["removed"] == ["/dev/vdb"]
+        assert delta["disks"]["added"] == {"/dev/vdc" : {"NAME" : "/dev/vdc"}}
+        assert delta["partitions"]["changed"] == {
+            "/dev/vda1" : {
+                "FSTYPE" : {"old" : "ext4", "new" : "xfs"},
+                "MOUNTPOINT" : {"old" : "/boot"},
+                }
+            }
+        assert delta["osd"]["added"] == {"fsid-1" : {"whoami" : "1"}}
+        assert "journals" not in delta
+
+
+    def test_patch(self):
+        self.new["disks"]["/dev/vda"]["SIZE"] = "1"
+        self.new["disks"]["/dev/vda"]["ROTA"] = "0"
+        del self.new["partitions"]["/dev/vda1"]
+        self.new["journals"]["/dev/vdb2"] = {"NAME" : "/dev/vdb2"}
+        delta = ceph_cfg.mdl_diff.diff(self.old, self.new)
+        assert ceph_cfg.mdl_diff.patch(self.old, delta) == self.new
+        # The original snapshot is left untouched.
+        assert self.old == snapshot_old
+
+
+    def test_patch_missing_record(self):
+        delta = {"disks" : {"changed" : {"/dev/vdx" : {"SIZE" : {"new" : "1"}}}}}
+        with pytest.raises(ceph_cfg.mdl_diff.Error) as excinfo:
+            ceph_cfg.mdl_diff.patch(self.old, delta)
+        assert "/dev/vdx" in str(excinfo.value)
@@ -0,0 +1,113 @@
+import json
+import pytest
+import ceph_cfg.model
+import ceph_cfg.mdl_updater
+import ceph_cfg.mdl_serialise
+from ceph_cfg.tests.test_update_lsblk import mock_lsblk
+from ceph_cfg.tests.test_mdl_updater_index import mock_retrive_osd_details
+from ceph_cfg.tests.test_mdl_updater_index import mock_retrive_osd_details_from_dir
+
+import mock
+
+
+class Test_mdl_serialise(object):
+    def setup(self):
+        """
+        Make a model with discovered partitions and OSD
+        """
+        self.model = ceph_cfg.model.model(
+            cluster_name="ceph",
+            cluster_uuid="eaac9695-4265-4ca8-ac2a-f3a479c559b1")
+        self.model.hostname = "node1"
+        self.model.lsblk_version.major = 2
+        self.model.lsblk_version.minor = 25
+        self.model.lsblk_version.revision = 0
+        self.model.mon_members = [("node1", "192.168.43.60")]
+        self.model.symlinks = {
+            "/dev/vda1" : ["/dev/disk/by-uuid/6820d2ff-0293-44c8-aaeb-af8b9a7ca719"],
+            "/dev/sr0" : ["/dev/disk/by-id/ata-QEMU_DVD-ROM_QM00001"],
+            }
+        self.model.parted = {
+            "/dev/vda" : {
+                'disk' : "/dev/vda",
+                'size' : "21.5GB",
+                'table' : "msdos",
+                'vendor' : "Virtio Block Device",
+                'partition' : {
+                    "/dev/vda1" : {
+                        'Path' : "/dev/vda1",
+                        'Number' : "1",
+                        'File system' : "ext4",
+                        'Flags' : ["ext4"],
+                        }
+                    }
+                }
+            }
+        updater = ceph_cfg.mdl_updater.model_updater(self.model)
+        with mock.patch('ceph_cfg.utils.execute_local_command', mock_lsblk):
+            updater.partitions_all_refresh_lsblk()
+        with mock.patch('ceph_cfg.mdl_updater._retrive_osd_details_from_dir', mock_retrive_osd_details_from_dir):
+            with mock.patch('ceph_cfg.mdl_updater.retrive_osd_details', mock_retrive_osd_details):
+                updater.discover_partitions_refresh()
+
+
+    def test_round_trip(self):
+        data = ceph_cfg.mdl_serialise.dumps(self.model)
+        loaded = ceph_cfg.mdl_serialise.loads(data)
+        assert loaded.lsblk == self.model.lsblk
+        assert loaded.parted == self.model.parted
+        assert loaded.symlinks == self.model.symlinks
+        assert loaded.part_pairent == self.model.part_pairent
+        assert loaded.partitions_osd == self.model.partitions_osd
+        assert loaded.discovered_osd == self.model.discovered_osd
+        assert loaded.mon_members == [("node1", "192.168.43.60")]
+        assert loaded.hostname == "node1"
+        assert loaded.cluster_uuid == self.model.cluster_uuid
+        assert loaded.lsblk_version.minor == 25
+        # Indexes are rebuilt on load
+        assert loaded.idx_mountpoint['/boot'] == '/dev/vda1'
+        assert loaded.idx_whoami[(self.model.cluster_uuid, '6')]['dev'] == '/dev/vdc1'
+
+
+    def test_disk_record(self):
+        data = ceph_cfg.mdl_serialise.dumps(self.model)
+        reader = ceph_cfg.mdl_serialise.model_reader(data)
+        assert len(reader.disks()) == 6
+        disk = reader.disk("/dev/vda")
+        assert disk["lsblk"] == self.model.lsblk["/dev/vda"]
+        assert disk["parted"] == self.model.parted["/dev/vda"]
+        assert disk["symlinks"] == {"/dev/vda1" : self.model.symlinks["/dev/vda1"]}
+        with pytest.raises(ceph_cfg.mdl_serialise.Error):
+            reader.disk("/dev/none")
+
+
+    def test_disk_decoded_alone(self):
+        data = ceph_cfg.mdl_serialise.dumps(self.model)
+        reader = ceph_cfg.mdl_serialise.model_reader(data)
+        with mock.patch('json.loads', wraps=json.loads) as loads:
+            reader.disk("/dev/vdb")
+        # Only the record of the disk is decoded
+        assert len(loads.call_args[0][0]) < len(data) // 3
+
+
+    def test_invalid_data(self):
+        data = ceph_cfg.mdl_serialise.dumps(self.model)
+        with pytest.raises(ceph_cfg.mdl_serialise.Error) as excinfo:
+            ceph_cfg.mdl_serialise.loads(data[:-1])
+        assert "Invalid data" in str(excinfo.value)
+        with pytest.raises(ceph_cfg.mdl_serialise.Error) as excinfo:
+            ceph_cfg.mdl_serialise.loads(b'{"format" : "other"}\n')
+        assert "format" in str(excinfo.value)
+        end = data.index(b"\n")
+        header = json.loads(data[:end].decode('utf-8'))
+        header["version"] = ceph_cfg.mdl_serialise.format_version + 1
+        newer = json.dumps(header).encode('utf-8') + data[end:]
+        with pytest.raises(ceph_cfg.mdl_serialise.Error) as excinfo:
+            ceph_cfg.mdl_serialise.loads(newer)
+        assert "version" in str(excinfo.value)
+
+
+    def test_discovered_osd_none_fsid(self):
+        self.model.discovered_osd[None] = [{"whoami" : "9"}]
+        loaded = ceph_cfg.mdl_serialise.loads(ceph_cfg.mdl_serialise.dumps(self.model))
+        assert loaded.discovered_osd[None] == [{"whoami" : "9"}]
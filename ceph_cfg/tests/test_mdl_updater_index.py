@@ -0,0 +1,121 @@
+#Test units
+import pytest
+import ceph_cfg.model
+import ceph_cfg.mdl_updater
+import ceph_cfg.osd
+import ceph_cfg.ops_osd
+from ceph_cfg.tests.test_update_lsblk import mock_lsblk
+
+import mock
+
+
+osd_details_by_dir = {
+    "/var/lib/ceph/osd/ceph-0" : {
+        "ceph_fsid" : "eaac9695-4265-4ca8-ac2a-f3a479c559b1",
+        "fsid" : "b3c5e41a-4c88-4ad1-9a8c-3a1f5a0b3c01",
+        "magic" : "ceph osd volume v026",
+        "journal_uuid" : "7f1a2b3c-0000-4000-8000-000000000001",
+        "whoami" : "0",
+        },
+    "/var/lib/ceph/osd/ceph-6" : {
+        "ceph_fsid" : "eaac9695-4265-4ca8-ac2a-f3a479c559b1",
+        "fsid" : "b3c5e41a-4c88-4ad1-9a8c-3a1f5a0b3c06",
+        "magic" : "ceph osd volume v026",
+        "whoami" : "6",
+        },
+    }
+
+
+def mock_retrive_osd_details_from_dir(directory):
+    details = osd_details_by_dir.get(directory)
+    if details is None:
+        return None
+    return dict(details)
+
+
+def mock_retrive_osd_details(device_name):
+    return None
+
+
+class Test_mdl_updater_index(object):
+    def setup(self):
+        """
+        Make model and updater
+        """
+        self.model = ceph_cfg.model.model(
+            cluster_name="ceph",
+            cluster_uuid="eaac9695-4265-4ca8-ac2a-f3a479c559b1")
+        self.updater = ceph_cfg.mdl_updater.model_updater(self.model)
+        # We dont want to retest the versions of lsblk.
+        self.model.lsblk_version.major = 2
+        self.model.lsblk_version.minor = 25
+        self.model.lsblk_version.revision = 0
+
+
+    @mock.patch('ceph_cfg.mdl_updater.retrive_osd_details', mock_retrive_osd_details)
+    @mock.patch('ceph_cfg.mdl_updater._retrive_osd_details_from_dir', mock_retrive_osd_details_from_dir)
+    @mock.patch('ceph_cfg.utils.execute_local_command', mock_lsblk)
+    def refresh(self):
+        self.updater.partitions_all_refresh_lsblk()
+        self.updater.discover_partitions_refresh()
+
+
+    def test_partition_indexes(self):
+        self.refresh()
+        assert self.model.idx_partition['/dev/vda1']['MOUNTPOINT'] == '/boot'
+        assert self.model.idx_partuuid['000aab8b-03'] == '/dev/vda3'
+        assert self.model.idx_parttype['0x83'] == set(['/dev/vda1', '/dev/vda3'])
+        assert self.model.idx_fstype['xfs'] == set(['/dev/vda3', '/dev/vdb1', '/dev/vdc1'])
+        assert self.model.idx_mountpoint['/var/lib/ceph/osd/ceph-6'] == '/dev/vdc1'
+        assert '/dev/vda' not in self.model.idx_partition
+
+
+    def test_osd_indexes(self):
+        self.refresh()
+        osd_md = self.model.idx_whoami[('eaac9695-4265-4ca8-ac2a-f3a479c559b1', '0')]
+        assert osd_md['dev'] == '/dev/vdb1'
+        assert self.model.idx_osd_fsid['b3c5e41a-4c88-4ad1-9a8c-3a1f5a0b3c06']['whoami'] == '6'
+        assert self.model.idx_journal_uuid['7f1a2b3c-0000-4000-8000-000000000001'] is osd_md
+        assert self.model.idx_osd_dev['/dev/vdb1'] is osd_md
+        assert self.model.idx_disk_osd['/dev/vdc'] == set(['/dev/vdc1'])
+
+
+    def test_indexes_replaced_on_refresh(self):
+        self.refresh()
+        self.model.idx_partuuid['stale'] = '/dev/none'
+        self.model.idx_whoami[(None, '99')] = {}
+        self.refresh()
+        assert 'stale' not in self.model.idx_partuuid
+        assert (None, '99') not in self.model.idx_whoami
+
+
+    def test_osd_ctrl_partitions_by_disk(self):
+        self.refresh()
+        osdc = ceph_cfg.osd.osd_ctrl(self.model)
+        assert osdc._get_osd_partitons_by_disk('/dev/vdb') == set(['/dev/vdb1'])
+        assert osdc._get_osd_partitons_by_disk('/dev/vdd') == set()
+
+
+    def test_osd_whoami_per_cluster(self):
+        self.refresh()
+        updater = ceph_cfg.mdl_updater.model_updater(self.model)
+        updater._index_osd_add({"ceph_fsid" : "other", "whoami" : "0", "dev" : "/dev/vdd1"})
+        assert self.model.idx_whoami[('eaac9695-4265-4ca8-ac2a-f3a479c559b1', '0')]['dev'] == '/dev/vdb1'
+        assert self.model.idx_whoami[('other', '0')]['dev'] == '/dev/vdd1'
+        osd_ops = ceph_cfg.ops_osd.ops_osd(self.model)
+        assert osd_ops._osd_local() == [0, 6]
+
+
+    def test_part_details_missing_disk(self):
+        self.refresh()
+        osdc = ceph_cfg.osd.osd_ctrl(self.model)
+        assert osdc._get_part_details('/dev/vdb1')['FSTYPE'] == 'xfs'
+        del self.model.lsblk['/dev/vdb']
+        with pytest.raises(ceph_cfg.osd.Error):
+            osdc._get_part_details('/dev/vdb1')
+
+
+    def test_ops_osd_local(self):
+        self.refresh()
+        osd_ops = ceph_cfg.ops_osd.ops_osd(self.model)
+        assert osd_ops._osd_local() == [0, 6]
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import pytest
+import ceph_cfg.constants
+import ceph_cfg.model
+import ceph_cfg.mon
+
+import mock
+
+
+def mock_monmaptool(arguments):
+    with open(arguments[-1], "w") as monmap:
+        monmap.write(" ".join(arguments[1:-1]))
+    return {"retcode" : 0, "stdout" : "", "stderr" : ""}
+
+
+class Test_mon_monmap(object):
+    def setup(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.work_dir = tempfile.mkdtemp()
+        self.patch = mock.patch.object(ceph_cfg.constants, '_path_cache', self.cache_dir)
+        self.patch.start()
+        self.model = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        self.model.mon_members = [("a", "10.0.0.1"), ("b", "10.0.0.2"), ("c", "10.0.0.3")]
+        self.mon = ceph_cfg.mon.mon_implementation_base(self.model)
+
+
+    def teardown(self):
+        self.patch.stop()
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.work_dir)
+
+
+    def test_single_call_and_cache(self):
+        path = os.path.join(self.work_dir, "monmap")
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=mock_monmaptool) as execute:
+            self.mon._create_monmap(path)
+            assert execute.call_count == 1
+            arguments = execute.call_args[0][0]
+            assert arguments.count("--add") == 3
+            os.remove(path)
+            self.mon._create_monmap(path)
+            assert execute.call_count == 1
+        with open(path) as monmap:
+            assert "--add c 10.0.0.3" in monmap.read()
+        assert os.listdir(self.work_dir) == ["monmap"]
+        self.model.mon_members.append(("d", "10.0.0.4"))
+        os.remove(path)
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=mock_monmaptool) as execute:
+            self.mon._create_monmap(path)
+            assert execute.call_count == 1
+
+
+    def test_failure_leaves_nothing(self):
+        path = os.path.join(self.work_dir, "monmap")
+        output = {"retcode" : 1, "stdout" : "", "stderr" : "bad address"}
+        with mock.patch('ceph_cfg.utils.execute_local_command', return_value=output):
+            with pytest.raises(ceph_cfg.mon.Error):
+                self.mon._create_monmap(path)
+        assert os.listdir(self.work_dir) == []
+        assert os.listdir(self.cache_dir) == []
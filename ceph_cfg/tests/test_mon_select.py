@@ -0,0 +1,90 @@
+import shutil
+import socket
+import tempfile
+import ceph_cfg.constants
+import ceph_cfg.model
+import ceph_cfg.mon_select
+
+import mock
+
+
+def port_unused():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    return port
+
+
+class Test_mon_select(object):
+    def setup(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.patch = mock.patch.object(ceph_cfg.constants, '_path_cache', self.cache_dir)
+        self.patch.start()
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.model = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        self.model.mon_members = [
+            ("down", "127.0.0.1:%s" % (port_unused())),
+            ("up", "127.0.0.1:%s" % (self.port)),
+            ("bad", "[::1"),
+            ]
+
+
+    def teardown(self):
+        self.listener.close()
+        self.patch.stop()
+        shutil.rmtree(self.cache_dir)
+
+
+    def test_addr_parse(self):
+        assert ceph_cfg.mon_select.addr_parse("10.0.0.1") == ("10.0.0.1", 6789)
+        assert ceph_cfg.mon_select.addr_parse("10.0.0.1:3300") == ("10.0.0.1", 3300)
+        assert ceph_cfg.mon_select.addr_parse("v1:10.0.0.1:6789/0") == ("10.0.0.1", 6789)
+        assert ceph_cfg.mon_select.addr_parse("[fe80::1]:6790") == ("fe80::1", 6790)
+        assert ceph_cfg.mon_select.addr_parse("fe80::1") == ("fe80::1", 6789)
+        assert ceph_cfg.mon_select.addr_parse("host:port") is None
+        assert ceph_cfg.mon_select.addr_format("fe80::1", 6789) == "[fe80::1]:6789"
+
+
+    def test_ranking(self):
+        selector = ceph_cfg.mon_select.mon_selector(self.model)
+        ranking = selector.ranking()
+        assert [item[0] for item in ranking] == ["up"]
+        assert selector.arguments_get() == ["-m", "127.0.0.1:%s" % (self.port)]
+
+
+    def test_all_reachable_in_quorum(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(5)
+        port = listener.getsockname()[1]
+        self.model.mon_members.append(("other", "127.0.0.1:%s" % (port)))
+        try:
+            selector = ceph_cfg.mon_select.mon_selector(self.model)
+            addrs = ["127.0.0.1:%s" % (self.port), "127.0.0.1:%s" % (port)]
+            assert sorted(selector.targets()) == sorted(addrs)
+            assert sorted(selector.arguments_get()[1].split(",")) == sorted(addrs)
+            # Out of quorum mons are dropped, the cached ranking is not
+            # reused for a different quorum.
+            self.model.quorum_status = {"quorum_names" : ["other", "down"]}
+            assert selector.targets() == ["127.0.0.1:%s" % (port)]
+            # No reachable mon in quorum, use any reachable mon
+            self.model.quorum_status = {"quorum_names" : ["down"]}
+            assert sorted(selector.targets()) == sorted(addrs)
+        finally:
+            listener.close()
+
+
+    def test_ranking_cached(self):
+        selector = ceph_cfg.mon_select.mon_selector(self.model)
+        selector.ranking()
+        with mock.patch('ceph_cfg.mon_select.probe') as probe:
+            assert selector.targets() == ["127.0.0.1:%s" % (self.port)]
+            assert probe.call_count == 0
+            self.model.mon_members = self.model.mon_members[:1]
+            probe.return_value = None
+            assert selector.arguments_get() == []
+            assert probe.call_count == 1
@@ -0,0 +1,60 @@
+import json
+import ceph_cfg.model
+import ceph_cfg.mdl_query
+import ceph_cfg.mdl_updater
+import ceph_cfg.ops_cluster
+import ceph_cfg.util_which
+
+import mock
+
+
+def mock_mon_status(state, quorum):
+    def mon_status(updater):
+        updater.model.mon_status = {"name" : "node1", "state" : state, "quorum" : quorum}
+    return mon_status
+
+
+class Test_ops_cluster_quorum(object):
+    def setup(self):
+        self.model = ceph_cfg.model.model(cluster_name="ceph")
+        self.model.hostname = "node1"
+        self.model.mon_members = [("node1", "10.0.0.1"), ("node2", "10.0.0.2")]
+        self.ops = ceph_cfg.ops_cluster.ops_cluster(self.model)
+        self.ops.connection.arguments_get = mock.Mock(return_value=[])
+        self.query = ceph_cfg.mdl_query.mdl_query(self.model)
+        self.remote = {
+            "retcode" : 0,
+            "stdout" : json.dumps({"quorum" : [1], "quorum_names" : ["node2"]}),
+            "stderr" : ""
+            }
+
+
+    def test_local_mon_in_quorum(self):
+        with mock.patch.object(ceph_cfg.mdl_updater.model_updater, 'mon_status',
+                mock_mon_status("leader", [0, 1])):
+            with mock.patch('ceph_cfg.utils.execute_local_command') as execute:
+                self.ops.quorum_refresh()
+                assert execute.call_count == 0
+        assert self.query.cluster_quorum()
+
+
+    def test_local_mon_out_of_quorum(self):
+        with mock.patch.object(ceph_cfg.mdl_updater.model_updater, 'mon_status',
+                mock_mon_status("probing", [])):
+            with mock.patch.object(ceph_cfg.util_which.which_ceph, '_path', '/usr/bin/ceph'):
+                with mock.patch('ceph_cfg.utils.execute_local_command', return_value=self.remote) as execute:
+                    self.ops.quorum_refresh()
+                    assert execute.call_args[0][0][-1] == "quorum_status"
+        assert self.query.cluster_quorum()
+
+
+    def test_not_mon_node(self):
+        self.model.hostname = "client1"
+        with mock.patch.object(ceph_cfg.util_which.which_ceph, '_path', '/usr/bin/ceph'):
+            with mock.patch('ceph_cfg.utils.execute_local_command', return_value=self.remote) as execute:
+                self.ops.quorum_refresh()
+                assert execute.call_count == 1
+        assert self.model.quorum_status["quorum_names"] == ["node2"]
+        assert self.model.cluster_status is None
+        self.model.quorum_status = {"quorum" : []}
+        assert not self.query.cluster_quorum()
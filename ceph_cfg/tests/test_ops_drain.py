@@ -0,0 +1,199 @@
+import json
+import shutil
+import tempfile
+import pytest
+import ceph_cfg.model
+import ceph_cfg.ops_cluster
+import ceph_cfg.ops_drain
+import ceph_cfg.ops_osd
+
+import mock
+
+
+def status_make(unsettled):
+    pgs_by_state = [{"state_name" : "active+clean", "count" : 100}]
+    if unsettled > 0:
+        pgs_by_state.append({
+            "state_name" : "active+remapped+backfilling",
+            "count" : unsettled
+            })
+    return {"pgmap" : {"pgs_by_state" : pgs_by_state}}
+
+
+class fake_cluster(object):
+    """
+    Cluster that recovers for a number of checks after each reweight
+    """
+    def __init__(self, recovery_checks):
+        self.recovery_checks = recovery_checks
+        self.remaining = 0
+        self.now = 0.0
+        self.weights = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def status(self):
+        unsettled = 0
+        if self.remaining > 0:
+            self.remaining -= 1
+            unsettled = 5
+        return ceph_cfg.ops_cluster.pg_summary_parse(status_make(unsettled))
+
+    def reweight(self, weights):
+        self.weights.append(weights)
+        self.remaining = self.recovery_checks
+
+
+class Test_ops_drain(object):
+    def setup(self):
+        self.model = ceph_cfg.model.model(cluster_name="ceph")
+        self.cluster = fake_cluster(3)
+        self.cache_dir = tempfile.mkdtemp()
+
+
+    def teardown(self):
+        shutil.rmtree(self.cache_dir)
+
+
+    def _drain(self, **kwargs):
+        params = {
+            "clock" : self.cluster.clock,
+            "sleep" : self.cluster.sleep,
+            "status" : self.cluster.status,
+            "reweight" : self.cluster.reweight,
+            "weights_get" : lambda osd_list: dict((osd, 1.0) for osd in osd_list),
+            "cache_dir" : self.cache_dir,
+            }
+        params.update(kwargs)
+        return ceph_cfg.ops_drain.drain(self.model, [4, 2], **params)
+
+
+    def test_weight_steps(self):
+        assert ceph_cfg.ops_drain.weight_steps(1, 0, 0.25) == [0.75, 0.5, 0.25, 0.0]
+        assert ceph_cfg.ops_drain.weight_steps(0.5, 0, 0.3) == [0.2, 0.0]
+        assert ceph_cfg.ops_drain.weight_steps(0, 1, 0.5) == [0.5, 1.0]
+        with pytest.raises(ceph_cfg.ops_drain.Error):
+            ceph_cfg.ops_drain.weight_steps(1, 0, 0)
+
+
+    def test_pg_summary(self):
+        summary = ceph_cfg.ops_cluster.pg_summary_parse(status_make(5))
+        assert summary["total"] == 105
+        assert summary["unsettled"] == 5
+        status = {"pgmap" : {"pgs_by_state" : [{"state_name" : "peering", "count" : 2}]}}
+        assert ceph_cfg.ops_cluster.pg_summary_parse(status)["unsettled"] == 2
+
+
+    def test_pg_summary_degraded(self):
+        # A down OSD leaves PG's degraded until it returns, drains still step
+        status = {"pgmap" : {"pgs_by_state" : [
+            {"state_name" : "active+clean", "count" : 90},
+            {"state_name" : "active+undersized+degraded", "count" : 10},
+            ]}}
+        assert ceph_cfg.ops_cluster.pg_summary_parse(status)["unsettled"] == 0
+        scheduler = self._drain(step=0.5, interval=10,
+            status=lambda: ceph_cfg.ops_cluster.pg_summary_parse(status))
+        assert scheduler.run()["state"] == "done"
+
+
+    def test_steps_wait_for_recovery(self):
+        scheduler = self._drain(step=0.5, interval=10)
+        output = scheduler.run()
+        assert self.cluster.weights == [{2 : 0.5, 4 : 0.5}, {2 : 0.0, 4 : 0.0}]
+        assert output["state"] == "done"
+        assert output["step"] == 2
+        assert output["weights"] == {2 : 0.0, 4 : 0.0}
+        assert output["pgs_unsettled"] == 0
+        # each step sleeps once then waits for three recovering checks
+        assert output["seconds"] == 80
+
+
+    def test_steps_from_current_weights(self):
+        weights = {2 : 7.2, 4 : 3.6}
+        scheduler = self._drain(step=0.5, crush=True,
+            weights_get=lambda osd_list: dict((osd, weights[osd]) for osd in osd_list))
+        scheduler.run()
+        assert self.cluster.weights == [{2 : 3.6, 4 : 1.8}, {2 : 0.0, 4 : 0.0}]
+        scheduler = self._drain(step=0.5, weight_start=1,
+            weights_get=mock.Mock(side_effect=AssertionError))
+        scheduler.run()
+        assert self.cluster.weights[2] == {2 : 0.5, 4 : 0.5}
+
+
+    def test_weights_get(self):
+        osd_ops = ceph_cfg.ops_osd.ops_osd(self.model)
+        nodes = [
+            {"id" : 2, "crush_weight" : 7.27, "reweight" : 1.0},
+            {"id" : 4, "crush_weight" : 3.63, "reweight" : 0.8},
+            ]
+        with mock.patch.object(osd_ops, '_execute', return_value={"stdout" : json.dumps({"nodes" : nodes})}):
+            assert osd_ops.weights_get([4, 2]) == {2 : 1.0, 4 : 0.8}
+            assert osd_ops.weights_get([4, 2], crush=True) == {2 : 7.27, 4 : 3.63}
+            with pytest.raises(ceph_cfg.ops_osd.Error):
+                osd_ops.weights_get([5])
+
+
+    def test_deadline_default(self):
+        class never_settles(fake_cluster):
+            def status(self):
+                return ceph_cfg.ops_cluster.pg_summary_parse(status_make(5))
+        self.cluster = never_settles(0)
+        scheduler = self._drain(interval=3600)
+        with pytest.raises(ceph_cfg.ops_drain.Error):
+            scheduler.run()
+        assert self.cluster.now >= ceph_cfg.ops_drain.deadline_default
+
+
+    def test_progress_saved(self):
+        scheduler = self._drain(step=0.5)
+        scheduler.run()
+        progress = ceph_cfg.ops_drain.progress_load(self.model, self.cache_dir)
+        assert progress["state"] == "done"
+        assert progress["step"] == 2
+
+
+    def test_pause_other_process(self):
+        scheduler = self._drain(step=0.5, interval=10)
+        sleep = self.cluster.sleep
+        def sleep_paused(seconds):
+            sleep(seconds)
+            if self.cluster.now == 10:
+                ceph_cfg.ops_drain.pause_set(self.model, True, self.cache_dir)
+            if self.cluster.now == 100:
+                progress = ceph_cfg.ops_drain.progress_load(self.model, self.cache_dir)
+                assert progress["state"] == "paused"
+                assert len(self.cluster.weights) == 1
+                ceph_cfg.ops_drain.pause_set(self.model, False, self.cache_dir)
+        scheduler.sleep = sleep_paused
+        assert scheduler.run()["state"] == "done"
+        assert len(self.cluster.weights) == 2
+
+
+    def test_deadline(self):
+        scheduler = self._drain(step=0.5, interval=10, deadline=30)
+        with pytest.raises(ceph_cfg.ops_drain.Error):
+            scheduler.run()
+        assert scheduler.progress()["state"] == "expired"
+        assert self.cluster.weights == [{2 : 0.5, 4 : 0.5}]
+
+
+    def test_pause_resume(self):
+        scheduler = self._drain(step=0.5, interval=10)
+        sleep = self.cluster.sleep
+        def sleep_paused(seconds):
+            sleep(seconds)
+            if self.cluster.now == 10:
+                scheduler.pause()
+                assert scheduler.progress()["step"] == 1
+            if self.cluster.now == 100:
+                assert scheduler.progress()["state"] == "paused"
+                assert len(self.cluster.weights) == 1
+                scheduler.resume()
+        scheduler.sleep = sleep_paused
+        output = scheduler.run()
+        assert output["state"] == "done"
+        assert len(self.cluster.weights) == 2
@@ -0,0 +1,90 @@
+import json
+import shutil
+import tempfile
+import ceph_cfg.constants
+import ceph_cfg.model
+import ceph_cfg.ops_map
+import ceph_cfg.util_which
+
+import mock
+
+
+class fake_ceph(object):
+    def __init__(self):
+        self.osd_epoch = 10
+        self.fs_epoch = 3
+        self.pools = [{"poolnum" : 0, "poolname" : "rbd"}]
+        self.calls = []
+
+    def execute(self, arguments):
+        command = " ".join(arguments[arguments.index("json") + 1:])
+        self.calls.append(command)
+        if command == "osd stat":
+            stdout = {"osdmap" : {"epoch" : self.osd_epoch, "num_osds" : 3}}
+        elif command == "mds stat":
+            stdout = {"fsmap" : {"epoch" : self.fs_epoch}}
+        elif command == "osd lspools":
+            stdout = self.pools
+        elif command == "fs ls":
+            stdout = []
+        else:
+            raise Exception("unexpected command %s" % (command))
+        return {"retcode" : 0, "stdout" : json.dumps(stdout), "stderr" : ""}
+
+
+class Test_ops_map(object):
+    def setup(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.ceph = fake_ceph()
+        self.patches = [
+            mock.patch.object(ceph_cfg.constants, '_path_cache', self.cache_dir),
+            mock.patch.object(ceph_cfg.util_which.which_ceph, '_path', '/usr/bin/ceph'),
+            mock.patch('ceph_cfg.remote_connection.connection.arguments_get', return_value=[]),
+            mock.patch('ceph_cfg.utils.execute_local_command', side_effect=self.ceph.execute),
+            ]
+        for patch in self.patches:
+            patch.start()
+        self.model = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+
+
+    def teardown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.cache_dir)
+
+
+    def test_epoch_find(self):
+        assert ceph_cfg.ops_map._epoch_find({"epoch" : 5, "num_osds" : 1}, ["osdmap"]) == 5
+        assert ceph_cfg.ops_map._epoch_find({"mdsmap" : {"epoch" : 2}}, ["fsmap", "mdsmap"]) == 2
+
+
+    def test_refetch_only_on_new_epoch(self):
+        map_ops = ceph_cfg.ops_map.ops_map(self.model)
+        assert map_ops.pool_list() == {"rbd" : {"poolnum" : 0}}
+        assert map_ops.pool_list() == {"rbd" : {"poolnum" : 0}}
+        assert self.ceph.calls == ["osd stat", "osd lspools", "osd stat"]
+        self.ceph.osd_epoch = 11
+        self.ceph.pools.append({"poolnum" : 1, "poolname" : "data"})
+        assert sorted(map_ops.pool_list().keys()) == ["data", "rbd"]
+        assert self.ceph.calls[-1] == "osd lspools"
+
+
+    def test_saved_between_processes(self):
+        map_ops = ceph_cfg.ops_map.ops_map(self.model)
+        map_ops.pool_list()
+        map_ops.cephfs_list()
+        other = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        self.ceph.calls = []
+        other_ops = ceph_cfg.ops_map.ops_map(other)
+        assert other_ops.pool_list() == {"rbd" : {"poolnum" : 0}}
+        assert other_ops.cephfs_list() == {}
+        assert self.ceph.calls == ["osd stat", "mds stat"]
+
+
+    def test_invalidate(self):
+        map_ops = ceph_cfg.ops_map.ops_map(self.model)
+        map_ops.cephfs_list()
+        map_ops.invalidate("fsmap")
+        self.model.cluster_uuid = None
+        map_ops.cephfs_list()
+        assert self.ceph.calls == ["mds stat", "fs ls", "mds stat", "fs ls"]
@@ -0,0 +1,83 @@
+import json
+import pytest
+import ceph_cfg.model
+import ceph_cfg.ops_osd
+
+import mock
+
+
+class Test_ops_osd(object):
+    def setup(self):
+        self.model = ceph_cfg.model.model(cluster_name="ceph")
+        self.model.cluster_uuid = "c1"
+        self.model.hostname = "node1"
+        self.model.idx_whoami = {
+            ("c1", "0") : {"whoami" : "0", "ceph_fsid" : "c1"},
+            ("c1", "3") : {"whoami" : "3", "ceph_fsid" : "c1"},
+            ("other", "7") : {"whoami" : "7", "ceph_fsid" : "other"},
+            }
+        self.ops = ceph_cfg.ops_osd.ops_osd(self.model)
+        self.ops._execute = mock.Mock()
+
+
+    def test_reweight_many_one_call(self):
+        output = self.ops.reweight_many({"0" : 0.5, 3 : "1"})
+        assert output == {0 : 0.5, 3 : 1.0}
+        assert self.ops._execute.call_count == 1
+        arguments = self.ops._execute.call_args[0][0]
+        assert arguments[:2] == ["osd", "reweightn"]
+        assert json.loads(arguments[2]) == {"0" : "32768", "3" : "65536"}
+
+
+    def test_reweight_many_invalid(self):
+        with pytest.raises(ceph_cfg.ops_osd.Error):
+            self.ops.reweight_many({0 : 1.5})
+        with pytest.raises(ceph_cfg.ops_osd.Error):
+            self.ops.reweight_many({"osd" : 0.5})
+        assert self.ops._execute.call_count == 0
+
+
+    def test_reweight_local(self):
+        output = self.ops.reweight_local(0)
+        assert output == {0 : 0.0, 3 : 0.0}
+        arguments = self.ops._execute.call_args[0][0]
+        assert json.loads(arguments[2]) == {"0" : "0", "3" : "0"}
+
+
+    def test_reweight_local_crush(self):
+        tree = {"nodes" : [
+            {"id" : -1, "name" : "default", "type" : "root", "children" : [-2, -3]},
+            {"id" : -2, "name" : "node1-ssd", "type" : "host", "children" : [3, 0]},
+            {"id" : -3, "name" : "node2", "type" : "host", "children" : [7]},
+            {"id" : 0, "name" : "osd.0", "type" : "osd"},
+            {"id" : 3, "name" : "osd.3", "type" : "osd"},
+            {"id" : 7, "name" : "osd.7", "type" : "osd"},
+            ]}
+        self.ops._execute.return_value = {"stdout" : json.dumps(tree)}
+        output = self.ops.reweight_local(1.8, crush=True)
+        assert output == {0 : 1.8, 3 : 1.8}
+        assert [call[0][0] for call in self.ops._execute.call_args_list] == [
+            ["-f", "json", "osd", "tree"],
+            ["osd", "crush", "reweight-subtree", "node1-ssd", "1.8"],
+            ]
+
+
+    def test_reweight_local_crush_shared_bucket(self):
+        tree = {"nodes" : [
+            {"id" : -2, "name" : "node1", "type" : "host", "children" : [0, 3, 7]},
+            ]}
+        self.ops._execute.return_value = {"stdout" : json.dumps(tree)}
+        self.ops.reweight_local(1.8, crush=True)
+        assert [call[0][0] for call in self.ops._execute.call_args_list] == [
+            ["-f", "json", "osd", "tree"],
+            ["osd", "crush", "reweight", "osd.0", "1.8"],
+            ["osd", "crush", "reweight", "osd.3", "1.8"],
+            ]
+
+
+    def test_reweight_many_crush(self):
+        self.ops.reweight_many({3 : 1.8, 0 : 2}, crush=True)
+        assert [call[0][0] for call in self.ops._execute.call_args_list] == [
+            ["osd", "crush", "reweight", "osd.0", "2.0"],
+            ["osd", "crush", "reweight", "osd.3", "1.8"],
+            ]
@@ -0,0 +1,161 @@
+import pytest
+import ceph_cfg.model
+import ceph_cfg.mdl_updater
+import ceph_cfg.osd
+
+import mock
+
+
+def mock_activate_partition(partition, **kwargs):
+    if partition == "/dev/sdc1":
+        raise ceph_cfg.osd.Error("Failed executing")
+    return True
+
+
+class Test_osd_activate(object):
+    def setup(self):
+        self.model = ceph_cfg.model.model(cluster_name="ceph")
+        self.osdc = ceph_cfg.osd.osd_ctrl(self.model)
+
+
+    def test_parallel_results(self):
+        targets = ["/dev/sda1", "/dev/sdb1", "/dev/sdc1"]
+        with mock.patch.object(self.osdc, '_activate_targets_item', lambda dev: set([dev])):
+            with mock.patch.object(self.osdc, 'activate_partition', side_effect=mock_activate_partition) as activate:
+                output = self.osdc.activate_targets_parallel(osd_dev_list=targets,
+                    parallelism=2, timeout=30)
+        assert output["activated"] == 2
+        assert output["failed"] == 1
+        assert sorted(output["partitions"].keys()) == targets
+        assert output["partitions"]["/dev/sdc1"]["status"] == "failed"
+        assert "Failed executing" in output["partitions"]["/dev/sdc1"]["error"]
+        assert output["partitions"]["/dev/sda1"]["seconds"] >= 0
+        for call in activate.call_args_list:
+            assert call[1]["timeout"] == 30
+            assert not "parallelism" in call[1]
+
+
+    def test_parallel_requires_targets(self):
+        with pytest.raises(ceph_cfg.osd.Error):
+            self.osdc.activate_targets_parallel()
+
+
+    def test_partition_timeout(self):
+        output = {"retcode" : -9, "stdout" : "", "stderr" : "", "timeout" : True}
+        with mock.patch('ceph_cfg.utils.execute_local_command', return_value=output) as execute:
+            with pytest.raises(ceph_cfg.osd.Error) as excinfo:
+                self.osdc.activate_partition("/dev/sda1", timeout=5)
+        assert "Timed out" in str(excinfo.value)
+        assert execute.call_args[1]["timeout"] == 5
+
+
+    def _native_model(self, mount_point=None):
+        self.model.cluster_uuid = "c1"
+        self.model.idx_partition["/dev/sdd1"] = {
+            "FSTYPE" : "xfs",
+            "MOUNTPOINT" : mount_point
+            }
+        updater = ceph_cfg.mdl_updater.model_updater(self.model)
+        updater._index_osd_clear()
+        updater._index_osd_add({
+            "dev" : "/dev/sdd1",
+            "whoami" : "3",
+            "ceph_fsid" : "c1"
+            })
+
+
+    def test_native_activation(self):
+        self._native_model()
+        output = {"retcode" : 0, "stdout" : "", "stderr" : ""}
+        with mock.patch('ceph_cfg.utils.execute_local_command', return_value=output) as execute:
+            with mock.patch('ceph_cfg.service.init_system') as init_system:
+                with mock.patch('os.path.isdir', return_value=True):
+                    assert self.osdc.activate_partition("/dev/sdd1", timeout=5)
+        arguments = execute.call_args[0][0]
+        assert arguments[0] == "mount"
+        assert arguments[-2:] == ["/dev/sdd1", "/var/lib/ceph/osd/ceph-3"]
+        assert not "ceph-disk" in arguments
+        init_system.return_value.start.assert_called_once_with(service="ceph-osd", identifier="3")
+        init_system.return_value.on_boot_enable.assert_called_once_with(service="ceph-osd", identifier="3")
+
+
+    def test_native_mount_options_from_config(self):
+        assert self.osdc._mount_options_get("xfs") == "rw,noatime,inode64"
+        assert self.osdc._mount_options_get("ext4") == "rw,noatime"
+        self.model.ceph_conf.add_section("global")
+        self.model.ceph_conf.set("global", "osd_fs_mount_options_xfs", "rw,noatime")
+        assert self.osdc._mount_options_get("xfs") == "rw,noatime"
+        self.model.ceph_conf.add_section("osd")
+        self.model.ceph_conf.set("osd", "osd_mount_options_xfs", "rw,noatime,logbsize=256k")
+        self._native_model()
+        output = {"retcode" : 0, "stdout" : "", "stderr" : ""}
+        with mock.patch('ceph_cfg.utils.execute_local_command', return_value=output) as execute:
+            with mock.patch('ceph_cfg.service.init_system'):
+                with mock.patch('os.path.isdir', return_value=True):
+                    assert self.osdc.activate_partition("/dev/sdd1")
+        arguments = execute.call_args[0][0]
+        assert arguments[arguments.index("-o") + 1] == "rw,noatime,logbsize=256k"
+
+
+    def test_native_parallel_services_grouped(self):
+        self._native_model("/var/lib/ceph/osd/ceph-3")
+        results = [{"service" : "ceph-osd", "identifier" : "3", "unit" : "ceph-osd@3",
+            "status" : "failed", "error" : "Unit not found"}]
+        with mock.patch.object(self.osdc, '_activate_targets_item', lambda dev: set([dev])):
+            with mock.patch('ceph_cfg.service.init_system') as init_system:
+                init_system.return_value.start_many.return_value = results
+                init_system.return_value.on_boot_enable_many.return_value = results
+                output = self.osdc.activate_targets_parallel(osd_dev_list=["/dev/sdd1"])
+        assert init_system.return_value.start.call_count == 0
+        init_system.return_value.start_many.assert_called_once_with(
+            [{"service" : "ceph-osd", "identifier" : "3"}], parallelism=4)
+        assert output["failed"] == 1
+        assert output["partitions"]["/dev/sdd1"]["error"] == "Unit not found"
+
+
+    def test_native_parallel_services_by_unit(self):
+        self._native_model("/var/lib/ceph/osd/ceph-3")
+        updater = ceph_cfg.mdl_updater.model_updater(self.model)
+        updater._index_osd_add({"dev" : "/dev/sde1", "whoami" : "4", "ceph_fsid" : "c1"})
+        self.model.idx_partition["/dev/sde1"] = {
+            "FSTYPE" : "xfs",
+            "MOUNTPOINT" : "/var/lib/ceph/osd/ceph-4"
+            }
+        started = [
+            {"service" : "ceph-osd", "identifier" : "3", "status" : "ok", "error" : None},
+            {"service" : "ceph-osd", "identifier" : "4", "status" : "ok", "error" : None},
+            ]
+        enabled = [
+            {"service" : "ceph-osd", "identifier" : "4", "status" : "failed", "error" : "Access denied"},
+            ]
+        with mock.patch.object(self.osdc, '_activate_targets_item', lambda dev: set([dev])):
+            with mock.patch('ceph_cfg.service.init_system') as init_system:
+                init_system.return_value.start_many.return_value = started
+                init_system.return_value.on_boot_enable_many.return_value = enabled
+                output = self.osdc.activate_targets_parallel(
+                    osd_dev_list=["/dev/sdd1", "/dev/sde1"])
+        assert output["failed"] == 1
+        assert output["partitions"]["/dev/sdd1"]["status"] != "failed"
+        assert output["partitions"]["/dev/sde1"]["error"] == "Access denied"
+
+
+    def test_native_activation_mounted(self):
+        self._native_model("/var/lib/ceph/osd/ceph-3")
+        with mock.patch('ceph_cfg.utils.execute_local_command') as execute:
+            with mock.patch('ceph_cfg.service.init_system') as init_system:
+                assert self.osdc.activate_partition("/dev/sdd1")
+        assert execute.call_count == 0
+        assert init_system.return_value.start.call_count == 1
+
+
+    def test_first_activation_uses_ceph_disk(self):
+        self._native_model()
+        ceph_cfg.mdl_updater.model_updater(self.model)._index_osd_clear()
+        output = {"retcode" : 0, "stdout" : "", "stderr" : ""}
+        with mock.patch('ceph_cfg.utils.execute_local_command', return_value=output) as execute:
+            assert self.osdc.activate_partition("/dev/sdd1")
+        assert execute.call_args[0][0][0] == "ceph-disk"
+        self._native_model("/mnt")
+        assert self.osdc._activate_native_details("/dev/sdd1") is None
+        self._native_model()
+        assert self.osdc._activate_native_details("/dev/sdd1", dmcrypt=True) is None
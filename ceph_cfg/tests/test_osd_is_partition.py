@@ -0,0 +1,73 @@
+import os
+import stat
+import pytest
+import ceph_cfg.model
+import ceph_cfg.osd
+
+import mock
+
+
+sys_paths = set([
+    "/dev/sda",
+    "/dev/sda1",
+    "/sys/block/sda",
+    "/sys/class/block/sda",
+    "/sys/class/block/sda1",
+    "/sys/class/block/sda1/partition",
+    ])
+
+
+sys_links = {
+    "/sys/class/block/sda1" : "/sys/devices/pci0000:00/block/sda/sda1",
+    }
+
+
+dev_numbers = {
+    "/dev/sda" : os.makedev(8, 0),
+    "/dev/sda1" : os.makedev(8, 1),
+    }
+
+
+def mock_lstat(path):
+    output = mock.Mock()
+    output.st_mode = stat.S_IFBLK
+    output.st_rdev = dev_numbers[path]
+    return output
+
+
+class Test_is_partition(object):
+    def setup(self):
+        self.model = ceph_cfg.model.model(cluster_name="ceph")
+        self.osdc = ceph_cfg.osd.osd_ctrl(self.model)
+
+
+    def _patched(self):
+        return [
+            mock.patch('os.path.exists', side_effect=lambda path: path in sys_paths),
+            mock.patch('os.path.realpath', side_effect=lambda path: sys_links.get(path, path)),
+            mock.patch('os.lstat', side_effect=mock_lstat),
+            mock.patch('os.listdir'),
+            ]
+
+
+    def test_lookup_cached(self):
+        patches = self._patched()
+        mocks = [patch.start() for patch in patches]
+        try:
+            assert self.osdc.is_partition("/dev/sda1")
+            assert not self.osdc.is_partition("/dev/sda")
+            assert self.model.idx_dev_parent == {(8, 1) : "sda", (8, 0) : None}
+            exists_calls = mocks[0].call_count
+            assert self.osdc.is_partition("/dev/sda1")
+            # Only the device itself is checked once cached
+            assert mocks[0].call_count == exists_calls + 1
+            assert mocks[3].call_count == 0
+        finally:
+            for patch in patches:
+                patch.stop()
+
+
+    def test_not_found(self):
+        with mock.patch('os.path.exists', return_value=False):
+            with pytest.raises(ceph_cfg.osd.Error):
+                self.osdc.is_partition("/dev/sdz")
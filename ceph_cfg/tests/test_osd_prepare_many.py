@@ -0,0 +1,91 @@
+import pytest
+import ceph_cfg.model
+import ceph_cfg.osd
+
+import mock
+
+
+class Test_osd_prepare_many(object):
+    def setup(self):
+        self.model = ceph_cfg.model.model(cluster_name="ceph")
+        self.model.part_pairent = {
+            "/dev/sdz1" : "/dev/sdz",
+            "/dev/sdz2" : "/dev/sdz",
+            }
+        self.osdc = ceph_cfg.osd.osd_ctrl(self.model)
+        self.executed = []
+
+
+    def prepare_arguments(self, **kwargs):
+        osd_dev = kwargs.get("osd_dev")
+        if osd_dev == "/dev/bad":
+            raise ceph_cfg.osd.Error("Not a block device")
+        if osd_dev == "/dev/used":
+            return None
+        return ["ceph-disk", "prepare", osd_dev]
+
+
+    def prepare_execute(self, arguments):
+        self.executed.append(arguments[-1])
+        if arguments[-1] == "/dev/sdc":
+            raise ceph_cfg.osd.Error("Failed executing")
+        return True
+
+
+    def prepare_many(self, specs, **kwargs):
+        with mock.patch.object(self.osdc, '_prepare_arguments', self.prepare_arguments):
+            with mock.patch.object(self.osdc, '_prepare_execute', self.prepare_execute):
+                return self.osdc.prepare_many(specs, **kwargs)
+
+
+    def test_results(self):
+        specs = [
+            {"osd_dev" : "/dev/sda", "journal_dev" : "/dev/sdz1"},
+            {"osd_dev" : "/dev/sdb", "journal_dev" : "/dev/sdz2"},
+            {"osd_dev" : "/dev/sdc"},
+            {"osd_dev" : "/dev/used"},
+            ]
+        output = self.prepare_many(specs, parallelism=2)
+        assert [item["osd_dev"] for item in output] == ["/dev/sda", "/dev/sdb", "/dev/sdc", "/dev/used"]
+        assert [item["status"] for item in output] == ["prepared", "prepared", "failed", "skipped"]
+        assert "Failed executing" in output[2]["error"]
+        # sda and sdb share the journal disk so run in order
+        assert self.executed.index("/dev/sda") < self.executed.index("/dev/sdb")
+        assert not "/dev/used" in self.executed
+
+
+    def test_validate_all_first(self):
+        specs = [
+            {"osd_dev" : "/dev/sda"},
+            {"osd_dev" : "/dev/bad"},
+            {"osd_dev" : "/dev/sda"},
+            ]
+        with pytest.raises(ceph_cfg.osd.Error) as excinfo:
+            self.prepare_many(specs)
+        assert "/dev/bad" in str(excinfo.value)
+        assert "already used" in str(excinfo.value)
+        assert self.executed == []
+
+
+    def test_journal_partition_used_once(self):
+        specs = [
+            {"osd_dev" : "/dev/sda", "journal_dev" : "/dev/sdz1"},
+            {"osd_dev" : "/dev/sdb", "journal_dev" : "/dev/sdz1"},
+            ]
+        with pytest.raises(ceph_cfg.osd.Error) as excinfo:
+            self.prepare_many(specs)
+        assert "/dev/sdz1" in str(excinfo.value)
+        specs = [
+            {"osd_dev" : "/dev/sda", "journal_dev" : "/dev/sdz1"},
+            {"osd_dev" : "/dev/sdz1"},
+            ]
+        with pytest.raises(ceph_cfg.osd.Error):
+            self.prepare_many(specs)
+        assert self.executed == []
+        # A journal disk is shared
+        specs = [
+            {"osd_dev" : "/dev/sda", "journal_dev" : "/dev/sdz"},
+            {"osd_dev" : "/dev/sdb", "journal_dev" : "/dev/sdz"},
+            ]
+        output = self.prepare_many(specs)
+        assert [item["status"] for item in output] == ["prepared", "prepared"]
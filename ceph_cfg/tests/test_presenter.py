@@ -0,0 +1,140 @@
+#Test units
+import pytest
+import ceph_cfg.model
+import ceph_cfg.mdl_updater
+import ceph_cfg.presenter
+import ceph_cfg.util_columnar
+from ceph_cfg.tests.test_update_lsblk import mock_lsblk
+from ceph_cfg.tests.test_mdl_updater_index import mock_retrive_osd_details
+from ceph_cfg.tests.test_mdl_updater_index import mock_retrive_osd_details_from_dir
+
+import mock
+
+
+class Test_presenter(object):
+    def setup(self):
+        """
+        Make a model with discovered partitions and OSD
+        """
+        self.model = ceph_cfg.model.model(
+            cluster_name="ceph",
+            cluster_uuid="eaac9695-4265-4ca8-ac2a-f3a479c559b1")
+        self.model.lsblk_version.major = 2
+        self.model.lsblk_version.minor = 25
+        self.model.lsblk_version.revision = 0
+        self.updater = ceph_cfg.mdl_updater.model_updater(self.model)
+        self.refresh()
+        self.presenter = ceph_cfg.presenter.mdl_presentor(self.model)
+
+
+    @mock.patch('ceph_cfg.mdl_updater.retrive_osd_details', mock_retrive_osd_details)
+    @mock.patch('ceph_cfg.mdl_updater._retrive_osd_details_from_dir', mock_retrive_osd_details_from_dir)
+    @mock.patch('ceph_cfg.utils.execute_local_command', mock_lsblk)
+    def refresh(self):
+        self.updater.partitions_all_refresh_lsblk()
+        self.updater.discover_partitions_refresh()
+
+
+    def test_partition_rendered_once(self):
+        with mock.patch.object(self.presenter, '_partition_details_lsblk',
+                wraps=self.presenter._partition_details_lsblk) as lsblk_details:
+            self.presenter.partitions_all()
+            self.presenter.discover_osd()
+            self.presenter.discover_osd_partitions()
+            # 5 partitions, OSD views reuse the same records
+            assert lsblk_details.call_count == 5
+
+
+    def test_refresh_invalidates(self):
+        before = self.presenter.partitions_all()
+        self.model.lsblk['/dev/vda']['PARTITION']['/dev/vda1']['MOUNTPOINT'] = '/mnt'
+        assert self.presenter.partitions_all() == before
+        self.updater._generation_bump()
+        after = self.presenter.partitions_all()
+        assert after['/dev/vda']['PARTITION']['/dev/vda1']['MOUNTPOINT'] == '/mnt'
+
+
+    def test_cached_records_not_shared(self):
+        first = self.presenter.partitions_all()
+        first['/dev/vda']['PARTITION']['/dev/vda1']['NAME'] = 'changed'
+        del first['/dev/vdb']['SIZE']
+        second = self.presenter.partitions_all()
+        assert second['/dev/vda']['PARTITION']['/dev/vda1']['NAME'] == '/dev/vda1'
+        assert second['/dev/vdb']['SIZE'] == '21474836480'
+
+
+    def test_cached_lists_not_shared(self):
+        self.model.symlinks = {
+            '/dev/vda' : ['/dev/disk/by-id/virtio-vda'],
+            '/dev/vda1' : ['/dev/disk/by-uuid/6820d2ff-0293-44c8-aaeb-af8b9a7ca719'],
+            }
+        first = self.presenter.partitions_all()
+        first['/dev/vda']['PARTITION']['/dev/vda1']['LINK'].append('/dev/changed')
+        first['/dev/vda']['LINK'].append('/dev/changed')
+        second = self.presenter.partitions_all()
+        assert not '/dev/changed' in second['/dev/vda']['PARTITION']['/dev/vda1']['LINK']
+        assert not '/dev/changed' in second['/dev/vda']['LINK']
+        assert not '/dev/changed' in self.model.symlinks['/dev/vda1']
+        assert not '/dev/changed' in self.model.symlinks['/dev/vda']
+
+
+    def test_query_fields(self):
+        output = self.presenter.partition_query(fields=["NAME", "SIZE", "TYPE"], kind="disk")
+        assert len(output) == 6
+        assert output[0] == {"NAME" : "/dev/vda", "SIZE" : "21474836480", "TYPE" : "disk"}
+        with mock.patch.object(self.presenter, '_partition_details') as details:
+            self.presenter.partition_query(fields=["NAME"])
+            assert details.call_count == 0
+
+
+    def test_query_filters(self):
+        output = self.presenter.partition_query(fields=["NAME"], kind="part",
+            mounted=True, size_min=2 * 1024 ** 3)
+        assert output == [{"NAME" : "/dev/vda3"}, {"NAME" : "/dev/vdb1"}, {"NAME" : "/dev/vdc1"}]
+        output = self.presenter.partition_query(fields=["NAME"], parttype="0x82")
+        assert output == [{"NAME" : "/dev/vda2"}]
+        output = self.presenter.partition_query(fields=["NAME"], rotational=False)
+        assert output == []
+        output = self.presenter.partition_query(fields=["NAME"],
+            cluster_fsid="eaac9695-4265-4ca8-ac2a-f3a479c559b1", kind="part")
+        assert output == [{"NAME" : "/dev/vdb1"}, {"NAME" : "/dev/vdc1"}]
+
+
+    def test_query_paging(self):
+        names = [item["NAME"] for item in self.presenter.partition_query(fields=["NAME"])]
+        output = self.presenter.partition_query(fields=["NAME"], offset=2, limit=3)
+        assert [item["NAME"] for item in output] == names[2:5]
+        with pytest.raises(ceph_cfg.presenter.Error):
+            self.presenter.partition_query(fields=["BOGUS"])
+
+
+    def test_iter(self):
+        assert dict(self.presenter.partitions_all_iter()) == self.presenter.partitions_all()
+        osd = {}
+        for cluster, osd_details in self.presenter.discover_osd_iter():
+            osd.setdefault(cluster, []).append(osd_details)
+        assert osd == self.presenter.discover_osd()
+
+
+    def test_iter_not_memoised(self):
+        list(self.presenter.partitions_all_iter())
+        list(self.presenter.discover_osd_iter())
+        assert self.model.presented_partitions == {}
+        assert self.model.presented_disks == {}
+
+
+    def test_columnar(self):
+        self.model.hostname = "node1"
+        columns = self.presenter.columnar()
+        names = [name for name, column_type in ceph_cfg.presenter.columnar_schema]
+        assert sorted(columns.keys()) == sorted(names)
+        partitions = columns["partition"].values()
+        assert len(partitions) == 11
+        row = partitions.index("/dev/vdc1")
+        assert columns["disk"][row] == "/dev/vdc"
+        assert columns["host"][row] == "node1"
+        assert columns["size"][row] == 16105061888
+        assert columns["osd_id"][row] == 6
+        assert columns["cluster_fsid"][row] == "eaac9695-4265-4ca8-ac2a-f3a479c559b1"
+        row = partitions.index(None)
+        assert columns["osd_id"][row] == ceph_cfg.util_columnar.int_null
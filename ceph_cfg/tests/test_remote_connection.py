@@ -0,0 +1,129 @@
+import shutil
+import tempfile
+import ceph_cfg.constants
+import ceph_cfg.model
+import ceph_cfg.remote_connection
+import ceph_cfg.util_which
+
+import mock
+
+
+class Test_remote_connection(object):
+    def setup(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.keyring_dir = tempfile.mkdtemp()
+        self.model = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        self.candidates = []
+        for keytype in ["admin", "osd", "mon"]:
+            path = "%s/%s.keyring" % (self.keyring_dir, keytype)
+            open(path, "w").close()
+            self.candidates.append((keytype, path, "client.%s" % (keytype)))
+        self.patches = [
+            mock.patch.object(ceph_cfg.constants, '_path_cache', self.cache_dir),
+            mock.patch.object(ceph_cfg.util_which.which_ceph, '_path', '/usr/bin/ceph'),
+            mock.patch.object(ceph_cfg.remote_connection.connection,
+                '_candidates', lambda conn: self.candidates),
+            ]
+        for patch in self.patches:
+            patch.start()
+
+
+    def teardown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.keyring_dir)
+
+
+    def _execute(self, working):
+        def execute(arguments):
+            assert arguments[-1] == "quorum_status"
+            identity = arguments[arguments.index("--name") + 1]
+            if identity in working:
+                return {"retcode" : 0, "stdout" : "{}", "stderr" : ""}
+            return {"retcode" : 13, "stdout" : "", "stderr" : "EACCES"}
+        return execute
+
+
+    def test_priority_and_cache(self):
+        execute = self._execute(["client.osd", "client.mon"])
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=execute) as probe:
+            conn = ceph_cfg.remote_connection.connection(self.model)
+            assert conn.connect()
+            assert probe.call_count == 3
+        assert self.model.connection.keyring_type == "osd"
+        other = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        with mock.patch('ceph_cfg.utils.execute_local_command') as probe:
+            conn = ceph_cfg.remote_connection.connection(other)
+            assert conn.connect()
+            assert probe.call_count == 0
+        assert other.connection.keyring_identity == "client.osd"
+
+
+    def test_cache_invalid_when_keyring_changes(self):
+        execute = self._execute(["client.admin"])
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=execute):
+            conn = ceph_cfg.remote_connection.connection(self.model)
+            assert conn.connect()
+        with open(self.candidates[0][1], "w") as keyring_file:
+            keyring_file.write("[client.admin]\n")
+        other = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=execute) as probe:
+            conn = ceph_cfg.remote_connection.connection(other)
+            assert conn.connect()
+            assert probe.call_count == 3
+
+
+    def test_none_working(self):
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=self._execute([])):
+            conn = ceph_cfg.remote_connection.connection(self.model)
+            assert not conn.connect()
+        assert self.model.connection.keyring_type is None
+
+
+    def _execute_command(self, working):
+        def execute(arguments):
+            identity = arguments[arguments.index("--name") + 1]
+            if identity in working:
+                return {"retcode" : 0, "stdout" : "{}", "stderr" : ""}
+            return {"retcode" : 13, "stdout" : "", "stderr" : "EACCES"}
+        return execute
+
+
+    def test_cached_keyring_rejected(self):
+        working = ["client.admin", "client.osd"]
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=self._execute_command(working)):
+            assert ceph_cfg.remote_connection.connection(self.model).connect()
+        # admin key removed from the cluster after it was cached
+        working.remove("client.admin")
+        other = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        conn = ceph_cfg.remote_connection.connection(other)
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=self._execute_command(working)) as execute:
+            arguments, output = conn.execute(["osd", "stat"])
+            # command, three probes and the retry
+            assert execute.call_count == 5
+        assert output["retcode"] == 0
+        assert arguments[arguments.index("--name") + 1] == "client.osd"
+        assert not other.connection.keyring_cached
+        third = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        with mock.patch('ceph_cfg.utils.execute_local_command') as execute:
+            assert ceph_cfg.remote_connection.connection(third).connect()
+            assert execute.call_count == 0
+        assert third.connection.keyring_identity == "client.osd"
+
+
+    def test_cached_keyring_command_error(self):
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=self._execute_command(["client.admin"])):
+            assert ceph_cfg.remote_connection.connection(self.model).connect()
+        other = ceph_cfg.model.model(cluster_name="ceph", cluster_uuid="c1")
+        conn = ceph_cfg.remote_connection.connection(other)
+        def execute(arguments):
+            if arguments[-1] == "quorum_status":
+                return {"retcode" : 0, "stdout" : "{}", "stderr" : ""}
+            return {"retcode" : 17, "stdout" : "", "stderr" : "EEXIST"}
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=execute) as probe:
+            arguments, output = conn.execute(["osd", "pool", "create", "rbd", "8"])
+            # same keyring chosen again so the command is not repeated
+            assert probe.call_count == 4
+        assert output["retcode"] == 17
+        assert other.connection.keyring_identity == "client.admin"
@@ -0,0 +1,220 @@
+import pytest
+import ceph_cfg.service
+import ceph_cfg.util_which
+
+import mock
+
+
+def mock_systemctl(arguments):
+    if arguments[1] != "show":
+        return {"retcode" : 0, "stdout" : "", "stderr" : ""}
+    blocks = []
+    for name in arguments[4:]:
+        active = "active"
+        if name.endswith("@2"):
+            active = "inactive"
+        blocks.append("ActiveState=%s\nSubState=running\nUnitFileState=enabled\nId=%s.service\n" % (active, name))
+    return {"retcode" : 0, "stdout" : "\n".join(blocks), "stderr" : ""}
+
+
+class Test_service_state(object):
+    def setup(self):
+        ceph_cfg.service.unit_cache_clear()
+        self.init_system = ceph_cfg.service.init_system(init_type="systemd")
+        self.patches = [
+            mock.patch.object(ceph_cfg.util_which.which_systemctl, '_path', '/bin/systemctl'),
+            mock.patch('ceph_cfg.utils.execute_local_command', side_effect=mock_systemctl),
+            ]
+        self.execute = [patch.start() for patch in self.patches][1]
+
+
+    def teardown(self):
+        for patch in self.patches:
+            patch.stop()
+        ceph_cfg.service.unit_cache_clear()
+
+
+    def test_state_many_one_call(self):
+        units = [{"service" : "ceph-osd", "identifier" : str(index)} for index in range(60)]
+        output = self.init_system.state_many(units)
+        assert self.execute.call_count == 1
+        assert len(output) == 60
+        assert output[2]["unit"] == "ceph-osd@2"
+        assert output[2]["ActiveState"] == "inactive"
+        assert output[3]["ActiveState"] == "active"
+        assert output[3]["UnitFileState"] == "enabled"
+        assert output[3]["Id"] == "ceph-osd@3.service"
+        # Cached states are reused
+        assert self.init_system.is_running(service="ceph-osd", identifier="3")
+        assert not self.init_system.is_running(service="ceph-osd", identifier="2")
+        assert self.execute.call_count == 1
+
+
+    def test_cache_updated(self):
+        self.init_system.state_many([{"service" : "ceph-osd", "identifier" : "2"}])
+        self.init_system.on_boot_disable(service="ceph-osd", identifier="2")
+        self.init_system.stop(service="ceph-osd", identifier="2")
+        state = self.init_system.state_many([{"service" : "ceph-osd", "identifier" : "2"}])[0]
+        assert state["ActiveState"] == "inactive"
+        assert state["UnitFileState"] == "disabled"
+        assert [call[0][0][1] for call in self.execute.call_args_list] == [
+            "show", "disable", "stop"]
+
+
+    def test_cache_dropped_on_start(self):
+        # A daemon that dies right after starting must not look running
+        self.init_system.state_many([{"service" : "ceph-osd", "identifier" : "2"}])
+        self.init_system.start(service="ceph-osd", identifier="2")
+        assert not self.init_system.is_running(service="ceph-osd", identifier="2")
+        self.init_system.restart(service="ceph-osd", identifier="2")
+        assert not self.init_system.is_running(service="ceph-osd", identifier="2")
+        assert [call[0][0][1] for call in self.execute.call_args_list] == [
+            "show", "start", "show", "restart", "show"]
+
+
+    def test_cache_expires(self):
+        self.init_system.is_running(service="ceph-mon", identifier="a")
+        with mock.patch.object(ceph_cfg.service, 'unit_cache_ttl', -1):
+            self.init_system.is_running(service="ceph-mon", identifier="a")
+        assert self.execute.call_count == 2
+
+
+    def test_result_count_mismatch(self):
+        output = {"retcode" : 0, "stdout" : "ActiveState=active\n", "stderr" : ""}
+        self.execute.side_effect = None
+        self.execute.return_value = output
+        with pytest.raises(ceph_cfg.service.init_exception_service):
+            self.init_system.state_many([
+                {"service" : "ceph-osd", "identifier" : "0"},
+                {"service" : "ceph-osd", "identifier" : "1"}])
+
+
+class fake_systemd(object):
+    """
+    systemctl where actions on some units fail
+    """
+    def __init__(self, failing):
+        self.failing = failing
+        self.states = {}
+        self.calls = []
+
+    def __call__(self, arguments):
+        verb = arguments[1]
+        if verb == "show":
+            names = arguments[4:]
+        else:
+            names = arguments[2:]
+        self.calls.append([verb] + names)
+        if verb == "show":
+            blocks = []
+            for name in names:
+                state = self.states.get(name, {})
+                blocks.append("ActiveState=%s\nSubState=dead\nUnitFileState=%s\nId=%s.service\n" % (
+                    state.get("ActiveState", "inactive"),
+                    state.get("UnitFileState", "disabled"),
+                    name))
+            return {"retcode" : 0, "stdout" : "\n".join(blocks), "stderr" : ""}
+        retcode = 0
+        for name in names:
+            if name in self.failing:
+                retcode = 1
+                continue
+            state = self.states.setdefault(name, {})
+            if verb in ["start", "restart"]:
+                state["ActiveState"] = "active"
+            if verb == "stop":
+                state["ActiveState"] = "inactive"
+            if verb == "enable":
+                state["UnitFileState"] = "enabled"
+            if verb == "disable":
+                state["UnitFileState"] = "disabled"
+        return {"retcode" : retcode, "stdout" : "", "stderr" : "Unit failed"}
+
+
+class Test_service_action_many(object):
+    def setup(self):
+        ceph_cfg.service.unit_cache_clear()
+        self.init_system = ceph_cfg.service.init_system(init_type="systemd")
+        self.systemd = fake_systemd(["ceph-osd@2"])
+        self.patches = [
+            mock.patch.object(ceph_cfg.util_which.which_systemctl, '_path', '/bin/systemctl'),
+            mock.patch('ceph_cfg.utils.execute_local_command', side_effect=self.systemd),
+            ]
+        self.execute = [patch.start() for patch in self.patches][1]
+        self.units = [{"service" : "ceph-osd", "identifier" : str(index)} for index in range(4)]
+
+
+    def teardown(self):
+        for patch in self.patches:
+            patch.stop()
+        ceph_cfg.service.unit_cache_clear()
+
+
+    def test_grouped_call(self):
+        self.init_system.state_many(self.units[:1])
+        self.init_system.on_boot_disable_many(self.units[:1])
+        output = self.init_system.on_boot_enable_many([self.units[0], self.units[3]])
+        assert self.systemd.calls == [
+            ["show", "ceph-osd@0"],
+            ["disable", "ceph-osd@0"],
+            ["enable", "ceph-osd@0", "ceph-osd@3"],
+            ]
+        assert [item["status"] for item in output] == ["ok", "ok"]
+        assert output[1]["unit"] == "ceph-osd@3"
+        assert output[1]["identifier"] == "3"
+        assert output[1]["seconds"] >= 0
+        # The unit cache is updated
+        state = self.init_system.state_many(self.units[:1])[0]
+        assert state["UnitFileState"] == "enabled"
+        assert len(self.systemd.calls) == 3
+
+
+    def test_fallback_failed_units_only(self):
+        output = self.init_system.start_many(self.units, parallelism=2)
+        # One grouped call, one state query, then only the failed unit
+        assert self.systemd.calls == [
+            ["start", "ceph-osd@0", "ceph-osd@1", "ceph-osd@2", "ceph-osd@3"],
+            ["show", "ceph-osd@0", "ceph-osd@1", "ceph-osd@2", "ceph-osd@3"],
+            ["start", "ceph-osd@2"],
+            ]
+        assert [item["unit"] for item in output] == [
+            "ceph-osd@0", "ceph-osd@1", "ceph-osd@2", "ceph-osd@3"]
+        assert [item["status"] for item in output] == ["ok", "ok", "failed", "ok"]
+        assert output[2]["error"] is not None
+        assert output[0]["error"] is None
+
+
+    def test_restart_not_repeated(self):
+        output = self.init_system.restart_many(self.units)
+        assert [call[0] for call in self.systemd.calls] == ["restart", "show"]
+        assert [item["status"] for item in output] == ["ok", "ok", "failed", "ok"]
+        assert "ActiveState=inactive" in output[2]["error"]
+
+
+    def test_enable_failure_reported(self):
+        output = self.init_system.on_boot_enable_many(self.units)
+        assert self.systemd.calls[-1] == ["enable", "ceph-osd@2"]
+        assert [item["status"] for item in output] == ["ok", "ok", "failed", "ok"]
+        # Single unit calls do not raise, as before
+        self.init_system.on_boot_enable(service="ceph-osd", identifier="2")
+        self.init_system.on_boot_disable(service="ceph-osd", identifier="2")
+
+
+    def test_empty(self):
+        assert self.init_system.stop_many([]) == []
+        assert self.execute.call_count == 0
+
+
+class Test_service_action_many_sysv(object):
+    def test_failure_reported(self):
+        init_system = ceph_cfg.service.init_system_sysV()
+        def execute(arguments):
+            if arguments[1] == "ceph-b":
+                return {"retcode" : 1, "stdout" : "", "stderr" : "failed"}
+            return {"retcode" : 0, "stdout" : "", "stderr" : ""}
+        with mock.patch('ceph_cfg.utils.execute_local_command', side_effect=execute) as patched:
+            output = init_system.action_many("on_boot_enable",
+                [{"service" : "ceph-a"}, {"service" : "ceph-b"}])
+        assert [item["status"] for item in output] == ["ok", "failed"]
+        assert sorted(call[0][0] for call in patched.call_args_list) == [
+            ["chkconfig", "ceph-a", "on"], ["chkconfig", "ceph-b", "on"]]
@@ -0,0 +1,133 @@
+import os
+import io
+import json
+import tempfile
+import pytest
+import ceph_cfg.session
+import ceph_cfg.mon
+import ceph_cfg.mdl_updater
+import ceph_cfg.admin_socket
+
+import mock
+
+
+class Test_session(object):
+    def setup(self):
+        ceph_cfg.session.sessions_clear()
+        self.session = ceph_cfg.session.session(cluster_name="ceph")
+        self.updater = mock.Mock()
+        self.session.updater = self.updater
+
+
+    def test_disks_reused(self):
+        self.session.partition_list()
+        self.session.osd_discover()
+        assert self.updater.partitions_all_refresh.call_count == 1
+        assert self.updater.symlinks_refresh.call_count == 1
+        assert self.updater.discover_partitions_refresh.call_count == 1
+        self.session.invalidate("disks")
+        self.session.partition_list()
+        assert self.updater.partitions_all_refresh.call_count == 2
+        assert self.updater.discover_partitions_refresh.call_count == 1
+
+
+    def test_config_reloaded_on_change(self):
+        mtime = [1.0]
+        with mock.patch('ceph_cfg.session._config_mtime', lambda name: mtime[0]):
+            self.session.config_refresh()
+            self.session.config_refresh()
+            assert self.updater.load_confg.call_count == 1
+            assert self.updater.defaults_refresh.call_count == 1
+            mtime[0] = 2.0
+            self.session.config_refresh()
+            assert self.updater.load_confg.call_count == 2
+            assert self.updater.defaults_refresh.call_count == 2
+            self.session.invalidate("config")
+            self.session.config_refresh()
+            assert self.updater.load_confg.call_count == 3
+            assert self.updater.defaults_refresh.call_count == 2
+
+
+    def test_connection_dropped_with_keyring(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        connection = self.session.model.connection
+        connection.keyring_type = "admin"
+        connection.keyring_path = path
+        connection.keyring_identity = "client.admin"
+        self.session._connection_check()
+        assert self.session.model.connection.keyring_path == path
+        os.remove(path)
+        self.session._connection_check()
+        assert self.session.model.connection.keyring_path is None
+
+
+    def test_invalid_section(self):
+        with pytest.raises(ceph_cfg.session.Error):
+            self.session.invalidate("bogus")
+
+
+    def test_default_session(self):
+        first = ceph_cfg.session.session_get(cluster_name="ceph")
+        assert ceph_cfg.session.session_get(cluster_name="ceph") is first
+        assert ceph_cfg.session.session_get(cluster_name="other") is not first
+        first._disks_done.add("partitions")
+        assert ceph_cfg.session.session_default(cluster_name="ceph") is first
+        assert first._disks_done == set()
+
+
+    def test_default_session_status_dropped(self):
+        first = ceph_cfg.session.session_get(cluster_name="ceph")
+        first.model.mon_status = {"state" : "leader"}
+        first.model.cluster_status = {"health" : "HEALTH_OK"}
+        first.model.quorum_status = {"quorum" : [0]}
+        first.model.pool_list = {"rbd" : {}}
+        first.model.map_epochs = {"osdmap" : 5}
+        ceph_cfg.session.session_default(cluster_name="ceph")
+        assert first.model.mon_status is None
+        assert first.model.cluster_status is None
+        assert first.model.quorum_status is None
+        # Checked against the map epoch when used
+        assert first.model.pool_list == {"rbd" : {}}
+        assert first.model.map_epochs == {"osdmap" : 5}
+
+
+    def test_inventory_one_pass(self):
+        self.session.ceph_version = mock.Mock(return_value={"major" : "10"})
+        self.session.mon_status = mock.Mock(side_effect=ceph_cfg.mon.Error("Not a mon node"))
+        output = self.session.inventory()
+        assert sorted(output.keys()) == sorted(ceph_cfg.session.inventory_sections)
+        assert output["mon_status"] == {}
+        assert self.updater.symlinks_refresh.call_count == 1
+        assert self.updater.partitions_all_refresh.call_count == 1
+        assert self.updater.discover_partitions_refresh.call_count == 1
+
+
+    def test_inventory_mon_down(self):
+        self.session.ceph_version = mock.Mock(return_value={"major" : "10"})
+        self.session.mon_status = mock.Mock(side_effect=ceph_cfg.mdl_updater.Error("Failed to get mon status"))
+        assert self.session.inventory(["mon_status"]) == {"mon_status" : {}}
+        self.session.mon_status = mock.Mock(side_effect=ceph_cfg.admin_socket.Error("Connect failed"))
+        assert self.session.inventory(["mon_status"]) == {"mon_status" : {}}
+
+
+    def test_inventory_sections(self):
+        self.session.ceph_version = mock.Mock(return_value={"major" : "10"})
+        output = self.session.inventory(["ceph_version"])
+        assert output == {"ceph_version" : {"major" : "10"}}
+        assert self.updater.partitions_all_refresh.call_count == 0
+        with pytest.raises(ceph_cfg.session.Error):
+            self.session.inventory(["bogus"])
+
+
+    def test_osd_discover_stream_null_cluster(self):
+        self.session.model.discovered_osd = {
+            None : [{"whoami" : "1"}],
+            "eaac9695-4265-4ca8-ac2a-f3a479c559b1" : [{"whoami" : "2"}],
+            }
+        output = io.StringIO()
+        self.session.osd_discover_stream(output)
+        assert json.loads(output.getvalue()) == {
+            "null" : [{"whoami" : "1"}],
+            "eaac9695-4265-4ca8-ac2a-f3a479c559b1" : [{"whoami" : "2"}],
+            }
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import time
+import ceph_cfg.util_cache
+
+import mock
+
+
+class Test_util_cache(object):
+    def setup(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+
+    def teardown(self):
+        shutil.rmtree(self.cache_dir)
+
+
+    def test_round_trip(self):
+        assert ceph_cfg.util_cache.load("item", cache_dir=self.cache_dir) is None
+        assert ceph_cfg.util_cache.save("item", {"a" : [1, 2]}, cache_dir=self.cache_dir)
+        assert ceph_cfg.util_cache.load("item", cache_dir=self.cache_dir) == {"a" : [1, 2]}
+        assert os.listdir(self.cache_dir) == ["item.json"]
+        ceph_cfg.util_cache.remove("item", cache_dir=self.cache_dir)
+        assert ceph_cfg.util_cache.load("item", cache_dir=self.cache_dir) is None
+
+
+    def test_ttl(self):
+        ceph_cfg.util_cache.save("item", 1, cache_dir=self.cache_dir)
+        assert ceph_cfg.util_cache.load("item", ttl=60, cache_dir=self.cache_dir) == 1
+        with mock.patch('time.time', return_value=time.time() + 120):
+            assert ceph_cfg.util_cache.load("item", ttl=60, cache_dir=self.cache_dir) is None
+
+
+    def test_corrupt_ignored(self):
+        with open(os.path.join(self.cache_dir, "item.json"), "w") as cache_file:
+            cache_file.write("{")
+        assert ceph_cfg.util_cache.load("item", cache_dir=self.cache_dir) is None
+
+
+    def test_unwritable(self):
+        path = os.path.join(self.cache_dir, "file")
+        open(path, "w").close()
+        assert not ceph_cfg.util_cache.save("item", 1, cache_dir=path)
+
+
+    def test_file_signature(self):
+        path = os.path.join(self.cache_dir, "file")
+        assert ceph_cfg.util_cache.file_signature(path) is None
+        with open(path, "w") as data:
+            data.write("a")
+        signature = ceph_cfg.util_cache.file_signature(path)
+        with open(path, "w") as data:
+            data.write("ab")
+        assert ceph_cfg.util_cache.file_signature(path) != signature
@@ -0,0 +1,61 @@
+import pytest
+import ceph_cfg.util_columnar
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+schema = [("name", "str"), ("size", "int"), ("rota", "bool")]
+
+rows_a = [
+    ("/dev/vda", 21474836480, True),
+    ("/dev/vda1", None, None),
+    (None, 0, False),
+    ]
+
+rows_b = [
+    ("/dev/vdb", 1, False),
+    ("/dev/vda", 2, True),
+    ]
+
+
+class Test_util_columnar(object):
+    def test_round_trip(self):
+        columns = ceph_cfg.util_columnar.encode(schema, rows_a)
+        data = ceph_cfg.util_columnar.pack(schema, columns)
+        loaded_schema, loaded = ceph_cfg.util_columnar.unpack(data)
+        assert loaded_schema == schema
+        assert loaded["name"].values() == ["/dev/vda", "/dev/vda1", None]
+        assert ceph_cfg.util_columnar.column_values("int", loaded["size"]) == [21474836480, None, 0]
+        assert ceph_cfg.util_columnar.column_values("bool", loaded["rota"]) == [True, None, False]
+
+
+    def test_concat(self):
+        table_a = ceph_cfg.util_columnar.encode(schema, rows_a)
+        table_b = ceph_cfg.util_columnar.encode(schema, rows_b)
+        merged = ceph_cfg.util_columnar.concat(schema, [table_a, table_b])
+        assert merged["name"].values() == ["/dev/vda", "/dev/vda1", None, "/dev/vdb", "/dev/vda"]
+        assert merged["name"].dictionary == ["/dev/vda", "/dev/vda1", "/dev/vdb"]
+        assert ceph_cfg.util_columnar.column_values("bool", merged["rota"]) == [True, None, False, False, True]
+
+
+    def test_csv(self):
+        columns = ceph_cfg.util_columnar.encode(schema, rows_a)
+        output = StringIO()
+        ceph_cfg.util_columnar.write_csv(schema, columns, output)
+        assert output.getvalue().splitlines() == [
+            "name,size,rota",
+            "/dev/vda,21474836480,1",
+            "/dev/vda1,,",
+            ",0,0",
+            ]
+
+
+    def test_invalid(self):
+        with pytest.raises(ceph_cfg.util_columnar.Error):
+            ceph_cfg.util_columnar.encode(schema, [("/dev/vda",)])
+        data = ceph_cfg.util_columnar.pack(schema, ceph_cfg.util_columnar.encode(schema, rows_a))
+        with pytest.raises(ceph_cfg.util_columnar.Error):
+            ceph_cfg.util_columnar.unpack(data[:-1])
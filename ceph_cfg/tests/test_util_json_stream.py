@@ -0,0 +1,28 @@
+import json
+import ceph_cfg.util_json_stream
+
+
+def _pairs():
+    yield "a", 1
+    yield "b", ceph_cfg.util_json_stream.array_stream(iter([{"x" : [1, 2]}, None]))
+    yield "c", ceph_cfg.util_json_stream.object_stream(iter([]))
+
+
+class Test_util_json_stream(object):
+    def test_nested(self):
+        stream = ceph_cfg.util_json_stream.object_stream(_pairs())
+        output = ceph_cfg.util_json_stream.dumps(stream)
+        assert json.loads(output) == {"a" : 1, "b" : [{"x" : [1, 2]}, None], "c" : {}}
+
+
+    def test_keys_converted(self):
+        pairs = [(None, 1), (True, 2), (3, 3), (1.5, 4), ("a", 5)]
+        stream = ceph_cfg.util_json_stream.object_stream(iter(pairs))
+        output = ceph_cfg.util_json_stream.dumps(stream)
+        assert json.loads(output) == json.loads(json.dumps(dict(pairs)))
+
+
+    def test_plain(self):
+        value = {"a" : ["b", 1.5, True]}
+        output = ceph_cfg.util_json_stream.dumps(value)
+        assert output == json.dumps(value)
@@ -0,0 +1,64 @@
+import threading
+import time
+import pytest
+import ceph_cfg.util_parallel
+
+
+class Test_util_parallel(object):
+    def setup(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.running_max = 0
+        self.order = []
+
+
+    def task(self, key, fail=False):
+        def func():
+            with self.lock:
+                self.running += 1
+                self.running_max = max(self.running_max, self.running)
+                self.order.append(key)
+            time.sleep(0.02)
+            with self.lock:
+                self.running -= 1
+            if fail:
+                raise ValueError(key)
+            return key
+        return (key, func)
+
+
+    def test_parallelism_limit(self):
+        tasks = [self.task(index) for index in range(6)]
+        results = ceph_cfg.util_parallel.run(tasks, parallelism=2)
+        assert [result.key for result in results] == list(range(6))
+        assert [result.result for result in results] == list(range(6))
+        assert self.running_max == 2
+        assert all(result.seconds > 0 for result in results)
+
+
+    def test_groups_serial(self):
+        groups = [
+            [self.task("a1"), self.task("a2"), self.task("a3")],
+            [self.task("b1", fail=True), self.task("b2")],
+            ]
+        results = ceph_cfg.util_parallel.run_groups(groups, parallelism=4)
+        assert self.running_max == 2
+        assert self.order.index("a1") < self.order.index("a2") < self.order.index("a3")
+        assert self.order.index("b1") < self.order.index("b2")
+        by_key = dict((result.key, result) for result in results)
+        assert isinstance(by_key["b1"].error, ValueError)
+        assert by_key["b2"].result == "b2"
+
+
+    def test_invalid_parallelism(self):
+        with pytest.raises(ceph_cfg.util_parallel.Error):
+            ceph_cfg.util_parallel.run([], parallelism=0)
+
+
+    def test_disjoint_set(self):
+        groups = ceph_cfg.util_parallel.disjoint_set()
+        groups.union("/dev/sda", "/dev/sdz")
+        groups.union("/dev/sdb", "/dev/sdz")
+        groups.find("/dev/sdc")
+        assert groups.find("/dev/sda") == groups.find("/dev/sdb")
+        assert groups.find("/dev/sdc") != groups.find("/dev/sda")
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import ceph_cfg.util_wait
+
+
+class fake_time(object):
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Test_util_wait(object):
+    def setup(self):
+        self.time = fake_time()
+        self.test_dir = tempfile.mkdtemp()
+
+
+    def teardown(self):
+        shutil.rmtree(self.test_dir)
+
+
+    def _waiter(self, timeout, **kwargs):
+        return ceph_cfg.util_wait.waiter(timeout,
+            clock=self.time.clock,
+            sleep=self.time.sleep,
+            **kwargs)
+
+
+    def test_backoff_to_deadline(self):
+        waiter = self._waiter(10, interval=1, interval_max=4, jitter=0)
+        assert not waiter.wait(lambda: False)
+        assert self.time.sleeps == [1, 2, 4, 3]
+        assert self.time.now == 110
+
+
+    def test_success(self):
+        checks = []
+        def check():
+            checks.append(1)
+            return len(checks) == 3
+        waiter = self._waiter(60, interval=0.5, jitter=0.2)
+        assert waiter.wait(check)
+        assert len(self.time.sleeps) == 2
+        assert 0.4 <= self.time.sleeps[0] <= 0.6
+        assert 0.8 <= self.time.sleeps[1] <= 1.2
+
+
+    def test_inotify_wakes_early(self):
+        path = os.path.join(self.test_dir, "ceph-mon.a.asok")
+        def create():
+            time.sleep(0.1)
+            open(path, "w").close()
+        thread = threading.Thread(target=create)
+        thread.start()
+        waiter = ceph_cfg.util_wait.waiter(20, interval=10, watch_path=path)
+        time_start = time.time()
+        assert waiter.wait(lambda: os.path.exists(path))
+        thread.join()
+        if ceph_cfg.util_wait._libc_get() is not None:
+            assert time.time() - time_start < 5
@@ -0,0 +1,33 @@
+import time
+import mock
+import ceph_cfg.utils
+
+
+class Test_execute_local_command(object):
+    def test_output(self):
+        output = ceph_cfg.utils.execute_local_command(["sh", "-c", "echo done"], timeout=10)
+        assert output["retcode"] == 0
+        assert output["stdout"].strip() == b"done"
+        assert not output["timeout"]
+
+
+    def test_timeout_kills_children(self):
+        time_start = time.time()
+        output = ceph_cfg.utils.execute_local_command(
+            ["sh", "-c", "sleep 5; echo done"], timeout=0.5)
+        assert time.time() - time_start < 3
+        assert output["timeout"]
+        assert output["retcode"] != 0
+
+
+    def test_timer_after_exit(self):
+        # Timer firing after the command exited is not a timeout
+        def timer_late(interval, function):
+            timer = mock.Mock()
+            timer.cancel.side_effect = function
+            return timer
+        with mock.patch('threading.Timer', timer_late):
+            output = ceph_cfg.utils.execute_local_command(
+                ["sh", "-c", "echo done"], timeout=10)
+        assert output["retcode"] == 0
+        assert not output["timeout"]
@@ -0,0 +1,157 @@
+# Import Python Libs
+from __future__ import absolute_import
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+# Local imports
+from . import constants
+
+
+log = logging.getLogger(__name__)
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def file_signature(path):
+    """
+    Values that change when a file is replaced or modified, None if missing
+    """
+    try:
+        path_stat = os.stat(path)
+    except OSError:
+        return None
+    return [path_stat.st_ino, path_stat.st_size, path_stat.st_mtime]
+
+
+def _cache_path(name, cache_dir, suffix=".json"):
+    if cache_dir is None:
+        cache_dir = constants._path_cache
+    if os.sep in name:
+        raise Error("Invalid cache name", name)
+    return os.path.join(cache_dir, "%s%s" % (name, suffix))
+
+
+def file_replace(path_src, path_dest):
+    """
+    Copy path_src to path_dest so readers never see a partial file
+    """
+    directory = os.path.dirname(os.path.abspath(path_dest))
+    handle, path_tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(handle)
+    try:
+        shutil.copyfile(path_src, path_tmp)
+        os.rename(path_tmp, path_dest)
+    except:
+        try:
+            os.remove(path_tmp)
+        except OSError:
+            pass
+        raise
+
+
+def load(name, ttl=None, cache_dir=None):
+    """
+    Load cached data, None if missing, unreadable or older than ttl seconds
+    """
+    path = _cache_path(name, cache_dir)
+    try:
+        with open(path) as cache_file:
+            content = json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(content, dict):
+        return None
+    saved = content.get("saved")
+    if saved is None:
+        return None
+    if ttl is not None:
+        age = time.time() - saved
+        if age < 0 or age > ttl:
+            log.debug("Cache '%s' expired" % (name))
+            return None
+    return content.get("data")
+
+
+def save(name, data, cache_dir=None):
+    """
+    Save data so readers see either the old or the new content
+
+    Returns False if the cache could not be written, a cache is an
+    optimisation so callers normally carry on.
+    """
+    path = _cache_path(name, cache_dir)
+    directory = os.path.dirname(path)
+    content = {
+        "saved" : time.time(),
+        "data" : data
+        }
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        handle, path_tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    except (IOError, OSError) as err:
+        log.debug("Failed to write cache '%s': %s" % (path, err))
+        return False
+    try:
+        with os.fdopen(handle, "w") as cache_file:
+            json.dump(content, cache_file)
+        os.rename(path_tmp, path)
+    except (IOError, OSError) as err:
+        log.debug("Failed to write cache '%s': %s" % (path, err))
+        try:
+            os.remove(path_tmp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def remove(name, cache_dir=None):
+    path = _cache_path(name, cache_dir)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def file_load(name, path, cache_dir=None):
+    """
+    Copy a cached file to path, False if it is not cached
+    """
+    path_cached = _cache_path(name, cache_dir, "")
+    if not os.path.isfile(path_cached):
+        return False
+    try:
+        file_replace(path_cached, path)
+    except (IOError, OSError) as err:
+        log.debug("Failed to read cache '%s': %s" % (path_cached, err))
+        return False
+    return True
+
+
+def file_save(name, path, cache_dir=None):
+    """
+    Cache a copy of the file at path, False if the cache could not be written
+    """
+    path_cached = _cache_path(name, cache_dir, "")
+    try:
+        directory = os.path.dirname(path_cached)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        file_replace(path, path_cached)
+    except (IOError, OSError) as err:
+        log.debug("Failed to write cache '%s': %s" % (path_cached, err))
+        return False
+    return True
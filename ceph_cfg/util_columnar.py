@@ -0,0 +1,339 @@
+# Import Python Libs
+from __future__ import absolute_import
+import array
+import csv
+import logging
+import struct
+import sys
+
+
+log = logging.getLogger(__name__)
+
+
+# Layout of the packed column format, all little endian.
+#
+#   header       magic, format version, flags
+#   counts       rows, columns
+#   columns      per column its name, type and data
+#
+# Column data by type:
+#
+#   str          dictionary of distinct values then a 32 bit code per row
+#                indexing the dictionary, null is -1
+#   int          a 64 bit signed integer per row, null is int_null
+#   bool         an 8 bit integer per row 0 or 1, null is -1
+#
+# Loaded columns are python arrays, so rows from many hosts can be
+# aggregated without building a dictionary per device.
+format_magic = b"CCFC"
+format_version = 1
+
+column_types = ["str", "int", "bool"]
+
+int_null = -(2 ** 63)
+
+_struct_header = struct.Struct("<4sHH")
+_struct_uint = struct.Struct("<I")
+_struct_type = struct.Struct("<B")
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def _typecode(itemsize):
+    """
+    Signed array typecode with the given item size.
+
+    Python 2 has no 'q' typecode so fall back to the native types.
+    """
+    for typecode in ['b', 'h', 'i', 'l', 'q']:
+        try:
+            if array.array(typecode).itemsize == itemsize:
+                return typecode
+        except ValueError:
+            continue
+    raise Error("No array type of size", itemsize)
+
+
+_typecode_code = _typecode(4)
+_typecode_int = _typecode(8)
+_typecode_bool = _typecode(1)
+
+
+def _array_bytes(values):
+    if sys.byteorder != 'little':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    if hasattr(values, "tobytes"):
+        return values.tobytes()
+    return values.tostring()
+
+
+def _array_load(typecode, data):
+    values = array.array(typecode)
+    if hasattr(values, "frombytes"):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+class dictionary_column(object):
+    """
+    A string column stored as distinct values and a code per row.
+    """
+    def __init__(self, dictionary=None, codes=None):
+        if dictionary is None:
+            dictionary = []
+        if codes is None:
+            codes = array.array(_typecode_code)
+        self.dictionary = dictionary
+        self.codes = codes
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        if code < 0:
+            return None
+        return self.dictionary[code]
+
+    def code(self, value):
+        """
+        Dictionary code of value, added to the dictionary if new
+        """
+        if value is None:
+            return -1
+        if self._lookup is None:
+            self._lookup = dict((item, code) for code, item in enumerate(self.dictionary))
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.dictionary)
+            self.dictionary.append(value)
+            self._lookup[value] = code
+        return code
+
+    def append(self, value):
+        self.codes.append(self.code(value))
+
+    def values(self):
+        return [self[index] for index in range(len(self.codes))]
+
+
+def column_new(column_type):
+    """
+    Empty column of column_type
+    """
+    if column_type == "str":
+        return dictionary_column()
+    if column_type == "int":
+        return array.array(_typecode_int)
+    if column_type == "bool":
+        return array.array(_typecode_bool)
+    raise Error("Invalid column type", column_type)
+
+
+def column_append(column_type, column, value):
+    """
+    Append a python value or None to a column
+    """
+    if column_type == "str":
+        column.append(value)
+    elif column_type == "int":
+        if value is None:
+            column.append(int_null)
+        else:
+            column.append(int(value))
+    elif column_type == "bool":
+        if value is None:
+            column.append(-1)
+        elif value:
+            column.append(1)
+        else:
+            column.append(0)
+    else:
+        raise Error("Invalid column type", column_type)
+
+
+def column_values(column_type, column):
+    """
+    Python values of a column, nulls are None
+    """
+    if column_type == "str":
+        return column.values()
+    if column_type == "int":
+        return [None if value == int_null else value for value in column]
+    if column_type == "bool":
+        return [None if value < 0 else bool(value) for value in column]
+    raise Error("Invalid column type", column_type)
+
+
+def encode(schema, rows):
+    """
+    Columns by name from an iterable of row tuples in schema order.
+
+    schema is a list of (name, type) pairs.
+    """
+    columns = [column_new(column_type) for name, column_type in schema]
+    for row in rows:
+        if len(row) != len(schema):
+            raise Error("Row does not match schema", row)
+        for index in range(len(schema)):
+            column_append(schema[index][1], columns[index], row[index])
+    output = {}
+    for index in range(len(schema)):
+        output[schema[index][0]] = columns[index]
+    return output
+
+
+def row_count(schema, columns):
+    if len(schema) == 0:
+        return 0
+    return len(columns[schema[0][0]])
+
+
+def concat(schema, tables):
+    """
+    Append the columns of several tables with the same schema.
+
+    String dictionaries are merged, all other columns are appended as
+    arrays.
+    """
+    output = {}
+    for name, column_type in schema:
+        column = column_new(column_type)
+        for table in tables:
+            other = table[name]
+            if column_type != "str":
+                column.extend(other)
+                continue
+            mapping = [column.code(value) for value in other.dictionary]
+            codes = column.codes
+            for code in other.codes:
+                if code < 0:
+                    codes.append(-1)
+                else:
+                    codes.append(mapping[code])
+        output[name] = column
+    return output
+
+
+def pack(schema, columns):
+    """
+    Pack columns to bytes
+    """
+    count = row_count(schema, columns)
+    out = [
+        _struct_header.pack(format_magic, format_version, 0),
+        struct.pack("<II", count, len(schema))
+        ]
+    for name, column_type in schema:
+        column = columns[name]
+        if len(column) != count:
+            raise Error("Column length differs", name)
+        name_bytes = _to_bytes(name)
+        out.append(_struct_uint.pack(len(name_bytes)))
+        out.append(name_bytes)
+        out.append(_struct_type.pack(column_types.index(column_type)))
+        if column_type == "str":
+            out.append(_struct_uint.pack(len(column.dictionary)))
+            for value in column.dictionary:
+                value_bytes = _to_bytes(value)
+                out.append(_struct_uint.pack(len(value_bytes)))
+                out.append(value_bytes)
+            out.append(_array_bytes(column.codes))
+        else:
+            out.append(_array_bytes(column))
+    return b"".join(out)
+
+
+def unpack(data):
+    """
+    Load packed columns
+
+    Returns the schema and the columns by name.
+    """
+    if len(data) < _struct_header.size + 8:
+        raise Error("Data too short")
+    magic, version, flags = _struct_header.unpack_from(data, 0)
+    if magic != format_magic:
+        raise Error("Invalid magic", magic)
+    if version != format_version:
+        raise Error("Unsupported format version", version)
+    pos = _struct_header.size
+    count, column_count = struct.unpack_from("<II", data, pos)
+    pos += 8
+    schema = []
+    columns = {}
+    for index in range(column_count):
+        length, = _struct_uint.unpack_from(data, pos)
+        pos += 4
+        name = data[pos:pos + length].decode('utf-8')
+        pos += length
+        type_index, = _struct_type.unpack_from(data, pos)
+        pos += 1
+        if type_index >= len(column_types):
+            raise Error("Invalid column type", type_index)
+        column_type = column_types[type_index]
+        if column_type == "str":
+            dictionary = []
+            dictionary_count, = _struct_uint.unpack_from(data, pos)
+            pos += 4
+            for value_index in range(dictionary_count):
+                length, = _struct_uint.unpack_from(data, pos)
+                pos += 4
+                dictionary.append(data[pos:pos + length].decode('utf-8'))
+                pos += length
+            length = 4 * count
+            codes = _array_load(_typecode_code, data[pos:pos + length])
+            column = dictionary_column(dictionary, codes)
+        elif column_type == "int":
+            length = 8 * count
+            column = _array_load(_typecode_int, data[pos:pos + length])
+        else:
+            length = count
+            column = _array_load(_typecode_bool, data[pos:pos + length])
+        pos += length
+        if len(column) != count:
+            raise Error("Truncated column", name)
+        schema.append((name, column_type))
+        columns[name] = column
+    return schema, columns
+
+
+def write_csv(schema, columns, fp):
+    """
+    Write columns as CSV with a header row, nulls are empty fields
+    """
+    writer = csv.writer(fp)
+    writer.writerow([name for name, column_type in schema])
+    values = [column_values(column_type, columns[name]) for name, column_type in schema]
+    for index in range(row_count(schema, columns)):
+        row = []
+        for column in values:
+            value = column[index]
+            if value is None:
+                value = ""
+            elif value is True:
+                value = 1
+            elif value is False:
+                value = 0
+            row.append(value)
+        writer.writerow(row)
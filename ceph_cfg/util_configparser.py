@@ -8,9 +8,9 @@ class ConfigParserCeph(ConfigParser.ConfigParser):
 
     def optionxform(self, s):
         """
-        Make config files with white space use '_'
+        Make config files with white space or '-' use '_'
         """
         stripped = s.strip()
-        replaced = stripped.replace(' ', '_')
+        replaced = stripped.replace(' ', '_').replace('-', '_')
         return replaced
 
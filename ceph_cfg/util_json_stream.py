@@ -0,0 +1,106 @@
+# Import Python Libs
+from __future__ import absolute_import
+import json
+import logging
+import numbers
+
+
+log = logging.getLogger(__name__)
+
+try:
+    _string_types = (str, unicode)
+except NameError:
+    _string_types = (str,)
+
+
+class object_stream(object):
+    """
+    A JSON object whose (key, value) pairs come from an iterable.
+
+    The pairs are only consumed while encoding, so the object is never
+    held in memory as a whole.
+    """
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+
+class array_stream(object):
+    """
+    A JSON array whose items come from an iterable.
+    """
+    def __init__(self, items):
+        self.items = items
+
+
+def _key(key):
+    """
+    key as a JSON object key, converted the way json.dumps does.
+    """
+    if isinstance(key, _string_types):
+        return key
+    if key is True:
+        return "true"
+    if key is False:
+        return "false"
+    if key is None:
+        return "null"
+    if isinstance(key, float):
+        return json.dumps(key)
+    if isinstance(key, numbers.Integral):
+        return str(key)
+    raise TypeError("key %r is not a string" % (key,))
+
+
+def iterencode(value, encoder=None):
+    """
+    Yield JSON text for value in chunks.
+
+    value may contain object_stream and array_stream at any level, other
+    values are encoded with the json module. object_stream keys are
+    converted as json.dumps converts dictionary keys, so None is "null".
+    """
+    if encoder is None:
+        encoder = json.JSONEncoder()
+    if isinstance(value, object_stream):
+        yield "{"
+        first = True
+        for key, item in value.pairs:
+            if not first:
+                yield ", "
+            first = False
+            yield encoder.encode(_key(key))
+            yield ": "
+            for chunk in iterencode(item, encoder):
+                yield chunk
+        yield "}"
+        return
+    if isinstance(value, array_stream):
+        yield "["
+        first = True
+        for item in value.items:
+            if not first:
+                yield ", "
+            first = False
+            for chunk in iterencode(item, encoder):
+                yield chunk
+        yield "]"
+        return
+    for chunk in encoder.iterencode(value):
+        yield chunk
+
+
+def dump(value, fp):
+    """
+    Write value as JSON to the file like object fp.
+
+    Chunks are written as they are encoded.
+    """
+    for chunk in iterencode(value):
+        fp.write(chunk)
+
+
+def dumps(value):
+    """
+    value as a JSON string, mainly for testing
+    """
+    return "".join(iterencode(value))
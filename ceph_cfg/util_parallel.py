@@ -0,0 +1,115 @@
+# Import Python Libs
+from __future__ import absolute_import
+import logging
+import threading
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+# Default number of tasks run at the same time.
+parallelism_default = 4
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+class task_result(object):
+    """
+    Outcome of a task run by run_groups
+    """
+    def __init__(self, key):
+        self.key = key
+        self.result = None
+        # Exception raised by the task, None on success.
+        self.error = None
+        self.seconds = None
+
+
+def run_groups(groups, parallelism=parallelism_default):
+    """
+    Run groups of tasks with at most parallelism groups at a time.
+
+    groups is a list of lists of (key, callable). Tasks in one group run one
+    after the other in order, so tasks that must not overlap belong to the
+    same group. A task raising an exception does not stop the other tasks.
+
+    Returns a task_result per task, in the order given.
+    """
+    parallelism = int(parallelism)
+    if parallelism < 1:
+        raise Error("parallelism must be at least 1", parallelism)
+    results = []
+    work = []
+    for group in groups:
+        group_work = []
+        for key, func in group:
+            result = task_result(key)
+            results.append(result)
+            group_work.append((func, result))
+        work.append(group_work)
+    lock = threading.Lock()
+    pending = list(reversed(work))
+
+    def worker():
+        while True:
+            with lock:
+                if len(pending) == 0:
+                    return
+                group_work = pending.pop()
+            for func, result in group_work:
+                time_start = time.time()
+                try:
+                    result.result = func()
+                except Exception as err:
+                    log.error("Task '%s' failed: %s" % (result.key, err))
+                    result.error = err
+                result.seconds = time.time() - time_start
+
+    threads = []
+    for index in range(min(parallelism, len(work))):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run(tasks, parallelism=parallelism_default):
+    """
+    Run independent (key, callable) tasks, see run_groups
+    """
+    return run_groups([[task] for task in tasks], parallelism)
+
+
+class disjoint_set(object):
+    """
+    Group items that are linked, such as partitions sharing a disk.
+    """
+    def __init__(self):
+        self._parent = {}
+
+    def find(self, item):
+        self._parent.setdefault(item, item)
+        root = item
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[item] != root:
+            self._parent[item], item = root, self._parent[item]
+        return root
+
+    def union(self, item_a, item_b):
+        root_a = self.find(item_a)
+        root_b = self.find(item_b)
+        if root_a != root_b:
+            self._parent[root_b] = root_a
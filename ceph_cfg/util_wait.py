@@ -0,0 +1,202 @@
+# Import Python Libs
+from __future__ import absolute_import
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import random
+import select
+import struct
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+# inotify flags from <sys/inotify.h>
+_IN_ATTRIB = 0x00000004
+_IN_CREATE = 0x00000100
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_struct_event = struct.Struct("iIII")
+
+_libc = None
+
+
+class Error(Exception):
+    """
+    Error
+    """
+
+    def __str__(self):
+        doc = self.__doc__.strip()
+        return ': '.join([doc] + [str(a) for a in self.args])
+
+
+def _libc_get():
+    """
+    libc with inotify, None when not available
+    """
+    global _libc
+    if _libc is None:
+        _libc = False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            libc.inotify_init1
+            libc.inotify_add_watch
+            _libc = libc
+        except (OSError, AttributeError, TypeError) as err:
+            log.debug("inotify not available: %s" % (err))
+    if _libc is False:
+        return None
+    return _libc
+
+
+class file_watch(object):
+    """
+    Wake when a file is created in a directory, using inotify.
+
+    The directory is watched rather than the file, as the file usually
+    does not exist yet. Use as a context manager, if inotify cannot be
+    used wait() just sleeps.
+    """
+    def __init__(self, path):
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.name = os.path.basename(path).encode('utf-8')
+        self.fd = None
+
+
+    def __enter__(self):
+        libc = _libc_get()
+        if libc is None:
+            return self
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            log.debug("inotify_init1 failed: %s" % (os.strerror(ctypes.get_errno())))
+            return self
+        mask = _IN_CREATE | _IN_MOVED_TO | _IN_ATTRIB
+        directory = self.directory.encode('utf-8')
+        if libc.inotify_add_watch(fd, directory, mask) < 0:
+            log.debug("inotify_add_watch '%s' failed: %s" % (
+                self.directory,
+                os.strerror(ctypes.get_errno())))
+            os.close(fd)
+            return self
+        self.fd = fd
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+    def _events_read(self):
+        """
+        True if any pending event is for the watched name
+        """
+        try:
+            data = os.read(self.fd, 65536)
+        except OSError as err:
+            if err.errno == errno.EAGAIN:
+                return False
+            raise
+        pos = 0
+        found = False
+        while pos + _struct_event.size <= len(data):
+            wd, mask, cookie, length = _struct_event.unpack_from(data, pos)
+            pos += _struct_event.size
+            name = data[pos:pos + length].rstrip(b"\0")
+            pos += length
+            if name == self.name:
+                found = True
+        return found
+
+
+    def wait(self, seconds):
+        """
+        Sleep up to seconds, returning True early if the file appeared
+        """
+        if self.fd is None:
+            time.sleep(seconds)
+            return False
+        deadline = time.time() + seconds
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            readable, writable, errored = select.select([self.fd], [], [], remaining)
+            if len(readable) > 0 and self._events_read():
+                return True
+
+
+class waiter(object):
+    """
+    Wait for a condition with a wall clock deadline.
+
+    The check is retried with exponential backoff and jitter so that many
+    waiters do not poll in step. If watch_path is given, a file appearing
+    at that path, such as a daemon's admin socket, wakes the waiter early.
+
+    Args:
+        timeout : Seconds before giving up.
+        **kwargs: Arbitrary keyword arguments.
+            interval : First wait between checks. Defaults to 0.1.
+            interval_max : Longest wait between checks. Defaults to 5.
+            factor : Growth of the wait after each check. Defaults to 2.
+            jitter : Fraction the wait is randomly varied by. Defaults to
+                0.2.
+            watch_path : File whose creation wakes the waiter.
+            clock : Function returning the time in seconds.
+            sleep : Function sleeping for a number of seconds, not used when
+                watch_path is set.
+    """
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        self.interval = kwargs.get("interval", 0.1)
+        self.interval_max = kwargs.get("interval_max", 5)
+        self.factor = kwargs.get("factor", 2)
+        self.jitter = kwargs.get("jitter", 0.2)
+        self.watch_path = kwargs.get("watch_path")
+        self.clock = kwargs.get("clock", time.time)
+        self.sleep = kwargs.get("sleep", time.sleep)
+
+
+    def intervals(self):
+        """
+        Waits between checks, without the deadline applied
+        """
+        interval = self.interval
+        while True:
+            spread = interval * self.jitter
+            yield max(0, interval + random.uniform(-spread, spread))
+            interval = min(self.interval_max, interval * self.factor)
+
+
+    def wait(self, check):
+        """
+        Call check until it returns True, False if the deadline passed.
+        """
+        deadline = self.clock() + self.timeout
+        watch = None
+        if self.watch_path is not None:
+            watch = file_watch(self.watch_path).__enter__()
+        try:
+            for interval in self.intervals():
+                if check():
+                    return True
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                seconds = min(interval, remaining)
+                if watch is None:
+                    self.sleep(seconds)
+                elif watch.wait(seconds):
+                    log.debug("'%s' appeared" % (self.watch_path))
+        finally:
+            if watch is not None:
+                watch.__exit__(None, None, None)
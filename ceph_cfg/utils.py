@@ -4,6 +4,9 @@ import logging
 import os
 import base64
 import binascii
+import signal
+import sys
+import threading
 
 # local modules
 from . util_configparser import ConfigParserCeph as ConfigParser
@@ -35,18 +38,52 @@ def _quote_arguments_with_space(argument):
     return argument
 
 
-def execute_local_command(command_attrib_list):
+def execute_local_command(command_attrib_list, timeout=None):
+    """
+    Run a command, killing it after timeout seconds if timeout is set.
+
+    With a timeout the command runs in its own session, so the processes
+    it forks are killed with it and cannot keep its output pipes open.
+    output['timeout'] is True when the command was killed.
+    """
     log.info("executing " + " ".join(map(_quote_arguments_with_space, command_attrib_list)))
     if '__salt__' in locals():
-        return __salt__['cmd.run_all'](command_attrib_list, python_shell=False) # noqa
+        if timeout is None:
+            return __salt__['cmd.run_all'](command_attrib_list, python_shell=False) # noqa
+        return __salt__['cmd.run_all'](command_attrib_list, python_shell=False, timeout=timeout) # noqa
 
     # if we cant exute subprocess with salt, use python
     import subprocess
     output= {}
-    proc=subprocess.Popen(command_attrib_list, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False)
-    output['stdout'], output['stderr'] = proc.communicate()
+    popen_kwargs = {}
+    if timeout is not None:
+        if sys.version_info[0] >= 3:
+            popen_kwargs["start_new_session"] = True
+        else:
+            # python 2 has no start_new_session
+            popen_kwargs["preexec_fn"] = os.setsid
+    proc=subprocess.Popen(command_attrib_list, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False, **popen_kwargs)
+    timer = None
+    timed_out = threading.Event()
+    if timeout is not None:
+        def kill():
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+    try:
+        output['stdout'], output['stderr'] = proc.communicate()
+    finally:
+        if timer is not None:
+            timer.cancel()
 
     output['retcode'] = proc.returncode
+    # The timer may fire after the command exited but before it was
+    # cancelled, so the command only timed out if the kill ended it.
+    output['timeout'] = timed_out.is_set() and proc.returncode == -signal.SIGKILL
     return output
 
 